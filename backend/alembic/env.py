@@ -10,6 +10,7 @@ from databases.sqlalchemy import metadata
 from users.models import UserORM  # noqa
 from shops.models import ShopORM  # noqa
 from items.models import ItemORM  # noqa
+from idempotency.models import IdempotencyKeyORM  # noqa
 
 config = context.config
 
@@ -0,0 +1,36 @@
+"""cart reservations
+
+Revision ID: 5c1e9a7d3b42
+Revises: 310266c173f9
+Create Date: 2026-10-18 09:12:40.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1e9a7d3b42'
+down_revision: Union[str, None] = '310266c173f9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Старые корзины не держат резерв, после миграции их снятие
+    # увело бы reserved в минус. Корзины живут минуты, поэтому очищаем.
+    op.execute("DELETE FROM shop_cart")
+
+    op.add_column('shop_items', sa.Column('reserved', sa.Integer(), server_default='0', nullable=False))
+    op.create_check_constraint('check_reserved', 'shop_items', 'reserved >= 0 AND reserved <= quantity')
+    op.add_column('shop_cart', sa.Column('expires_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False))
+    op.create_index('ix_shop_cart_expires_at', 'shop_cart', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_shop_cart_expires_at', table_name='shop_cart')
+    op.drop_column('shop_cart', 'expires_at')
+    op.drop_constraint('check_reserved', 'shop_items', type_='check')
+    op.drop_column('shop_items', 'reserved')
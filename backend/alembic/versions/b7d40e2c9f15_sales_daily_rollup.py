@@ -0,0 +1,41 @@
+"""sales daily rollup
+
+Revision ID: b7d40e2c9f15
+Revises: 8f3b2d6e1a90
+Create Date: 2026-10-18 12:40:05.904112
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d40e2c9f15'
+down_revision: Union[str, None] = '8f3b2d6e1a90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('sales_daily',
+    sa.Column('shop_id', sa.Uuid(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('item_id', sa.Uuid(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.Column('quantity', sa.BigInteger(), nullable=False),
+    sa.Column('income', sa.BigInteger(), nullable=False),
+    sa.ForeignKeyConstraint(['item_id'], ['items.id'], ),
+    sa.ForeignKeyConstraint(['shop_id'], ['shops.id'], ),
+    sa.PrimaryKeyConstraint('shop_id', 'day', 'item_id')
+    )
+    op.execute(
+        "INSERT INTO sales_daily (shop_id, day, item_id, count, quantity, income) "
+        "SELECT shop_id, date(created_at), item_id, count(*), sum(quantity), sum(income) "
+        "FROM items_sold GROUP BY shop_id, date(created_at), item_id"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('sales_daily')
@@ -0,0 +1,79 @@
+"""hot path indexes
+
+Revision ID: c91f4e7a2d36
+Revises: e2a7c5f08b31
+Create Date: 2026-10-18 16:40:12.502731
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c91f4e7a2d36'
+down_revision: Union[str, None] = 'e2a7c5f08b31'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# CONCURRENTLY не блокирует запись, но не работает внутри транзакции,
+# поэтому индексы строятся в autocommit_block по одному.
+# Прерванный CONCURRENTLY оставляет индекс INVALID: IF NOT EXISTS его
+# пропустил бы, поэтому такой индекс сначала удаляется.
+# items_sold секционирована – её индексы созданы вместе с секциями.
+INDEXES = (
+    # /shops/access/self ищет доступы по user_id
+    ('ix_shop_access_user_id_shop_id', 'shop_access', ['user_id', 'shop_id'], {}),
+    # Каталог магазина: WHERE shop_id ORDER BY item_id (keyset)
+    ('ix_shop_items_shop_id_item_id', 'shop_items', ['shop_id', 'item_id'], {}),
+    # Внешний ключ корзины на shop_items (item_id, shop_id)
+    ('ix_shop_cart_item_id_shop_id', 'shop_cart', ['item_id', 'shop_id'], {}),
+    # /items/ keyset по (name, id)
+    ('ix_items_name_id', 'items', ['name', 'id'], {}),
+    # /shops/list keyset по (created_at, id)
+    ('ix_shops_created_at_id', 'shops', ['created_at', 'id'], {}),
+    # /items/sold без shop_id: диапазон дней, count и income из индекса
+    (
+        'ix_sales_daily_day', 'sales_daily', ['day'],
+        {'postgresql_include': ['count', 'income']}
+    ),
+)
+
+
+def drop_invalid_index(name: str, table: str) -> None:
+    """Удаляет индекс, если он остался INVALID после прерванной сборки"""
+
+    invalid = op.get_bind().scalar(
+        sa.text(
+            "SELECT NOT i.indisvalid FROM pg_index i "
+            "JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = :name AND pg_table_is_visible(c.oid)"
+        ),
+        {"name": name}
+    )
+
+    if invalid:
+        op.drop_index(
+            name, table_name=table,
+            postgresql_concurrently=True, if_exists=True
+        )
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns, kwargs in INDEXES:
+            drop_invalid_index(name, table)
+            op.create_index(
+                name, table, columns, unique=False,
+                postgresql_concurrently=True, if_not_exists=True, **kwargs
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns, kwargs in reversed(INDEXES):
+            op.drop_index(
+                name, table_name=table,
+                postgresql_concurrently=True, if_exists=True
+            )
@@ -0,0 +1,93 @@
+"""partition items_sold by month
+
+Revision ID: e2a7c5f08b31
+Revises: b7d40e2c9f15
+Create Date: 2026-10-18 13:55:27.310448
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2a7c5f08b31'
+down_revision: Union[str, None] = 'b7d40e2c9f15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = "item_id, user_id, shop_id, price, quantity, income, created_at"
+
+
+def create_items_sold(partition_by: str = "") -> None:
+    op.execute(f"""
+        CREATE TABLE items_sold (
+            item_id UUID NOT NULL REFERENCES items (id),
+            user_id UUID NOT NULL REFERENCES users (id),
+            shop_id UUID NOT NULL REFERENCES shops (id),
+            price INTEGER NOT NULL,
+            quantity INTEGER DEFAULT '1' NOT NULL,
+            income BIGINT NOT NULL,
+            created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now() NOT NULL,
+            CONSTRAINT items_sold_pkey
+                PRIMARY KEY (item_id, user_id, shop_id, created_at),
+            CONSTRAINT check_price_positive CHECK (price > 0),
+            CONSTRAINT check_quantity_positive CHECK (quantity > 0)
+        ) {partition_by}
+    """)
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE items_sold RENAME TO items_sold_legacy")
+    op.execute("ALTER INDEX items_sold_pkey RENAME TO items_sold_legacy_pkey")
+
+    create_items_sold("PARTITION BY RANGE (created_at)")
+
+    # Секции с месяца первой продажи и на 3 месяца вперед,
+    # дальше их создает items/partitions.py
+    op.execute("""
+        DO $$
+        DECLARE month date;
+        BEGIN
+            FOR month IN
+                SELECT generate_series(
+                    date_trunc('month', coalesce(
+                        (SELECT min(created_at) FROM items_sold_legacy), now()
+                    )),
+                    date_trunc('month', now()) + interval '3 months',
+                    interval '1 month'
+                )::date
+            LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF items_sold '
+                    'FOR VALUES FROM (%L) TO (%L)',
+                    'items_sold_' || to_char(month, 'YYYY_MM'),
+                    month,
+                    month + interval '1 month'
+                );
+            END LOOP;
+        END $$
+    """)
+
+    op.execute(
+        f"INSERT INTO items_sold ({COLUMNS}) "
+        f"SELECT {COLUMNS} FROM items_sold_legacy"
+    )
+    op.drop_table('items_sold_legacy')
+
+    op.create_index('ix_items_sold_created_at', 'items_sold', ['created_at'], unique=False, postgresql_using='brin')
+    op.create_index('ix_items_sold_shop_id_created_at', 'items_sold', ['shop_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE items_sold RENAME TO items_sold_partitioned")
+    op.execute("ALTER INDEX items_sold_pkey RENAME TO items_sold_partitioned_pkey")
+
+    create_items_sold()
+
+    op.execute(
+        f"INSERT INTO items_sold ({COLUMNS}) "
+        f"SELECT {COLUMNS} FROM items_sold_partitioned"
+    )
+    op.drop_table('items_sold_partitioned')
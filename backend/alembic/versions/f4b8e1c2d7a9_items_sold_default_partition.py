@@ -0,0 +1,29 @@
+"""items_sold default partition
+
+Revision ID: f4b8e1c2d7a9
+Revises: c91f4e7a2d36
+Create Date: 2026-10-18 18:05:41.118402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4b8e1c2d7a9'
+down_revision: Union[str, None] = 'c91f4e7a2d36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Продажа за месяц без секции попадает сюда, а не падает с ошибкой.
+    # items/partitions.py переносит такие строки при создании секции
+    op.execute("CREATE TABLE items_sold_default PARTITION OF items_sold DEFAULT")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE items_sold DETACH PARTITION items_sold_default")
+    op.drop_table('items_sold_default')
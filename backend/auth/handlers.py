@@ -7,14 +7,24 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from .jwt import JWTService
 from .schemas import AccessTokenData, AccessTokenResponse
 from users.models import UserORM
-from security.users import validate_hash_password
+from security.users import validate_hash_password_async, needs_rehash, \
+    hash_password_async
 from databases.sqlalchemy import get_db
+from responses import ResponseDescriptions, ResponseDescription
 
 
 auth_router = APIRouter()
 
 
-@auth_router.post("/login")
+@auth_router.post(
+    "/login",
+    responses=ResponseDescriptions((
+        ResponseDescription(
+            status_code=503,
+            description="Too many password checks, try again."
+        ),
+    ))
+)
 async def login(
         form_data: OAuth2PasswordRequestForm = Depends(),
         db: AsyncSession = Depends(get_db)
@@ -28,7 +38,7 @@ async def login(
 
     if (
         user is None or
-        not validate_hash_password(
+        not await validate_hash_password_async(
             form_data.password, user.password
         )
     ):
@@ -37,6 +47,10 @@ async def login(
             detail="Invalid email or password"
         )
 
+    if needs_rehash(user.password):
+        # Сложность bcrypt поменялась – пересчитываем хэш пока знаем пароль
+        user.password = await hash_password_async(form_data.password)
+
     access_token = JWTService.encode(
         AccessTokenData(
             sub=user.id, status=user.status
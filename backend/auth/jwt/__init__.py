@@ -1,25 +1,225 @@
+import time
+import base64
+import asyncio
+import hashlib
+import logging
+from typing import NamedTuple
+from contextlib import suppress
+
 import jwt
+from jwt.exceptions import InvalidKeyError
+from cryptography.exceptions import UnsupportedAlgorithm
+from cryptography.hazmat.primitives.asymmetric import rsa, ec, ed25519
+from cryptography.hazmat.primitives.serialization import load_pem_private_key, \
+    load_pem_public_key, Encoding, PublicFormat
+
+from caches import TTLCache
 from config import JWTConfig
 
 
+logger = logging.getLogger(__name__)
+
+
+def key_algorithm(key) -> str:
+    """Возвращает алгоритм подписи по типу ключа"""
+
+    if isinstance(key, (rsa.RSAPrivateKey, rsa.RSAPublicKey)):
+        return "RS256"
+
+    if isinstance(key, (ec.EllipticCurvePrivateKey, ec.EllipticCurvePublicKey)):
+        if isinstance(key.curve, ec.SECP256R1):
+            return "ES256"
+
+    if isinstance(key, (ed25519.Ed25519PrivateKey, ed25519.Ed25519PublicKey)):
+        return "EdDSA"
+
+    raise InvalidKeyError(f"unsupported key type {type(key).__name__}")
+
+
+def key_id(public_key) -> str:
+    """Возвращает kid: SHA-256 от SubjectPublicKeyInfo ключа"""
+
+    digest = hashlib.sha256(
+        public_key.public_bytes(
+            Encoding.DER,
+            PublicFormat.SubjectPublicKeyInfo
+        )
+    ).digest()
+    return base64.urlsafe_b64encode(digest[:12]).decode()
+
+
+class Keys(NamedTuple):
+    """Ключи, прочитанные с диска за один раз"""
+
+    private_key: object
+    algorithm: str
+    kid: str
+    public_keys: dict[str, tuple[object, str]]  # kid -> (ключ, алгоритм)
+
+
+def load_keys() -> Keys:
+    """
+        Читает ключ подписи и ключи проверки.
+        Падает, если хоть один файл не читается, – например, записан наполовину.
+    """
+
+    private_key = load_pem_private_key(
+        JWTConfig.PRIVATE_KEY.read_bytes(),
+        None
+    )
+    public_keys = {
+        key_id(key): (key, key_algorithm(key))
+        for key in (
+            load_pem_public_key(path.read_bytes())
+            for path in sorted(JWTConfig.DIR.glob(JWTConfig.PUBLIC_KEYS))
+        )
+    }
+
+    signing_public_key = private_key.public_key()
+    signing_kid = key_id(signing_public_key)
+    public_keys.setdefault(
+        signing_kid,
+        (signing_public_key, key_algorithm(signing_public_key))
+    )
+
+    return Keys(
+        private_key,
+        key_algorithm(private_key),
+        signing_kid,
+        public_keys
+    )
+
+
+class KeySet:
+    """
+        Ключ подписи и набор ключей проверки по kid.
+        Ключи перечитывает фоновая задача run_reload раз в
+        JWTConfig.KEYS_RELOAD_INTERVAL и вскоре после токена с неизвестным kid,
+        поэтому ротация не требует рестарта, а запросы не читают диск.
+        Набор меняется целиком: если новые ключи не прочитались,
+        остаются прежние.
+    """
+
+    def __init__(self):
+        self.keys = load_keys()
+        self.reload_requested_at = -JWTConfig.UNKNOWN_KID_RELOAD
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.wake = asyncio.Event()
+
+
+    def reload(self) -> bool:
+        """Перечитывает ключи, при ошибке оставляет прежние"""
+
+        try:
+            keys = load_keys()
+
+        except (OSError, ValueError, TypeError, UnsupportedAlgorithm,
+                InvalidKeyError):
+            logger.exception("JWT keys reload failed, keeping loaded keys")
+            return False
+
+        if keys.public_keys.keys() != self.keys.public_keys.keys():
+            claims_cache.clear()  # Ключ мог быть отозван
+
+        self.keys = keys
+        return True
+
+
+    def request_reload(self) -> None:
+        """
+            Будит run_reload, не чаще раза в JWTConfig.UNKNOWN_KID_RELOAD:
+            поток токенов с чужим kid не должен читать диск на каждый запрос.
+            Вызывается из потоков пула зависимостей, поэтому через loop.
+        """
+
+        now = time.monotonic()
+        loop = self.loop
+
+        if loop is None or \
+                now - self.reload_requested_at < JWTConfig.UNKNOWN_KID_RELOAD:
+            return
+
+        self.reload_requested_at = now
+        with suppress(RuntimeError):  # loop уже закрыт
+            loop.call_soon_threadsafe(self.wake.set)
+
+
+    async def run_reload(self) -> None:
+        """Перечитывает ключи в потоке до отмены задачи"""
+
+        self.wake = asyncio.Event()
+        self.loop = asyncio.get_running_loop()
+
+        try:
+            while True:
+                with suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(
+                        self.wake.wait(),
+                        JWTConfig.KEYS_RELOAD_INTERVAL
+                    )
+                self.wake.clear()
+                await asyncio.to_thread(self.reload)
+
+        finally:
+            self.loop = None
+
+
+    def public_key(self, kid: str | None) -> tuple[object, str]:
+        """
+            Возвращает ключ проверки и его алгоритм по kid.
+            Токены без kid выпущены до ротации – их проверяет ключ подписи.
+        """
+
+        keys = self.keys
+
+        if kid is None:
+            return keys.public_keys[keys.kid]
+
+        try:
+            return keys.public_keys[kid]
+        except KeyError:
+            self.request_reload()
+            raise jwt.InvalidSignatureError("unknown kid") from None
+
+
+claims_cache = TTLCache(JWTConfig.CACHE_SIZE)
+keyset = KeySet()
+
+
 class JWTService:
 
     @staticmethod
     def encode(payload: dict) -> str:
-        """Возвращает jwt token подписанный сервером"""
+        """Возвращает jwt token подписанный текущим ключом сервера"""
+
+        keys = keyset.keys
 
         return jwt.encode(
             payload,
-            JWTConfig.PRIVATE_KEY,
-            algorithm="RS256"
+            keys.private_key,
+            algorithm=keys.algorithm,
+            headers={"kid": keys.kid}
         )
 
     @staticmethod
     def decode(token: str) -> dict:
-        """Возвращает данные внутрит token и проверяет подпись"""
+        """
+            Возвращает данные внутрит token и проверяет подпись.
+            Проверенные данные кэшируются по хэшу токена до его exp.
+        """
 
-        return jwt.decode(
-            token,
-            JWTConfig.PUBLIC_KEY,
-            algorithms=["RS256"]
-        )
+        key = hashlib.sha256(token.encode()).digest()
+        claims = claims_cache.get(key)
+
+        if claims is not None:
+            return claims
+
+        header = jwt.get_unverified_header(token)
+        public_key, algorithm = keyset.public_key(header.get("kid"))
+
+        claims = jwt.decode(token, public_key, algorithms=[algorithm])
+
+        if "exp" in claims:
+            claims_cache.set(key, claims, ttl=claims["exp"] - time.time())
+
+        return claims
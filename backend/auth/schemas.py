@@ -1,6 +1,6 @@
 from time import time
 from uuid import UUID
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from users.schemas import UserStatus
 
@@ -10,7 +10,9 @@ class AccessTokenData(BaseModel):
 
     sub: UUID  # user_id
     status: UserStatus  # user_status
-    exp: int = int(time() + 12*60*60)  # Токен действителен 12 часов
+    exp: int = Field(
+        default_factory=lambda: int(time() + 12*60*60)
+    )  # Токен действителен 12 часов
 
 
 class AccessTokenResponse(BaseModel):
@@ -4,15 +4,13 @@ from typing import Callable, Annotated
 from fastapi import HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordBearer
 
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from jwt.exceptions import DecodeError, InvalidSignatureError, \
-    ExpiredSignatureError
+from jwt.exceptions import PyJWTError
 
 from .jwt import JWTService
 from .schemas import AccessTokenData
-from shops.models import ShopAccessORM
+from shops.services import has_shop_access
 from users.schemas import UserStatus, weights_user_status
 from databases.sqlalchemy import get_db
 
@@ -28,7 +26,7 @@ def get_token_data(
     try:
         token_data = AccessTokenData(**JWTService.decode(token))
 
-    except (DecodeError, InvalidSignatureError, ExpiredSignatureError):
+    except PyJWTError:  # Подпись, срок, формат, неизвестный kid или ключ
         raise HTTPException(status.HTTP_401_UNAUTHORIZED)
 
     return token_data
@@ -47,17 +45,9 @@ async def get_shop_id(
     user_id: UUID = Depends(get_user_id),
     db: AsyncSession = Depends(get_db)
 ) -> UUID:
-    """Возвращает shop_id и проверяет что к нему есть доступ"""
+    """Возвращает shop_id и проверяет что к нему есть доступ (кэшируется)"""
 
-    exists = await db.execute(
-        select(ShopAccessORM)
-        .where(
-            (ShopAccessORM.shop_id == shop_id)
-            & (ShopAccessORM.user_id == user_id)
-        )
-    )
-
-    if not exists.scalar():
+    if not await has_shop_access(user_id, shop_id, db):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="not shop access"
@@ -0,0 +1,77 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class TTLCache:
+    """
+        In-process LRU кэш ограниченного размера.
+        Записи живут ttl секунд (None – пока не вытеснят).
+        Потокобезопасен: синхронные зависимости FastAPI (get_token_data)
+        обращаются к кэшу из потоков пула одновременно.
+    """
+
+    def __init__(
+            self,
+            maxsize: int,
+            ttl: Optional[float] = None
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.__data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self.__lock = threading.Lock()
+
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+
+        with self.__lock:
+            entry = self.__data.get(key)
+
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self.__data[key]
+
+                self.misses += 1
+                return default
+
+            self.__data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+
+    def set(
+            self,
+            key: Hashable,
+            value: Any,
+            ttl: Optional[float] = None
+    ) -> None:
+
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None \
+            else float("inf")
+
+        with self.__lock:
+            self.__data[key] = (expires_at, value)
+            self.__data.move_to_end(key)
+
+            while len(self.__data) > self.maxsize:
+                self.__data.popitem(last=False)
+
+
+    def pop(self, key: Hashable) -> None:
+
+        with self.__lock:
+            self.__data.pop(key, None)
+
+
+    def clear(self) -> None:
+
+        with self.__lock:
+            self.__data.clear()
+
+
+    def __len__(self) -> int:
+        return len(self.__data)
@@ -26,10 +26,129 @@ class PostgresSQLConfig:
     SQLALCHEMY_URL = f"postgresql+asyncpg://{USER}:{PASSWORD}" \
                     f"@{HOST}:{PORT}/{DATABASE}"
 
+    POOL_SIZE = int(os.getenv("POSTGRESQL_POOL_SIZE", 5))  # На процесс
+    MAX_OVERFLOW = int(os.getenv("POSTGRESQL_MAX_OVERFLOW", 10))
+    POOL_TIMEOUT = float(os.getenv("POSTGRESQL_POOL_TIMEOUT", 30))  # Секунды
+    POOL_RECYCLE = int(os.getenv("POSTGRESQL_POOL_RECYCLE", 1800))  # Секунды
+    POOL_PRE_PING = strtobool(os.getenv("POSTGRESQL_POOL_PRE_PING", "true"))
+
+    REPLICA_URLS = [
+        x.strip() for x in os.getenv("POSTGRESQL_REPLICA_URLS", "").split(",")
+        if x.strip()
+    ]
+    REPLICA_TIMEOUT = float(os.getenv("POSTGRESQL_REPLICA_TIMEOUT", 1))
+    REPLICA_RETRY = float(os.getenv("POSTGRESQL_REPLICA_RETRY", 10))
+    READ_YOUR_WRITES = float(os.getenv("POSTGRESQL_READ_YOUR_WRITES", 5))
+
+
+class SlowQueryConfig:
+    """Настройки лога медленных запросов"""
+
+    THRESHOLD = float(os.getenv("SLOW_QUERY_THRESHOLD", 200))  # мс, 0 – выкл
+    EXPLAIN_SAMPLE = float(os.getenv("SLOW_QUERY_EXPLAIN_SAMPLE", 0))  # Доля
+    EXPLAIN_TIMEOUT = int(os.getenv("SLOW_QUERY_EXPLAIN_TIMEOUT", 5000))  # мс
+    LOG_FILE = os.getenv("SLOW_QUERY_LOG_FILE", "logs/slow_queries.log")
+    LOG_MAX_BYTES = int(os.getenv("SLOW_QUERY_LOG_MAX_BYTES", 10*1024*1024))
+    LOG_BACKUPS = int(os.getenv("SLOW_QUERY_LOG_BACKUPS", 5))
+
+
+class CheckoutConfig:
+    """Настройки проведения покупки"""
+
+    RETRIES = int(os.getenv("CHECKOUT_RETRIES", 3))
+    RETRY_BACKOFF = float(os.getenv("CHECKOUT_RETRY_BACKOFF", 0.05))
+    RETRY_BACKOFF_MAX = float(os.getenv("CHECKOUT_RETRY_BACKOFF_MAX", 1))
+
+
+class ReservationConfig:
+    """Настройки резерва товаров в корзине"""
+
+    TTL = int(os.getenv("RESERVATION_TTL", 15*60))  # Секунды
+    SWEEP_INTERVAL = float(os.getenv("RESERVATION_SWEEP_INTERVAL", 30))
+    SWEEP_BATCH = int(os.getenv("RESERVATION_SWEEP_BATCH", 500))
+
+
+class IdempotencyConfig:
+    """Настройки ключей идемпотентности"""
+
+    TTL = int(os.getenv("IDEMPOTENCY_TTL", 24*60*60))  # Секунды
+    CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", 10_000))
+    SWEEP_INTERVAL = float(os.getenv("IDEMPOTENCY_SWEEP_INTERVAL", 10*60))
+    SWEEP_BATCH = int(os.getenv("IDEMPOTENCY_SWEEP_BATCH", 1000))
+
+
+class IngestConfig:
+    """Настройки массовой загрузки данных"""
+
+    COPY_CHUNK_SIZE = int(os.getenv("INGEST_COPY_CHUNK_SIZE", 5000))
+
+
+class ExportConfig:
+    """Настройки выгрузки данных"""
+
+    YIELD_PER = int(os.getenv("EXPORT_YIELD_PER", 1000))  # Строк за порцию
+
+
+class PaginationConfig:
+    """Настройки постраничной выдачи"""
+
+    DEFAULT_LIMIT = int(os.getenv("PAGINATION_DEFAULT_LIMIT", 100))
+    MAX_LIMIT = int(os.getenv("PAGINATION_MAX_LIMIT", 1000))
+
+
+class PartitionConfig:
+    """Настройки секций items_sold"""
+
+    MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", 3))
+    KEEP_MONTHS = int(os.getenv("PARTITION_KEEP_MONTHS", 0))  # 0 – не отключать
+    INTERVAL = float(os.getenv("PARTITION_INTERVAL", 24*60*60))
+    LOCK_TIMEOUT = int(os.getenv("PARTITION_LOCK_TIMEOUT", 2000))  # мс
+
+
+class FeedConfig:
+    """Настройки потока изменений остатков"""
+
+    QUEUE_SIZE = int(os.getenv("FEED_QUEUE_SIZE", 100))  # Событий на подписчика
+    KEEPALIVE = float(os.getenv("FEED_KEEPALIVE", 15))  # Секунды
+
+
+class CatalogConfig:
+    """Настройки кэша каталога магазина"""
+
+    CACHE_SIZE = int(os.getenv("CATALOG_CACHE_SIZE", 1000))  # Страниц
+    TTL = float(os.getenv("CATALOG_CACHE_TTL", 5))  # Секунды
+
+
+class ShopAccessConfig:
+    """Настройки кэша доступа к магазинам"""
+
+    CACHE_SIZE = int(os.getenv("SHOP_ACCESS_CACHE_SIZE", 10000))  # Пар
+    TTL = float(os.getenv("SHOP_ACCESS_CACHE_TTL", 60))  # Секунды
+
+
+class SecurityConfig:
+    """Настройки хэширования паролей"""
+
+    BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+    HASH_WORKERS = min(  # Потоков bcrypt на процесс, не больше ядер
+        int(os.getenv("HASH_WORKERS", 2)),
+        os.cpu_count() or 1
+    )
+    HASH_QUEUE = int(os.getenv("HASH_QUEUE", 32))  # Хэшей в очереди, сверх – 503
+
 
 class JWTConfig:
     """Настройки JWT"""
 
     DIR = Path(Config.BASE_DIR, "auth", "jwt")
-    PRIVATE_KEY = Path(DIR, "private.pem").read_text()
-    PUBLIC_KEY = Path(DIR, "public.pem").read_text()
+    PRIVATE_KEY = Path(DIR, os.getenv("JWT_PRIVATE_KEY", "private.pem"))
+    PUBLIC_KEYS = os.getenv("JWT_PUBLIC_KEYS", "public*.pem")  # Шаблон в DIR
+    KEYS_RELOAD_INTERVAL = float(os.getenv("JWT_KEYS_RELOAD_INTERVAL", 60))
+    UNKNOWN_KID_RELOAD = float(os.getenv("JWT_UNKNOWN_KID_RELOAD", 10))
+    CACHE_SIZE = int(os.getenv("JWT_CACHE_SIZE", 10000))  # Проверенных токенов
+
+
+class MetricsConfig:
+    """Настройки /metrics"""
+
+    TOKEN = os.getenv("METRICS_TOKEN", "")  # Bearer токен Prometheus, пусто – только владелец
@@ -0,0 +1,84 @@
+import asyncio
+import logging
+from typing import Callable
+
+import asyncpg
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .sqlalchemy import engine
+
+
+logger = logging.getLogger(__name__)
+
+
+async def notify(
+        channel: str,
+        payload: str,
+        db: AsyncSession
+) -> None:
+    """Отправляет pg_notify, подписчики получат его после коммита"""
+
+    await db.execute(select(func.pg_notify(channel, payload)))
+
+
+class PgListener:
+    """
+        Одно LISTEN соединение на процесс.
+        Раздает уведомления подписчикам каналов, переподключается при обрыве.
+    """
+
+    def __init__(self, reconnect_delay: float = 5):
+        self.reconnect_delay = reconnect_delay
+        self.__callbacks: dict[str, list[Callable[[str], None]]] = {}
+
+
+    def subscribe(
+            self,
+            channel: str,
+            callback: Callable[[str], None]
+    ) -> None:
+        """Подписывает callback(payload) на канал, до запуска run()"""
+
+        self.__callbacks.setdefault(channel, []).append(callback)
+
+
+    def __dispatch(self, connection, pid, channel: str, payload: str) -> None:
+
+        for callback in self.__callbacks.get(channel, ()):
+            try:
+                callback(payload)
+            except Exception:
+                logger.exception("listener callback for %s failed", channel)
+
+
+    async def run(self) -> None:
+
+        dsn = engine.url.set(drivername="postgresql") \
+            .render_as_string(hide_password=False)
+
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(dsn)
+                closed = asyncio.Event()
+                connection.add_termination_listener(lambda _: closed.set())
+
+                for channel in self.__callbacks:
+                    await connection.add_listener(channel, self.__dispatch)
+
+                await closed.wait()
+                logger.warning("listener connection closed, reconnecting")
+
+            except asyncio.CancelledError:
+                if connection is not None:
+                    await connection.close()
+                raise
+
+            except Exception:
+                logger.exception("listener connection failed")
+
+            await asyncio.sleep(self.reconnect_delay)
+
+
+listener = PgListener()
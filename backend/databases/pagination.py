@@ -0,0 +1,109 @@
+import json
+import base64
+import binascii
+from datetime import date, datetime
+from typing import Annotated, Any, Optional, Sequence
+
+from fastapi import Depends, HTTPException, Query, status
+from pydantic import BaseModel
+
+from sqlalchemy import Select, ColumnElement, tuple_
+
+from config import PaginationConfig
+
+
+class PageParams(BaseModel):
+    """Параметры страницы: курсор и размер"""
+
+    cursor: Optional[str] = None
+    limit: int
+
+
+def get_page_params(
+        cursor: Optional[str] = Query(
+            None,
+            description="next_cursor from the previous page"
+        ),
+        limit: int = Query(
+            PaginationConfig.DEFAULT_LIMIT,
+            ge=1,
+            le=PaginationConfig.MAX_LIMIT
+        )
+) -> PageParams:
+    """Возвращает параметры страницы из query"""
+
+    return PageParams(cursor=cursor, limit=limit)
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Кодирует значения ключа сортировки в непрозрачный курсор"""
+
+    data = json.dumps([
+        x.isoformat() if isinstance(x, (date, datetime)) else str(x)
+        for x in values
+    ])
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+
+def decode_cursor(
+        cursor: str,
+        columns: Sequence[ColumnElement]
+) -> tuple:
+    """Раскодирует курсор в значения типов колонок сортировки"""
+
+    try:
+        values = json.loads(
+            base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        )
+
+        if len(values) != len(columns):
+            raise ValueError
+
+        return tuple(
+            column.type.python_type.fromisoformat(value)
+            if column.type.python_type in (date, datetime)
+            else column.type.python_type(value)
+            for column, value in zip(columns, values)
+        )
+
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="invalid cursor"
+        )
+
+
+def paginate(
+        query: Select,
+        columns: Sequence[ColumnElement],
+        page: PageParams
+) -> Select:
+    """
+        Добавляет к запросу keyset пагинацию: строки после курсора
+        в порядке columns (последняя колонка должна быть уникальной).
+        Выбирает на одну строку больше, чтобы понять есть ли следующая страница.
+    """
+
+    if page.cursor:
+        query = query.where(
+            tuple_(*columns) > decode_cursor(page.cursor, columns)
+        )
+
+    return query.order_by(*columns).limit(page.limit + 1)
+
+
+def split_page(
+        rows: Sequence[Any],
+        columns: Sequence[ColumnElement],
+        page: PageParams
+) -> tuple[Sequence[Any], Optional[str]]:
+    """Отрезает лишнюю строку и возвращает курсор следующей страницы"""
+
+    if len(rows) <= page.limit:
+        return rows, None
+
+    rows = rows[:page.limit]
+    return rows, encode_cursor([getattr(rows[-1], x.key) for x in columns])
+
+
+PageParamsDep = Annotated[PageParams, Depends(get_page_params)]
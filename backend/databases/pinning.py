@@ -0,0 +1,72 @@
+import time
+from http.cookies import SimpleCookie
+
+from fastapi import Request
+
+from config import PostgresSQLConfig
+
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+PIN_COOKIE = "primary_until"
+
+
+def pin_to_primary(request: Request) -> None:
+    """
+        После записи клиент читает с primary READ_YOUR_WRITES секунд,
+        чтобы не увидеть отстающую реплику. Срок уходит клиенту в cookie
+        (PinningMiddleware), поэтому его видит любой воркер.
+    """
+
+    if PostgresSQLConfig.READ_YOUR_WRITES > 0:
+        request.state.primary_until = \
+            time.time() + PostgresSQLConfig.READ_YOUR_WRITES
+
+
+def is_pinned(request: Request) -> bool:
+    """Проверяет, что клиент писал меньше READ_YOUR_WRITES секунд назад"""
+
+    try:
+        until = float(request.cookies[PIN_COOKIE])
+    except (KeyError, ValueError):
+        return False
+
+    now = time.time()
+    # Срок дальше READ_YOUR_WRITES выставил не сервер – не верим
+    return now < until <= now + PostgresSQLConfig.READ_YOUR_WRITES
+
+
+class PinningMiddleware:
+    """Отдает клиенту cookie primary_until, если запрос что-то записал"""
+
+    def __init__(self, app):
+        self.app = app
+
+
+    async def __call__(self, scope, receive, send):
+
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        async def send_wrapper(message):
+
+            until = scope.get("state", {}).get("primary_until")
+
+            if message["type"] == "http.response.start" and until is not None:
+                cookie = SimpleCookie()
+                cookie[PIN_COOKIE] = f"{until:.3f}"
+                cookie[PIN_COOKIE]["path"] = "/"
+                cookie[PIN_COOKIE]["max-age"] = \
+                    int(PostgresSQLConfig.READ_YOUR_WRITES) + 1
+                cookie[PIN_COOKIE]["httponly"] = True
+                cookie[PIN_COOKIE]["samesite"] = "lax"
+
+                message["headers"] = [
+                    *message.get("headers", ()),
+                    (
+                        b"set-cookie",
+                        cookie.output(header="").strip().encode()
+                    )
+                ]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
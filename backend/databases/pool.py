@@ -0,0 +1,68 @@
+import time
+
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from metrics import Histogram
+
+
+class PoolStats:
+    """Время получения соединения из пула"""
+
+    def __init__(self):
+        self.acquire = Histogram()  # Любое получение соединения
+        self.wait = Histogram()  # Получение, когда свободных соединений не было
+        self.timeouts = 0
+
+
+pools_stats: dict[str, PoolStats] = {}
+
+
+class ObservedPool(AsyncAdaptedQueuePool):
+    """
+        Пул соединений, который замеряет получение соединения.
+        Статистика хранится по pool_logging_name движка,
+        поэтому переживает пересоздание пула в engine.dispose().
+    """
+
+    @property
+    def stats(self) -> PoolStats:
+        name = getattr(self, "logging_name", None) or "default"
+        return pools_stats.setdefault(name, PoolStats())
+
+
+    def connect(self):
+
+        stats = self.stats
+        idle = self.checkedin()
+        started = time.perf_counter()
+
+        try:
+            return super().connect()
+
+        except TimeoutError:
+            stats.timeouts += 1
+            raise
+
+        finally:
+            elapsed = time.perf_counter() - started
+            stats.acquire.observe(elapsed)
+
+            if not idle:
+                stats.wait.observe(elapsed)
+
+
+def pool_snapshot(pool: ObservedPool) -> dict:
+    """Возвращает состояние пула и гистограммы получения соединений"""
+
+    stats = pool.stats
+
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "timeouts": stats.timeouts,
+        "acquire": stats.acquire.snapshot(),
+        "wait": stats.wait.snapshot()
+    }
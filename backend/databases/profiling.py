@@ -0,0 +1,169 @@
+import time
+from contextvars import ContextVar
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from .slowlog import log_slow_statement
+from config import Config, SlowQueryConfig
+
+
+class QueryStats:
+    """Число запросов к базе и их суммарное время"""
+
+    __slots__ = ("statements", "duration", "parent")
+
+    def __init__(self, parent: Optional["QueryStats"] = None):
+        self.statements = 0
+        self.duration = 0.0
+        self.parent = parent
+
+
+    def add(self, duration: float) -> None:
+
+        stats = self
+        while stats is not None:
+            stats.statements += 1
+            stats.duration += duration
+            stats = stats.parent
+
+
+current_queries: ContextVar[Optional[QueryStats]] = ContextVar(
+    "current_queries",
+    default=None
+)
+
+
+current_scope: ContextVar[Optional[dict]] = ContextVar(
+    "current_scope",
+    default=None
+)
+
+
+def current_route() -> Optional[str]:
+    """Возвращает шаблон маршрута текущего запроса API"""
+
+    scope = current_scope.get()
+
+    if scope is None:
+        return None
+
+    return getattr(scope.get("route"), "path", scope["path"])
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context,
+                         executemany):
+
+    duration = time.perf_counter() - conn.info["query_started"].pop()
+    stats = current_queries.get()
+
+    if stats is not None:
+        stats.add(duration)
+
+    if duration * 1000 >= SlowQueryConfig.THRESHOLD > 0:
+        log_slow_statement(
+            conn,
+            statement,
+            parameters,
+            executemany,
+            duration,
+            current_route()
+        )
+
+
+def handle_error(exception_context):
+
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_started"):
+        connection.info["query_started"].pop()
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """
+        Подключает подсчет запросов к движку.
+        SQLAlchemy выполняет запросы в greenlet с контекстом вызывающей
+        корутины, поэтому current_queries виден в событиях.
+    """
+
+    event.listen(engine.sync_engine, "before_cursor_execute",
+                 before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute",
+                 after_cursor_execute)
+    event.listen(engine.sync_engine, "handle_error", handle_error)
+
+
+@contextmanager
+def count_statements() -> Iterator[QueryStats]:
+    """Считает запросы к базе внутри блока, включая вложенные запросы API"""
+
+    stats = QueryStats(current_queries.get())
+    token = current_queries.set(stats)
+
+    try:
+        yield stats
+    finally:
+        current_queries.reset(token)
+
+
+@contextmanager
+def max_statements(limit: int) -> Iterator[QueryStats]:
+    """
+        Падает AssertionError, если внутри блока больше limit запросов.
+        Для тестов: with max_statements(3): client.post("/items/cart/confirmm")
+    """
+
+    with count_statements() as stats:
+        yield stats
+
+    if stats.statements > limit:
+        raise AssertionError(
+            f"{stats.statements} statements executed, expected at most {limit}"
+        )
+
+
+class QueryStatsMiddleware:
+    """
+        Считает запросы к базе за время запроса API
+        и запоминает маршрут для лога медленных запросов.
+        В DEBUG отдает их в заголовке Server-Timing:
+        db;dur=<мс>;desc="<число> statements".
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+
+    async def __call__(self, scope, receive, send):
+
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        async def send_wrapper(message):
+
+            if message["type"] == "http.response.start" and Config.DEBUG:
+                message["headers"] = [
+                    *message.get("headers", ()),
+                    (
+                        b"server-timing",
+                        'db;dur={:.1f};desc="{} statements"'.format(
+                            stats.duration * 1000,
+                            stats.statements
+                        ).encode()
+                    )
+                ]
+            await send(message)
+
+        token = current_scope.set(scope)
+
+        try:
+            with count_statements() as stats:
+                await self.app(scope, receive, send_wrapper)
+        finally:
+            current_scope.reset(token)
@@ -0,0 +1,106 @@
+import time
+import logging
+import itertools
+from typing import AsyncIterator, Annotated
+
+from fastapi import Depends, Request
+
+from sqlalchemy.exc import DBAPIError, TimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, \
+    AsyncSession, AsyncEngine
+
+from .pool import ObservedPool
+from .pinning import is_pinned
+from .profiling import instrument_engine
+from .sqlalchemy import session_factory
+from config import Config, PostgresSQLConfig
+
+
+logger = logging.getLogger(__name__)
+
+def create_replica_engine(index: int, url: str) -> AsyncEngine:
+    """
+        Создает движок реплики. И очередь пула, и само подключение ждут
+        не дольше REPLICA_TIMEOUT: недоступная реплика не должна держать
+        запрос до таймаута asyncpg по умолчанию (60 секунд).
+    """
+
+    engine = create_async_engine(
+        url,
+        echo=Config.DEBUG,
+        poolclass=ObservedPool,
+        pool_logging_name=f"replica{index}",
+        pool_size=PostgresSQLConfig.POOL_SIZE,
+        max_overflow=PostgresSQLConfig.MAX_OVERFLOW,
+        pool_timeout=PostgresSQLConfig.REPLICA_TIMEOUT,
+        pool_recycle=PostgresSQLConfig.POOL_RECYCLE,
+        pool_pre_ping=PostgresSQLConfig.POOL_PRE_PING,
+        connect_args={"timeout": PostgresSQLConfig.REPLICA_TIMEOUT}
+    )
+    instrument_engine(engine)
+
+    return engine
+
+
+replica_engines = [
+    create_replica_engine(index, url)
+    for index, url in enumerate(PostgresSQLConfig.REPLICA_URLS)
+]
+replica_factories = [async_sessionmaker(x) for x in replica_engines]
+replicas_down_until = [0.0] * len(replica_engines)
+replicas_turn = itertools.count()
+
+
+def replicas_order() -> list[int]:
+    """Возвращает живые реплики по кругу, начиная со следующей"""
+
+    now = time.monotonic()
+    start = next(replicas_turn)
+
+    return [
+        index
+        for index in (
+            (start + x) % len(replica_engines)
+            for x in range(len(replica_engines))
+        )
+        if replicas_down_until[index] <= now
+    ]
+
+
+async def open_read_session(request: Request) -> AsyncSession:
+    """
+        Открывает сессию на реплике по round-robin.
+        Недоступная реплика пропускается REPLICA_RETRY секунд,
+        если живых реплик нет или клиент недавно писал – сессия на primary.
+    """
+
+    if is_pinned(request):
+        return session_factory()
+
+    for index in replicas_order():
+        session = replica_factories[index]()
+
+        try:
+            await session.connection()
+            return session
+
+        except (DBAPIError, TimeoutError, OSError):
+            await session.close()
+            replicas_down_until[index] = \
+                time.monotonic() + PostgresSQLConfig.REPLICA_RETRY
+            logger.warning("replica%s is unavailable", index, exc_info=True)
+
+    return session_factory()
+
+
+async def get_read_db(request: Request) -> AsyncIterator[AsyncSession]:
+    """Сессия только для чтения: реплика, при отказе – primary"""
+
+    session = await open_read_session(request)
+    try:
+        yield session
+    finally:
+        await session.close()
+
+
+ReadSessionDep = Annotated[AsyncSession, Depends(get_read_db)]
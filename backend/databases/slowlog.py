@@ -0,0 +1,170 @@
+import re
+import random
+import asyncio
+import logging
+from pathlib import Path
+from logging.handlers import RotatingFileHandler
+
+from sqlalchemy.engine import URL
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from config import Config, SlowQueryConfig
+
+
+EXPLAINABLE = ("select", "insert", "update", "delete", "with")
+# SELECT с такими частями меняет состояние вне транзакции или ждет блокировки
+NOT_ANALYZABLE = re.compile(
+    r"\bfor\s+(no\s+key\s+update|update|key\s+share|share)\b"
+    r"|pg_(try_)?advisory|nextval|setval",
+    re.IGNORECASE
+)
+
+logger = logging.getLogger("slow_queries")
+plans_logger = logging.getLogger("slow_queries.plans")
+plans_logger.propagate = False  # Планы только в файл, не в консоль
+
+explain_engines: dict[URL, AsyncEngine] = {}
+explain_tasks: set[asyncio.Task] = set()
+
+
+def setup_slow_query_log() -> None:
+    """Подключает файл лога медленных запросов, вызывается при старте"""
+
+    if not SlowQueryConfig.LOG_FILE or plans_logger.handlers:
+        return
+
+    Path(SlowQueryConfig.LOG_FILE).parent.mkdir(parents=True, exist_ok=True)
+    handler = RotatingFileHandler(
+        SlowQueryConfig.LOG_FILE,
+        maxBytes=SlowQueryConfig.LOG_MAX_BYTES,
+        backupCount=SlowQueryConfig.LOG_BACKUPS
+    )
+    handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+    logger.addHandler(handler)
+    plans_logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    plans_logger.setLevel(logging.INFO)
+
+
+def explain_engine(url: URL) -> AsyncEngine:
+    """
+        Возвращает движок для EXPLAIN: одно соединение на базу,
+        без подсчета запросов, чтобы планы не забирали пул приложения
+    """
+
+    engine = explain_engines.get(url)
+
+    if engine is None:
+        engine = explain_engines[url] = create_async_engine(
+            url,
+            pool_size=1,
+            max_overflow=0
+        )
+
+    return engine
+
+
+async def dispose_explain_engines() -> None:
+
+    for engine in explain_engines.values():
+        await engine.dispose()
+    explain_engines.clear()
+
+
+def parameters_shape(parameters) -> str:
+    """Возвращает типы параметров без значений: в них могут быть личные данные"""
+
+    if isinstance(parameters, dict):
+        return str({k: type(v).__name__ for k, v in parameters.items()})
+
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (list, tuple, dict)):
+            # executemany – строк много, показываем первую
+            return f"{len(parameters)} x {parameters_shape(parameters[0])}"
+
+        return str([type(x).__name__ for x in parameters])
+
+    return type(parameters).__name__
+
+
+def should_analyze(statement: str) -> bool:
+    """
+        ANALYZE выполняет запрос. Безопасен только простой SELECT:
+        записи откатились бы, но ждали бы блокировок и держали их,
+        а последовательности и advisory блокировки не откатываются.
+    """
+
+    return statement.lstrip().lower().startswith("select") \
+        and NOT_ANALYZABLE.search(statement) is None
+
+
+async def explain_statement(
+        url: URL,
+        statement: str,
+        parameters
+) -> None:
+    """
+        Снимает план в отдельном соединении: для SELECT –
+        EXPLAIN (ANALYZE, BUFFERS), для остального – EXPLAIN без выполнения.
+        Транзакция откатывается, а lock_timeout не дает ждать
+        блокировки исходной транзакции.
+    """
+
+    explain = "EXPLAIN (ANALYZE, BUFFERS)" if should_analyze(statement) \
+        else "EXPLAIN"
+
+    try:
+        async with explain_engine(url).connect() as conn:
+            await conn.exec_driver_sql(
+                f"SET LOCAL lock_timeout = {SlowQueryConfig.EXPLAIN_TIMEOUT}"
+            )
+            await conn.exec_driver_sql(
+                f"SET LOCAL statement_timeout = {SlowQueryConfig.EXPLAIN_TIMEOUT}"
+            )
+            plan = await conn.exec_driver_sql(
+                f"{explain} {statement}",
+                parameters
+            )
+            plan = "\n".join(x[0] for x in plan)
+            await conn.rollback()
+
+        plans_logger.info("plan for: %s\n%s", statement, plan)
+
+    except Exception:
+        logger.warning("explain failed for: %s", statement, exc_info=True)
+
+
+def should_explain(statement: str, executemany: bool) -> bool:
+
+    return (
+        not executemany
+        and not explain_tasks  # Один план за раз, остальные пропускаем
+        and statement.lstrip().lower().startswith(EXPLAINABLE)
+        and (Config.DEBUG or random.random() < SlowQueryConfig.EXPLAIN_SAMPLE)
+    )
+
+
+def log_slow_statement(
+        conn,
+        statement: str,
+        parameters,
+        executemany: bool,
+        duration: float,
+        route: str | None
+) -> None:
+    """Пишет медленный запрос в лог и, по выборке, снимает его план"""
+
+    logger.warning(
+        "slow statement %.1f ms route=%s params=%s\n%s",
+        duration * 1000,
+        route,
+        parameters_shape(parameters),
+        statement
+    )
+
+    if should_explain(statement, executemany):
+        task = asyncio.get_running_loop().create_task(
+            explain_statement(conn.engine.url, statement, parameters)
+        )
+        explain_tasks.add(task)
+        task.add_done_callback(explain_tasks.discard)
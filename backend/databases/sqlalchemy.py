@@ -1,19 +1,32 @@
 from typing import AsyncIterator, Annotated
 
-from fastapi import Depends
+from fastapi import Depends, Request
 from pydantic import Field
 
 from sqlalchemy import MetaData
-from sqlalchemy.orm import sessionmaker, declarative_base
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import declarative_base
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, \
+    AsyncSession
 
+from .pool import ObservedPool
+from .pinning import SAFE_METHODS, pin_to_primary
+from .profiling import instrument_engine
 from config import Config, PostgresSQLConfig
 
 
 engine = create_async_engine(
     PostgresSQLConfig.SQLALCHEMY_URL,
-    echo=Config.DEBUG
+    echo=Config.DEBUG,
+    poolclass=ObservedPool,
+    pool_logging_name="primary",
+    pool_size=PostgresSQLConfig.POOL_SIZE,
+    max_overflow=PostgresSQLConfig.MAX_OVERFLOW,
+    pool_timeout=PostgresSQLConfig.POOL_TIMEOUT,
+    pool_recycle=PostgresSQLConfig.POOL_RECYCLE,
+    pool_pre_ping=PostgresSQLConfig.POOL_PRE_PING
 )
+instrument_engine(engine)
+session_factory = async_sessionmaker(engine)  # Создаёт новую асинхронную сессию
 metadata = MetaData()
 
 Base = declarative_base(metadata=metadata)
@@ -25,34 +38,48 @@ def get_enum_values(enum):
     return [x.value for x in enum]
 
 
-def convert_query_to_list_dicts(schema_class, data):
+def rows_to_dicts(data) -> list[dict]:
+    """Преобразует строки запроса в dicts для FastJSONResponse"""
+
+    return [x._asdict() for x in data]
+
+
+async def copy_records(
+        db: AsyncSession,
+        table: str,
+        columns: list[str],
+        records: list[tuple]
+) -> None:
     """
-        Преобразует результат запроса SELECT в список dicts
-        https://stackoverflow.com/questions/19406859
+        Загружает строки в таблицу бинарным COPY (asyncpg)
+        в транзакции текущей сессии
     """
 
-    return [
-        schema_class.model_validate(x)
-        for x in map(lambda q: q._asdict(), data)
-    ]
+    connection = await db.connection()
+    raw = await connection.get_raw_connection()
 
+    if not raw.driver_connection.is_in_transaction():
+        # SQLAlchemy открывает транзакцию asyncpg лениво, с первым запросом
+        await connection.exec_driver_sql("SELECT 1")
 
-def session_factory() -> AsyncSession:
-    """Создаёт новую асинхронную сессию"""
+    await raw.driver_connection.copy_records_to_table(
+        table,
+        records=records,
+        columns=columns
+    )
 
-    return sessionmaker(
-        bind=engine,
-        class_=AsyncSession
-    )()
 
-
-async def get_db() -> AsyncIterator[AsyncSession]:
+async def get_db(request: Request) -> AsyncIterator[AsyncSession]:
     """Управляет жизненным циклом сессии, используя асинхронный генератор"""
 
     session = session_factory()
     try:
         yield session
         await session.commit()
+
+        if request.method not in SAFE_METHODS:
+            pin_to_primary(request)
+
     except:
         await session.rollback()
         raise
@@ -0,0 +1,36 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .sqlalchemy import session_factory
+
+
+logger = logging.getLogger(__name__)
+
+
+async def run_periodic(
+        job: Callable[[AsyncSession], Awaitable[bool]],
+        interval: float
+) -> None:
+    """
+        Выполняет job каждые interval секунд, каждый вызов в своей транзакции.
+        Если job вернул True (обработан полный batch), вызывает его сразу снова.
+    """
+
+    while True:
+        try:
+            more = True
+            while more:
+                async with session_factory() as db:
+                    more = await job(db)
+                    await db.commit()
+
+        except asyncio.CancelledError:
+            raise
+
+        except Exception:
+            logger.exception("periodic job %s failed", job.__name__)
+
+        await asyncio.sleep(interval)
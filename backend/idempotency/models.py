@@ -0,0 +1,23 @@
+import datetime
+
+from sqlalchemy import String, LargeBinary, Index, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from databases.sqlalchemy import Base
+
+
+class IdempotencyKeyORM(Base):
+    __tablename__ = "idempotency_keys"
+
+    key: Mapped[str] = mapped_column(String(255), primary_key=True)
+    fingerprint: Mapped[str] = mapped_column(String(64))
+    status_code: Mapped[int | None]
+    body: Mapped[bytes | None] = mapped_column(LargeBinary)
+    created_at: Mapped[datetime.datetime] = mapped_column(
+        server_default=func.now()
+    )
+    expires_at: Mapped[datetime.datetime] = mapped_column()
+
+    __table_args__ = (
+        Index("ix_idempotency_keys_expires_at", expires_at),
+    )
@@ -0,0 +1,295 @@
+import inspect
+import hashlib
+from datetime import timedelta
+from functools import wraps
+from typing import Annotated, Callable, Optional
+
+from fastapi import HTTPException, Header, Request, status
+from fastapi.responses import Response, JSONResponse
+from fastapi.encoders import jsonable_encoder
+
+from sqlalchemy import select, update, delete, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import IdempotencyKeyORM
+from caches import TTLCache
+from config import IdempotencyConfig
+
+
+IdempotencyKeyHeader = Annotated[
+    Optional[str],
+    Header(alias="Idempotency-Key", max_length=255)
+]
+
+responses_cache = TTLCache(IdempotencyConfig.CACHE_SIZE)
+
+
+def request_fingerprint(request: Request, body_digest: bytes) -> str:
+    """Возвращает отпечаток запроса: метод, путь, query, токен и хэш тела"""
+
+    digest = hashlib.sha256()
+
+    for part in (
+        request.method.encode(),
+        request.url.path.encode(),
+        request.url.query.encode(),
+        request.headers.get("Authorization", "").encode(),
+        body_digest
+    ):
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+
+    return digest.hexdigest()
+
+
+async def read_fingerprint(request: Request, streamed: bool) -> str:
+    """
+        Читает тело и возвращает отпечаток запроса.
+        Тело потокового обработчика читается по частям и не собирается
+        в памяти: от него остается только хэш.
+    """
+
+    digest = hashlib.sha256()
+
+    if streamed:
+        async for chunk in request.stream():
+            digest.update(chunk)
+    else:
+        digest.update(await request.body())
+
+    return request_fingerprint(request, digest.digest())
+
+
+async def get_stored_response(
+        key: str,
+        db: AsyncSession
+) -> tuple[str, int, bytes] | None:
+    """
+        Возвращает сохраненный ответ по ключу: сначала из кэша процесса,
+        затем одним запросом по первичному ключу.
+    """
+
+    stored = responses_cache.get(key)
+    if stored:
+        return stored
+
+    row = await db.execute(
+        select(
+            IdempotencyKeyORM.fingerprint,
+            IdempotencyKeyORM.status_code,
+            IdempotencyKeyORM.body,
+            func.extract(
+                "epoch",
+                IdempotencyKeyORM.expires_at - func.now()
+            )
+        )
+        .where(
+            (IdempotencyKeyORM.key == key)
+            & (IdempotencyKeyORM.expires_at > func.now())
+        )
+    )
+    row = row.first()
+
+    if row is None or row.status_code is None:
+        return None
+
+    stored = (row.fingerprint, row.status_code, row.body)
+    responses_cache.set(key, stored, ttl=float(row[3]))
+
+    return stored
+
+
+async def claim_key(
+        key: str,
+        fingerprint: str,
+        db: AsyncSession
+) -> bool:
+    """
+        Занимает ключ в текущей транзакции.
+        Истекший, но еще не удаленный ключ занимается заново тем же запросом.
+        Если ключ занят параллельным запросом, ждет его завершения
+        и возвращает False.
+    """
+
+    claim = insert(IdempotencyKeyORM).values(
+        key=key,
+        fingerprint=fingerprint,
+        expires_at=func.now() + timedelta(seconds=IdempotencyConfig.TTL)
+    )
+    claimed = await db.execute(
+        claim.on_conflict_do_update(
+            index_elements=[IdempotencyKeyORM.key],
+            set_={
+                "fingerprint": claim.excluded.fingerprint,
+                "expires_at": claim.excluded.expires_at,
+                "status_code": None,
+                "body": None
+            },
+            where=IdempotencyKeyORM.expires_at <= func.now()
+        )
+        .returning(IdempotencyKeyORM.key)
+    )
+    return claimed.scalar() is not None
+
+
+async def save_response(
+        key: str,
+        fingerprint: str,
+        response: Response,
+        db: AsyncSession
+) -> None:
+    """Сохраняет ответ; он станет виден вместе с коммитом самой операции"""
+
+    await db.execute(
+        update(IdempotencyKeyORM)
+        .where(IdempotencyKeyORM.key == key)
+        .values(
+            fingerprint=fingerprint,
+            status_code=response.status_code,
+            body=response.body
+        )
+    )
+
+
+def replay_response(
+        stored: tuple[str, int, bytes] | None,
+        fingerprint: str
+) -> Response:
+    """Возвращает сохраненный ответ, если ключ пришел с тем же запросом"""
+
+    if stored is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A request with this Idempotency-Key is in progress."
+        )
+
+    stored_fingerprint, status_code, body = stored
+
+    if stored_fingerprint != fingerprint:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Idempotency-Key was used with a different request."
+        )
+
+    return Response(
+        content=body,
+        status_code=status_code,
+        media_type="application/json",
+        headers={"Idempotent-Replayed": "true"}
+    )
+
+
+def idempotent(handler: Callable) -> Callable:
+    """
+        Делает обработчик идемпотентным по заголовку Idempotency-Key.
+        Обработчик должен принимать сессию в параметре db: ключ и ответ
+        пишутся в ту же транзакцию, что и сама операция.
+        Если обработчик сам принимает Request, используется этот параметр,
+        иначе Request добавляется в сигнатуру только для декоратора.
+        Такой обработчик читает тело потоком, поэтому тело не буферизуется:
+        оно хэшируется по частям при чтении (request.state.body_digest),
+        и полный отпечаток сохраняется вместе с ответом.
+        Без заголовка обработчик работает как раньше.
+    """
+
+    signature = inspect.signature(handler)
+    request_name = next(
+        (
+            x.name for x in signature.parameters.values()
+            if x.annotation is Request
+        ),
+        None
+    )
+    parameters = [
+        inspect.Parameter(
+            "idempotency_key",
+            inspect.Parameter.KEYWORD_ONLY,
+            annotation=IdempotencyKeyHeader,
+            default=None
+        )
+    ]
+
+    if request_name is None:
+        parameters.insert(
+            0,
+            inspect.Parameter(
+                "request",
+                inspect.Parameter.KEYWORD_ONLY,
+                annotation=Request
+            )
+        )
+
+    @wraps(handler)
+    async def wrapper(
+            *args,
+            idempotency_key: IdempotencyKeyHeader = None,
+            **kwargs
+    ):
+
+        request: Request = kwargs[request_name] if request_name \
+            else kwargs.pop("request")
+
+        if idempotency_key is None:
+            return await handler(*args, **kwargs)
+
+        db: AsyncSession = kwargs["db"]
+        streamed = request_name is not None
+
+        stored = await get_stored_response(idempotency_key, db)
+        if stored:
+            fingerprint = await read_fingerprint(request, streamed)
+            return replay_response(stored, fingerprint)
+
+        if streamed:
+            # Тело еще не прочитано: ключ занимается с отпечатком без тела,
+            # параллельный запрос увидит только сохраненный вместе с ответом
+            body_digest = request.state.body_digest = hashlib.sha256()
+            fingerprint = request_fingerprint(request, b"")
+        else:
+            fingerprint = await read_fingerprint(request, streamed)
+
+        if not await claim_key(idempotency_key, fingerprint, db):
+            stored = await get_stored_response(idempotency_key, db)
+            if stored:
+                fingerprint = await read_fingerprint(request, streamed)
+            return replay_response(stored, fingerprint)
+
+        response = await handler(*args, **kwargs)
+
+        if not isinstance(response, Response):
+            response = JSONResponse(jsonable_encoder(response))
+
+        if streamed:
+            fingerprint = request_fingerprint(request, body_digest.digest())
+
+        await save_response(idempotency_key, fingerprint, response, db)
+        return response
+
+    wrapper.__signature__ = signature.replace(
+        parameters=(*signature.parameters.values(), *parameters)
+    )
+
+    return wrapper
+
+
+async def delete_expired_keys(
+        db: AsyncSession
+) -> bool:
+    """
+        Удаляет истекшие ключи порциями по IdempotencyConfig.SWEEP_BATCH.
+        Возвращает True если порция полная.
+    """
+
+    expired = (
+        select(IdempotencyKeyORM.key)
+        .where(IdempotencyKeyORM.expires_at <= func.now())
+        .limit(IdempotencyConfig.SWEEP_BATCH)
+        .with_for_update(skip_locked=True)
+    )
+
+    deleted = await db.execute(
+        delete(IdempotencyKeyORM)
+        .where(IdempotencyKeyORM.key.in_(expired))
+    )
+    return deleted.rowcount >= IdempotencyConfig.SWEEP_BATCH
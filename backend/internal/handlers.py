@@ -0,0 +1,24 @@
+from fastapi import APIRouter
+
+from .schemas import PoolStatsResponse
+
+from auth.services import UserStatusISOwner
+from databases.pool import pool_snapshot
+from databases.sqlalchemy import engine
+from databases.replicas import replica_engines
+
+
+internal_router = APIRouter()
+
+
+@internal_router.get(
+    "/pool",
+    dependencies=[UserStatusISOwner]
+)
+async def get_pool_stats() -> dict[str, PoolStatsResponse]:
+    """Возвращает состояние пулов соединений этого воркера: primary и реплики"""
+
+    return {
+        x.pool.logging_name: PoolStatsResponse(**pool_snapshot(x.pool))
+        for x in (engine, *replica_engines)
+    }
@@ -0,0 +1,21 @@
+from pydantic import BaseModel
+
+
+class HistogramResponse(BaseModel):
+    """Накопленная гистограмма: число значений не больше границы le"""
+
+    buckets: dict[str, int]
+    count: int
+    sum: float
+
+
+class PoolStatsResponse(BaseModel):
+    """Состояние пула соединений процесса"""
+
+    size: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+    timeouts: int
+    acquire: HistogramResponse  # Получение соединения, секунды
+    wait: HistogramResponse  # Получение при пустом пуле, секунды
@@ -0,0 +1,85 @@
+import json
+from uuid import UUID
+from pydantic_core import to_json
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import ItemORM
+from .events import STOCK_CHANNEL
+from .reservations import available_quantity
+
+from shops.models import ShopItemsORM
+from caches import TTLCache
+from config import CatalogConfig
+from databases.notify import listener
+from databases.sqlalchemy import rows_to_dicts
+from databases.pagination import PageParams, paginate, split_page
+
+
+catalog_cache = TTLCache(CatalogConfig.CACHE_SIZE, CatalogConfig.TTL)
+shop_versions: dict[UUID, int] = {}
+
+
+def bump_shop_version(shop_id: UUID) -> None:
+    """
+        Сдвигает версию каталога магазина в этом процессе.
+        Старые страницы становятся недоступны и вытесняются LRU.
+    """
+
+    shop_versions[shop_id] = shop_versions.get(shop_id, 0) + 1
+
+
+def invalidate_from_stock_event(payload: str) -> None:
+    """
+        Сдвигает версию по событию остатков из любого воркера, включая этот.
+        PostgreSQL доставляет событие только после коммита, поэтому страница,
+        собранная до него, не попадет в кэш под новой версией.
+    """
+
+    bump_shop_version(UUID(json.loads(payload)["shop_id"]))
+
+
+listener.subscribe(STOCK_CHANNEL, invalidate_from_stock_event)
+
+
+async def get_shop_catalog_page(
+        shop_id: UUID,
+        page: PageParams,
+        db: AsyncSession
+) -> bytes:
+    """
+        Возвращает страницу каталога магазина в виде готового JSON.
+        Ключ кэша содержит версию магазина, прочитанную до запроса,
+        поэтому страница, собранная во время записи, не переживет ее.
+    """
+
+    key = (shop_id, shop_versions.get(shop_id, 0), page.cursor, page.limit)
+    content = catalog_cache.get(key)
+
+    if content is not None:
+        return content
+
+    item_id = ShopItemsORM.item_id.label("id")
+    order = (item_id,)
+    items = await db.execute(
+        paginate(
+            select(
+                item_id,
+                ItemORM.name,
+                available_quantity().label("quantity")
+            )
+            .join(ItemORM, ItemORM.id == ShopItemsORM.item_id)
+            .where(ShopItemsORM.shop_id == shop_id),
+            order,
+            page
+        )
+    )
+    items, next_cursor = split_page(items.all(), order, page)
+
+    content = to_json(
+        {"items": rows_to_dicts(items), "next_cursor": next_cursor}
+    )
+
+    catalog_cache.set(key, content)
+    return content
@@ -0,0 +1,296 @@
+import random
+import asyncio
+from uuid import UUID
+from functools import wraps
+from typing import Callable
+from fastapi import HTTPException, status
+
+from sqlalchemy import Integer, Uuid, select, insert, update, delete, \
+    values, column, func
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import ItemSoldORM
+from .feed import publish_stock_changes
+from .rollup import add_daily_sales
+from shops.models import ShopItemsORM, ShopQueueORM, ShopCartORM
+from shops.schemas import ShopCartShortage
+from config import CheckoutConfig
+
+
+RETRY_SQLSTATES = {
+    "40001",  # serialization_failure
+    "40P01"  # deadlock_detected
+}
+
+
+async def pop_cart_lines(
+        user_id: UUID,
+        shop_id: UUID,
+        db: AsyncSession
+) -> dict[UUID, int]:
+    """Удаляет корзину одним запросом и возвращает её позиции"""
+
+    lines = await db.execute(
+        delete(ShopCartORM)
+        .where(
+            (ShopCartORM.shop_id == shop_id)
+            & (ShopCartORM.user_id == user_id)
+        )
+        .returning(ShopCartORM.item_id, ShopCartORM.quantity)
+    )
+    return dict(lines.tuples().all())
+
+
+async def decrement_stock(
+        shop_id: UUID,
+        lines: dict[UUID, int],
+        db: AsyncSession
+) -> list:
+    """
+        Превращает резерв корзины в продажу одним UPDATE:
+        списывает остаток и снимает резерв по всем позициям.
+        Строка списывается только если резерв на месте,
+        поэтому по возвращенным строкам видно какие позиции прошли.
+    """
+
+    cart = values(
+        column("item_id", Uuid),
+        column("quantity", Integer),
+        name="cart"
+    ).data(list(lines.items()))
+
+    sold = await db.execute(
+        update(ShopItemsORM)
+        .where(
+            (ShopItemsORM.shop_id == shop_id)
+            & (ShopItemsORM.item_id == cart.c.item_id)
+            & (ShopItemsORM.reserved >= cart.c.quantity)
+        )
+        .values(
+            quantity=ShopItemsORM.quantity - cart.c.quantity,
+            reserved=ShopItemsORM.reserved - cart.c.quantity
+        )
+        .returning(
+            ShopItemsORM.item_id,
+            ShopItemsORM.price,
+            ShopItemsORM.purchase_price,
+            ShopItemsORM.quantity
+        )
+    )
+    return sold.all()
+
+
+async def raise_cart_shortage(
+        shop_id: UUID,
+        lines: dict[UUID, int],
+        db: AsyncSession
+) -> None:
+    """
+        Поднимает 409 со списком всех позиций, которых не хватает.
+        Принимает только позиции, которые не удалось списать.
+        Корзина покупателя к этому моменту уже удалена, поэтому в остатке
+        вычитается только резерв чужих корзин: то, что осталось от резерва
+        самой позиции, покупателю доступно.
+    """
+
+    others = (
+        select(func.sum(ShopCartORM.quantity))
+        .where(
+            (ShopCartORM.item_id == ShopItemsORM.item_id)
+            & (ShopCartORM.shop_id == ShopItemsORM.shop_id)
+        )
+        .correlate(ShopItemsORM)
+        .scalar_subquery()
+    )
+
+    stock = await db.execute(
+        select(
+            ShopItemsORM.item_id,
+            ShopItemsORM.quantity - func.least(
+                ShopItemsORM.reserved,
+                func.coalesce(others, 0)
+            )
+        )
+        .where(
+            (ShopItemsORM.shop_id == shop_id)
+            & (ShopItemsORM.item_id.in_(lines))
+        )
+    )
+    stock = dict(stock.tuples().all())
+
+    raise HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail=[
+            ShopCartShortage(
+                item_id=item_id,
+                requested=quantity,
+                available=stock.get(item_id, 0)
+            ).model_dump(mode="json")
+            for item_id, quantity in lines.items()
+        ]
+    )
+
+
+async def promote_shop_queue(
+        shop_id: UUID,
+        item_ids: list[UUID],
+        db: AsyncSession
+) -> list[UUID]:
+    """
+        Переносит в магазин первую партию из очереди
+        для всех закончившихся товаров одним запросом
+    """
+
+    queue = (
+        select(
+            ShopQueueORM.item_id,
+            ShopQueueORM.shop_id,
+            ShopQueueORM.created_at
+        )
+        .where(
+            (ShopQueueORM.shop_id == shop_id)
+            & (ShopQueueORM.item_id.in_(item_ids))
+        )
+        .distinct(ShopQueueORM.item_id)
+        .order_by(ShopQueueORM.item_id, ShopQueueORM.created_at.asc())
+        .cte("queue")
+    )
+    promoted = (
+        delete(ShopQueueORM)
+        .where(
+            (ShopQueueORM.item_id == queue.c.item_id)
+            & (ShopQueueORM.shop_id == queue.c.shop_id)
+            & (ShopQueueORM.created_at == queue.c.created_at)
+        )
+        .returning(
+            ShopQueueORM.item_id,
+            ShopQueueORM.price,
+            ShopQueueORM.quantity,
+            ShopQueueORM.purchase_price
+        )
+        .cte("promoted")
+    )
+
+    items = await db.execute(
+        update(ShopItemsORM)
+        .where(
+            (ShopItemsORM.shop_id == shop_id)
+            & (ShopItemsORM.item_id == promoted.c.item_id)
+        )
+        .values(
+            price=promoted.c.price,
+            quantity=promoted.c.quantity,
+            purchase_price=promoted.c.purchase_price
+        )
+        .returning(ShopItemsORM.item_id)
+        .execution_options(synchronize_session=False)
+    )
+    return items.scalars().all()
+
+
+async def run_checkout(
+        user_id: UUID,
+        shop_id: UUID,
+        db: AsyncSession
+) -> None:
+    """
+        Проводит покупку всей корзины за постоянное число запросов:
+        удаление корзины, списание остатков, вставка продаж,
+        обновление дневной сводки, перенос очереди для закончившихся товаров
+        и событие об изменении остатков.
+        Откат при нехватке товара делает get_db.
+    """
+
+    lines = await pop_cart_lines(user_id, shop_id, db)
+
+    if not lines:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="The shopping cart is empty."
+        )
+
+    sold = await decrement_stock(shop_id, lines, db)
+
+    if len(sold) != len(lines):
+        passed = {item.item_id for item in sold}
+        await raise_cart_shortage(
+            shop_id,
+            {k: v for k, v in lines.items() if k not in passed},
+            db
+        )
+
+    sales = [
+        dict(
+            item_id=item.item_id,
+            user_id=user_id,
+            shop_id=shop_id,
+            price=item.price,
+            quantity=lines[item.item_id],
+            income=(item.price - item.purchase_price) * lines[item.item_id]
+        )
+        for item in sold
+    ]
+
+    await db.execute(insert(ItemSoldORM).values(sales))
+    await add_daily_sales(shop_id, sales, db)
+
+    sold_out = [item.item_id for item in sold if item.quantity == 0]
+
+    if sold_out:
+        await promote_shop_queue(shop_id, sold_out, db)
+
+    await publish_stock_changes(shop_id, list(lines), db)
+
+
+def is_retryable(ex: DBAPIError) -> bool:
+    """Проверяет что ошибку можно исправить повтором транзакции"""
+
+    return getattr(ex.orig, "sqlstate", None) in RETRY_SQLSTATES
+
+
+def retry_delay(attempt: int) -> float:
+    """Возвращает паузу перед повтором: экспонента с jitter"""
+
+    delay = min(
+        CheckoutConfig.RETRY_BACKOFF_MAX,
+        CheckoutConfig.RETRY_BACKOFF * 2 ** attempt
+    )
+    return delay * random.uniform(0.5, 1)
+
+
+def retry_checkout(handler: Callable) -> Callable:
+    """
+        Повторяет обработчик покупки целиком в новой транзакции
+        при serialization failure или deadlock,
+        не больше CheckoutConfig.RETRIES раз.
+        SAVEPOINT тут не помогает: после такой ошибки PostgreSQL
+        требует отката всей транзакции. Ставится над @idempotent,
+        чтобы ключ идемпотентности занимался заново вместе с покупкой.
+        Обработчик должен принимать сессию в параметре db.
+    """
+
+    @wraps(handler)
+    async def wrapper(*args, **kwargs):
+
+        db: AsyncSession = kwargs["db"]
+
+        for attempt in range(CheckoutConfig.RETRIES + 1):
+            try:
+                return await handler(*args, **kwargs)
+
+            except DBAPIError as ex:
+                if not is_retryable(ex):
+                    raise
+
+            await db.rollback()
+
+            if attempt < CheckoutConfig.RETRIES:
+                await asyncio.sleep(retry_delay(attempt))
+
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="The store is busy, try again."
+        )
+
+    return wrapper
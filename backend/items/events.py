@@ -0,0 +1,35 @@
+from sqlalchemy import ColumnElement, Text, func, cast, case
+
+
+STOCK_CHANNEL = "stock_changes"
+NOTIFY_MAX_ITEMS = 100  # pg_notify ограничен 8000 байт, больше – событие refresh
+
+
+def notify_stock_changes(
+        shop_id: ColumnElement,
+        item_id: ColumnElement,
+        quantity: ColumnElement
+) -> ColumnElement:
+    """
+        Возвращает агрегат pg_notify события остатков для строк,
+        сгруппированных по shop_id: {"shop_id", "items": [[item_id, quantity]]}.
+        Если товаров больше NOTIFY_MAX_ITEMS, items – null (перечитать каталог).
+        Подписчики получат событие после коммита.
+    """
+
+    return func.pg_notify(
+        STOCK_CHANNEL,
+        cast(
+            func.json_build_object(
+                "shop_id", shop_id,
+                "items", case(
+                    (
+                        func.count() <= NOTIFY_MAX_ITEMS,
+                        func.json_agg(func.json_build_array(item_id, quantity))
+                    ),
+                    else_=None
+                )
+            ),
+            Text
+        )
+    )
@@ -0,0 +1,88 @@
+import io
+import csv
+import json
+from uuid import UUID
+from datetime import date, timedelta
+from typing import AsyncIterator, Literal, Optional
+
+from sqlalchemy import Select, select
+
+from .models import ItemSoldORM
+
+from config import ExportConfig
+from databases.sqlalchemy import session_factory
+
+
+ExportFormat = Literal["csv", "ndjson"]
+
+media_types = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson"
+}
+
+sold_columns = (
+    ItemSoldORM.item_id,
+    ItemSoldORM.user_id,
+    ItemSoldORM.shop_id,
+    ItemSoldORM.price,
+    ItemSoldORM.quantity,
+    ItemSoldORM.income,
+    ItemSoldORM.created_at
+)
+
+
+def get_solds_query(
+        date_from: date,
+        date_to: date,
+        shop_id: Optional[UUID] = None
+) -> Select:
+    """Возвращает запрос продаж за период [date_from, date_to]"""
+
+    query = (
+        select(*sold_columns)
+        .where(
+            (ItemSoldORM.created_at >= date_from)
+            & (ItemSoldORM.created_at < date_to + timedelta(days=1))
+        )
+        .order_by(ItemSoldORM.created_at)
+    )
+
+    if shop_id:
+        query = query.where(ItemSoldORM.shop_id == shop_id)
+
+    return query
+
+
+def encode_rows(rows: list, export_format: ExportFormat) -> bytes:
+    """Кодирует порцию строк в CSV или NDJSON"""
+
+    if export_format == "ndjson":
+        return "".join(
+            json.dumps(row._asdict(), default=str) + "\n"
+            for row in rows
+        ).encode()
+
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue().encode()
+
+
+async def stream_solds(
+        query: Select,
+        export_format: ExportFormat
+) -> AsyncIterator[bytes]:
+    """
+        Отдает продажи порциями через server-side cursor.
+        Сессия своя: SessionDep закрывается раньше, чем уходит ответ.
+    """
+
+    if export_format == "csv":
+        yield encode_rows([[x.key for x in sold_columns]], export_format)
+
+    async with session_factory() as db:
+        rows = await db.stream(
+            query.execution_options(yield_per=ExportConfig.YIELD_PER)
+        )
+
+        async for partition in rows.partitions():
+            yield encode_rows(partition, export_format)
@@ -0,0 +1,128 @@
+import json
+import asyncio
+from uuid import UUID
+from typing import AsyncIterator, Optional
+
+from fastapi import Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .events import STOCK_CHANNEL, NOTIFY_MAX_ITEMS, notify_stock_changes
+from .reservations import available_quantity
+
+from shops.models import ShopItemsORM
+from config import FeedConfig
+from databases.notify import notify, listener
+
+
+async def publish_stock_changes(
+        shop_id: UUID,
+        item_ids: Optional[list[UUID]],
+        db: AsyncSession
+) -> None:
+    """
+        Отправляет событие об изменении остатков магазина.
+        Событие {"shop_id", "items": [[item_id, quantity], ...]} собирается
+        в SQL одним запросом. Если товаров много или item_ids None,
+        уходит {"shop_id", "items": null} – перечитать каталог.
+    """
+
+    if item_ids is not None and len(item_ids) <= NOTIFY_MAX_ITEMS:
+        await db.execute(
+            select(
+                notify_stock_changes(
+                    ShopItemsORM.shop_id,
+                    ShopItemsORM.item_id,
+                    available_quantity()
+                )
+            )
+            .where(
+                (ShopItemsORM.shop_id == shop_id)
+                & (ShopItemsORM.item_id.in_(item_ids))
+            )
+            .group_by(ShopItemsORM.shop_id)
+        )
+        return
+
+    await notify(
+        STOCK_CHANNEL,
+        json.dumps({"shop_id": str(shop_id), "items": None}),
+        db
+    )
+
+
+class StockFeed:
+    """
+        Раздает события остатков подписчикам магазина.
+        Подписчик, который не успевает читать, отключается:
+        его очередь очищается и получает None.
+    """
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self.__subscribers: dict[UUID, set[asyncio.Queue]] = {}
+
+
+    def subscribe(self, shop_id: UUID) -> asyncio.Queue:
+
+        queue = asyncio.Queue(self.queue_size)
+        self.__subscribers.setdefault(shop_id, set()).add(queue)
+        return queue
+
+
+    def unsubscribe(self, shop_id: UUID, queue: asyncio.Queue) -> None:
+
+        subscribers = self.__subscribers.get(shop_id, set())
+        subscribers.discard(queue)
+
+        if not subscribers:
+            self.__subscribers.pop(shop_id, None)
+
+
+    def dispatch(self, payload: str) -> None:
+
+        shop_id = UUID(json.loads(payload)["shop_id"])
+
+        for queue in list(self.__subscribers.get(shop_id, ())):
+            try:
+                queue.put_nowait(payload)
+
+            except asyncio.QueueFull:
+                self.unsubscribe(shop_id, queue)
+
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+
+
+stock_feed = StockFeed(FeedConfig.QUEUE_SIZE)
+listener.subscribe(STOCK_CHANNEL, stock_feed.dispatch)
+
+
+async def stream_stock_changes(
+        shop_id: UUID,
+        request: Request
+) -> AsyncIterator[str]:
+    """Отдает события остатков магазина в формате Server-Sent Events"""
+
+    queue = stock_feed.subscribe(shop_id)
+
+    try:
+        while not await request.is_disconnected():
+            try:
+                payload = await asyncio.wait_for(
+                    queue.get(),
+                    FeedConfig.KEEPALIVE
+                )
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+
+            if payload is None:
+                yield "event: dropped\ndata: {}\n\n"
+                break
+
+            yield f"event: stock\ndata: {payload}\n\n"
+
+    finally:
+        stock_feed.unsubscribe(shop_id, queue)
@@ -1,23 +1,35 @@
+from uuid import UUID
+from datetime import date
 from typing import Optional
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
 
-from sqlalchemy import insert, select, update, delete, func
-from sqlalchemy.orm import joinedload
+from sqlalchemy import BigInteger, insert, select, delete, func, cast
 from sqlalchemy.exc import IntegrityError
 
-from .models import ItemORM, ItemSoldORM
+from .models import ItemORM, SalesDailyORM
 from .schemas import ItemInitForm, ItemInitResponse, ItemDeleteForm, \
-    ItemResponse, ItemSoldResoinse, ItemShopForm, ItemQueueForm
-from .services import add_item_shop, get_item_in_cart, get_item_in_shop, \
-    get_items_quantity
-
-from shops.models import ShopItemsORM, ShopQueueORM, ShopCartORM
+    ItemResponse, ItemSoldResoinse, ItemShopForm, ItemQueueForm, \
+    ItemBulkResponse, ShopImportResponse
+from .services import add_item_shop, get_item_in_cart
+from .ingest import load_items, import_shop_stock
+from .export import ExportFormat, media_types, get_solds_query, stream_solds
+from .feed import stream_stock_changes, publish_stock_changes
+from .catalog import get_shop_catalog_page
+from .checkout import run_checkout, retry_checkout, pop_cart_lines
+from .reservations import add_to_cart, release_items, items_quantity
+
+from shops.models import ShopItemsORM, ShopCartORM
 from shops.schemas import ShopCartItemResponse, ShopCartItemForm
 
-from responses import ResponseOK, ResponseDescriptions, ResponseDescription
+from responses import ResponseOK, ResponseDescriptions, ResponseDescription, \
+    Page, FastJSONResponse
+from idempotency.services import idempotent
 from auth.services import CurrentShopID, CurrentUserID, UserStatusISOwner, \
     UserStatusISAdmin
-from databases.sqlalchemy import SessionDep, convert_query_to_list_dicts
+from databases.sqlalchemy import SessionDep, rows_to_dicts
+from databases.replicas import ReadSessionDep
+from databases.pagination import PageParamsDep, paginate, split_page
 
 
 items_router = APIRouter()
@@ -50,21 +62,66 @@ async def create_item(
     return ItemInitResponse(item_id=item_id.scalar())
 
 
+@items_router.post(
+    "/bulk",
+    dependencies=[UserStatusISAdmin],
+    openapi_extra={
+        "requestBody": {
+            "content": {
+                "text/csv": {"schema": {"type": "string"}},
+                "application/x-ndjson": {"schema": {"type": "string"}}
+            },
+            "required": True
+        }
+    },
+    responses=ResponseDescriptions((
+        ResponseDescription(
+            status_code=415,
+            description="Expected text/csv or application/x-ndjson body"
+        ),
+    ))
+)
+async def create_items_bulk(
+        request: Request,
+        db: SessionDep
+) -> ItemBulkResponse:
+    """
+        Создает карточки товаров из CSV (заголовок name) или NDJSON.
+        Строки с ошибками пропускаются и возвращаются в errors.
+    """
+
+    return await load_items(request, db)
+
+
 @items_router.get(
     "/",
-    dependencies=[UserStatusISAdmin]
+    dependencies=[UserStatusISAdmin],
+    response_model=Page[ItemResponse]
 )
 async def get_items(
-        db: SessionDep
-) -> list[Optional[ItemResponse]]:
-    """Возвращает все карточки товаров"""
+        page: PageParamsDep,
+        db: ReadSessionDep
+) -> FastJSONResponse:
+    """
+        Возвращает карточки товаров постранично, по имени.
+        Общий остаток по магазинам считается подзапросом только для
+        товаров страницы: GROUP BY по всему каталогу не дал бы
+        читать items по индексу (name, id).
+    """
 
+    order = (ItemORM.name, ItemORM.id)
     items = await db.execute(
-        select(ItemORM)
-        .options(joinedload(ItemORM.shop_items))
+        paginate(
+            select(ItemORM.id, ItemORM.name, items_quantity()),
+            order,
+            page
+        )
     )
+    items, next_cursor = split_page(items.all(), order, page)
 
-    return get_items_quantity(items.unique().scalars().all())
+    return FastJSONResponse(
+        {"items": rows_to_dicts(items), "next_cursor": next_cursor}
+    )
 
 
 @items_router.delete(
@@ -101,26 +158,67 @@ async def delete_item(
 
 @items_router.get(
     "/sold",
-    dependencies=[UserStatusISOwner]
+    dependencies=[UserStatusISOwner],
+    response_model=list[ItemSoldResoinse]
 )
 async def get_solds(
-        db: SessionDep,
-        offset: int = Query(0, ge=0),
-        limit: int = Query(7, ge=1, le=31)
-) -> list[Optional[ItemSoldResoinse]]:
-    """Возвращает статистику о продаже"""
-
-    sold_items = await db.execute(
+        db: ReadSessionDep,
+        date_from: date,
+        date_to: date,
+        shop_id: Optional[UUID] = None
+) -> FastJSONResponse:
+    """Возвращает статистику о продаже по дням из дневной сводки"""
+
+    query = (
         select(
-            func.date(ItemSoldORM.created_at).label("date"),
-            func.count().label("count"),
-            func.sum(ItemSoldORM.income).label("income")
+            SalesDailyORM.day.label("date"),
+            cast(func.sum(SalesDailyORM.count), BigInteger).label("count"),
+            cast(func.sum(SalesDailyORM.income), BigInteger).label("income")
         )
-        .group_by(func.date(ItemSoldORM.created_at))
-        .offset(offset)
-        .limit(limit)
+        .where(SalesDailyORM.day.between(date_from, date_to))
+        .group_by(SalesDailyORM.day)
+        .order_by(SalesDailyORM.day)
+    )
+
+    if shop_id:
+        query = query.where(SalesDailyORM.shop_id == shop_id)
+
+    sold_items = await db.execute(query)
+    return FastJSONResponse(rows_to_dicts(sold_items))
+
+
+@items_router.get(
+    "/sold/export",
+    dependencies=[UserStatusISOwner],
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "content": {
+                "text/csv": {},
+                "application/x-ndjson": {}
+            }
+        }
+    }
+)
+async def export_solds(
+        date_from: date,
+        date_to: date,
+        shop_id: Optional[UUID] = None,
+        export_format: ExportFormat = Query("csv", alias="format")
+) -> StreamingResponse:
+    """Выгружает сырые продажи за период потоком CSV или NDJSON"""
+
+    return StreamingResponse(
+        stream_solds(
+            get_solds_query(date_from, date_to, shop_id),
+            export_format
+        ),
+        media_type=media_types[export_format],
+        headers={
+            "Content-Disposition": "attachment; " \
+                f"filename=solds_{date_from}_{date_to}.{export_format}"
+        }
     )
-    return convert_query_to_list_dicts(ItemSoldResoinse, sold_items)
 
 
 @item_shop_route.post(
@@ -151,21 +249,43 @@ async def add_shop_item(
 
 
 @item_shop_route.get(
-    "/"
+    "/",
+    response_model=Page[ItemResponse]
 )
 async def get_shop_items(
         shop_id: CurrentShopID,
+        page: PageParamsDep,
         db: SessionDep
-) -> list[Optional[ItemResponse]]:
-    """Возвращает все товары которые есть в магазине"""
+) -> Response:
+    """Возвращает товары которые есть в магазине постранично (кэшируется)"""
 
-    items = await db.execute(
-        select(ShopItemsORM)
-        .options(joinedload(ShopItemsORM.item))
-        .where(ShopItemsORM.shop_id == shop_id)
+    return Response(
+        await get_shop_catalog_page(shop_id, page, db),
+        media_type="application/json"
     )
 
-    return get_items_quantity(items.unique().scalars().all())
+
+@item_shop_route.get(
+    "/feed",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"text/event-stream": {}}}}
+)
+async def get_shop_feed(
+        shop_id: CurrentShopID,
+        request: Request
+) -> StreamingResponse:
+    """
+        Поток изменений остатков магазина (Server-Sent Events).
+        Событие stock: {"shop_id", "items": [[item_id, quantity], ...]},
+        items null – перечитать каталог. Событие dropped – клиент не успевал
+        читать и был отключен, нужно перечитать каталог и переподключиться.
+    """
+
+    return StreamingResponse(
+        stream_stock_changes(shop_id, request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"}
+    )
 
 
 @item_shop_route.delete(
@@ -194,6 +314,7 @@ async def delete_shop_item(
                 & (ShopItemsORM.shop_id == shop_id)
             )
         )
+        await publish_stock_changes(shop_id, None, db)
         return ResponseOK(detail="item deleted")
 
     except IntegrityError:
@@ -220,6 +341,7 @@ async def delete_shop_item(
         )
     ))
 )
+@idempotent
 async def add_shop_queue(
         shop_id: CurrentShopID,
         form_data: ItemQueueForm,
@@ -233,6 +355,40 @@ async def add_shop_queue(
     return await add_item_shop(shop_id, form_data, db)
 
 
+@item_shop_route.post(
+    "/import",
+    dependencies=[UserStatusISAdmin],
+    openapi_extra={
+        "requestBody": {
+            "content": {
+                "text/csv": {"schema": {"type": "string"}},
+                "application/x-ndjson": {"schema": {"type": "string"}}
+            },
+            "required": True
+        }
+    },
+    responses=ResponseDescriptions((
+        ResponseDescription(
+            status_code=415,
+            description="Expected text/csv or application/x-ndjson body"
+        ),
+    ))
+)
+@idempotent
+async def import_shop_items(
+        shop_id: CurrentShopID,
+        request: Request,
+        db: SessionDep
+) -> ShopImportResponse:
+    """
+        Принимает поставку в магазин из CSV или NDJSON
+        (item_id, price, quantity, purchase_price).
+        Строки с ошибками пропускаются и возвращаются в errors.
+    """
+
+    return await import_shop_stock(shop_id, request, db)
+
+
 @item_cart_route.post(
     "/",
     status_code=201,
@@ -248,54 +404,33 @@ async def add_cart_item(
         shop_id: CurrentShopID,
         form_data: ShopCartItemForm,
         db: SessionDep
-) -> ResponseOK:
-    """Добавляет товар в корзину"""
-
-    item_id = form_data.item_id
-
-    item_cart = await get_item_in_cart(user_id, shop_id, item_id, db)
-    item_shop = await get_item_in_shop(item_id, shop_id, db)
-
-    if (
-        item_shop.quantity
-        - (item_cart.quantity if item_cart else 0)
-        - form_data.quantity
-        < 0
-    ):
-        raise HTTPException(
-            status_code=409,
-            detail="Exceed available quantity"
-        )
-
-    if item_cart:
-        await db.execute(
-            update(ShopCartORM)
-            .where(ShopCartORM.item_id == item_id)
-            .values(quantity=ShopCartORM.quantity + form_data.quantity)
-        )
+) -> ShopCartItemResponse:
+    """
+        Добавляет товар в корзину и резервирует его остаток одним запросом.
+        Возвращает количество товара в корзине после добавления.
+    """
 
-    else:
-        await db.execute(
-            insert(ShopCartORM)
-            .values(
-                shop_id=shop_id,
-                user_id=user_id,
-                **form_data.model_dump()
-            )
-        )
+    quantity = await add_to_cart(
+        user_id,
+        shop_id,
+        form_data.item_id,
+        form_data.quantity,
+        db
+    )
 
-    return ResponseOK(detail="item added to cart")
+    return ShopCartItemResponse(item_id=form_data.item_id, quantity=quantity)
 
 
 @item_cart_route.get(
     "/",
-    dependencies=[UserStatusISAdmin]
+    dependencies=[UserStatusISAdmin],
+    response_model=list[ShopCartItemResponse]
 )
 async def get_cart_items(
         user_id: CurrentUserID,
         shop_id: CurrentShopID,
         db: SessionDep
-) -> list[Optional[ShopCartItemResponse]]:
+) -> FastJSONResponse:
     """Возвращает товары из корзины"""
 
     cart = await db.execute(
@@ -305,7 +440,7 @@ async def get_cart_items(
             & (ShopCartORM.shop_id == shop_id)
         )
     )
-    return convert_query_to_list_dicts(ShopCartItemResponse, cart)
+    return FastJSONResponse(rows_to_dicts(cart))
 
 
 @item_cart_route.delete(
@@ -334,6 +469,13 @@ async def del_cart_item(
             detail="You can't delete an item from the cart."
         )
 
+    await release_items(
+        shop_id,
+        {item.item_id: min(item.quantity, form_data.quantity)},
+        db
+    )
+    await publish_stock_changes(shop_id, [item.item_id], db)
+
     if item.quantity - form_data.quantity > 0:
         item.quantity -= form_data.quantity
     else:
@@ -350,15 +492,11 @@ async def clear_cart(
         shop_id: CurrentShopID,
         db: SessionDep
 ) -> ResponseOK:
-    """Удаляет все товары из корзины"""
+    """Удаляет все товары из корзины и снимает их резерв"""
 
-    await db.execute(
-        delete(ShopCartORM)
-        .where(
-            (ShopCartORM.shop_id == shop_id)
-            & (ShopCartORM.user_id == user_id)
-        )
-    )
+    lines = await pop_cart_lines(user_id, shop_id, db)
+    await release_items(shop_id, lines, db)
+    await publish_stock_changes(shop_id, list(lines), db)
     return ResponseOK(detail="cleaned cart")
 
 
@@ -371,10 +509,17 @@ async def clear_cart(
         ),
         ResponseDescription(
             status_code=409,
-            description="There is not enough product in the store."
+            description="There is not enough product in the store. " \
+                "Detail lists every line that is short."
+        ),
+        ResponseDescription(
+            status_code=503,
+            description="The store is busy, try again."
         )
     ))
 )
+@retry_checkout
+@idempotent
 async def confirm_cart(
         user_id: CurrentUserID,
         shop_id: CurrentShopID,
@@ -382,87 +527,7 @@ async def confirm_cart(
 ) -> ResponseOK:
     """Подтверждает покупку"""
 
-    cart = await db.execute(
-        select(ShopCartORM)
-        .options(
-            joinedload(ShopCartORM.shop_items)
-        )
-        .where(
-            (ShopCartORM.user_id == user_id)
-            & (ShopCartORM.shop_id == shop_id)
-        )
-    )
-    cart = cart.scalars().all()
-
-    if bool(cart) is False:
-        raise HTTPException(
-            status_code=404,
-            detail="The shopping cart is empty."
-        )
-
-    try:
-        for cart_item in cart:
-            item: ShopItemsORM = cart_item.shop_items
-
-            try:
-                item.quantity -= cart_item.quantity
-            except:
-                raise HTTPException(
-                    status_code=409,
-                    detail="There is not enough product in the store."
-                )
-
-            await db.execute(
-                insert(ItemSoldORM)
-                .values(
-                    item_id = cart_item.item_id,
-                    user_id = cart_item.user_id,
-                    shop_id = cart_item.shop_id,
-                    price = item.price,
-                    quantity = cart_item.quantity,
-                    income = (item.price - item.purchase_price) * cart_item.quantity
-                )
-            )
-
-            if item.quantity == 0:
-
-                queue = await db.execute(
-                    select(ShopQueueORM)
-                    .where(
-                        (ShopQueueORM.shop_id == shop_id)
-                        & (ShopQueueORM.item_id == cart_item.item_id)
-                    )
-                    .order_by(ShopQueueORM.created_at.asc())
-                )
-                queue = queue.scalars().all()
-                queue = queue[0] if queue else None
-
-                if not queue:
-                    continue
-
-                await db.execute(
-                    update(ShopItemsORM)
-                    .values(
-                        price=queue.price,
-                        quantity=queue.quantity,
-                        purchase_price=queue.purchase_price
-                    )
-                    .where(ShopItemsORM.item_id == cart_item.item_id)
-                )
-                await db.delete(queue)
-
-        await db.execute(
-            delete(ShopCartORM)
-            .where(
-                (ShopCartORM.shop_id == shop_id)
-                & (ShopCartORM.user_id == user_id)
-            )
-        )
-
-    except Exception as ex:
-        await db.rollback()
-        raise ex
-
+    await run_checkout(user_id, shop_id, db)
     return ResponseOK(detail="purchase been confirmed")
 
 
@@ -0,0 +1,366 @@
+import io
+import csv
+import json
+import uuid
+from uuid import UUID
+from datetime import timedelta
+from typing import AsyncIterator, Type
+
+from fastapi import HTTPException, Request, status
+from pydantic import BaseModel, ValidationError
+
+from sqlalchemy import MetaData, Table, Column, Integer, Uuid, select, \
+    insert, delete, exists, literal, func
+from sqlalchemy.schema import CreateTable
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import ItemORM
+from .feed import publish_stock_changes
+from .schemas import ItemInitForm, ItemBulkResponse, ItemRowError, \
+    ItemShopForm, ShopImportResponse
+
+from shops.models import ShopItemsORM, ShopQueueORM
+from config import IngestConfig
+from databases.sqlalchemy import copy_records
+
+
+shop_import_table = Table(
+    "shop_import",
+    MetaData(),  # Отдельная MetaData, чтобы alembic не видел временную таблицу
+    Column("line", Integer, primary_key=True),
+    Column("item_id", Uuid, nullable=False),
+    Column("price", Integer, nullable=False),
+    Column("quantity", Integer, nullable=False),
+    Column("purchase_price", Integer, nullable=False),
+    prefixes=["TEMPORARY"],
+    postgresql_on_commit="DROP"
+)
+
+CSV_TYPES = ("text/csv",)
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson")
+
+
+async def iter_lines(
+        request: Request
+) -> AsyncIterator[str | UnicodeDecodeError]:
+    """
+        Читает тело запроса построчно, не держа его целиком в памяти.
+        Строки декодируются как utf-8-sig (BOM в начале файла пропускается),
+        вместо строки, которая не декодируется, – UnicodeDecodeError.
+        Если запрос идемпотентный, части тела добавляются
+        в request.state.body_digest по мере чтения.
+    """
+
+    buffer = b""
+    body_digest = getattr(request.state, "body_digest", None)
+
+    async for chunk in request.stream():
+        if body_digest is not None:
+            body_digest.update(chunk)
+
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+
+        for line in lines:
+            yield decode_line(line)
+
+    if buffer:
+        yield decode_line(buffer)
+
+
+def decode_line(line: bytes) -> str | UnicodeDecodeError:
+    """Декодирует строку тела, ошибку возвращает, а не поднимает"""
+
+    try:
+        return line.decode("utf-8-sig").rstrip("\r")
+    except UnicodeDecodeError as ex:
+        return ex
+
+
+async def iter_csv_rows(
+        lines: AsyncIterator[str | UnicodeDecodeError]
+) -> AsyncIterator[list[str] | ValueError]:
+    """
+        Собирает записи CSV из строк тела.
+        Поле в кавычках может содержать перенос строки: запись
+        продолжается, пока число кавычек в ней нечетное.
+    """
+
+    pending = []
+    quotes = 0
+
+    async for line in lines:
+        if isinstance(line, UnicodeDecodeError):
+            pending, quotes = [], 0
+            yield ValueError(f"invalid utf-8: {line.reason}")
+            continue
+
+        if not pending and not line.strip():
+            continue
+
+        pending.append(line)
+        quotes += line.count('"')
+
+        if quotes % 2:
+            continue
+
+        try:
+            row = next(csv.reader(io.StringIO("\n".join(pending))))
+        except csv.Error as ex:
+            row = ValueError(f"invalid csv: {ex}")
+
+        pending, quotes = [], 0
+        yield row
+
+    if pending:
+        yield ValueError("unterminated quoted field")
+
+
+async def iter_records(
+        request: Request
+) -> AsyncIterator[dict | ValueError]:
+    """
+        Возвращает строки CSV (первая строка – заголовок) или NDJSON
+        в виде dict. Вместо строки, которую нельзя разобрать, – ValueError.
+    """
+
+    content_type = request.headers.get("Content-Type", "").split(";")[0]
+
+    if content_type not in CSV_TYPES + NDJSON_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Expected text/csv or application/x-ndjson body"
+        )
+
+    lines = iter_lines(request)
+
+    if content_type in CSV_TYPES:
+        header = None
+
+        async for row in iter_csv_rows(lines):
+            if isinstance(row, ValueError):
+                yield row
+                continue
+
+            if header is None:
+                header = row
+                continue
+
+            if len(row) != len(header):
+                yield ValueError(
+                    f"expected {len(header)} columns, got {len(row)}"
+                )
+                continue
+
+            yield dict(zip(header, row))
+
+        return
+
+    async for line in lines:
+        if isinstance(line, UnicodeDecodeError):
+            yield ValueError(f"invalid utf-8: {line.reason}")
+            continue
+
+        if not line.strip():
+            continue
+
+        try:
+            row = json.loads(line)
+        except ValueError as ex:
+            yield ValueError(f"invalid json: {ex}")
+            continue
+
+        yield row if type(row) == dict \
+            else ValueError("expected json object")
+
+
+async def iter_forms(
+        request: Request,
+        schema: Type[BaseModel]
+) -> AsyncIterator[BaseModel | ItemRowError]:
+    """Проверяет каждую строку схемой, ошибки возвращает построчно"""
+
+    index = 0
+
+    async for record in iter_records(request):
+        try:
+            if isinstance(record, ValueError):
+                raise record
+
+            yield schema.model_validate(record)
+
+        except ValidationError as ex:
+            yield ItemRowError(
+                index=index,
+                detail="; ".join(
+                    f"{'.'.join(map(str, e['loc']))}: {e['msg']}"
+                    for e in ex.errors()
+                )
+            )
+
+        except ValueError as ex:
+            yield ItemRowError(index=index, detail=str(ex))
+
+        index += 1
+
+
+async def load_items(
+        request: Request,
+        db: AsyncSession
+) -> ItemBulkResponse:
+    """
+        Создает карточки товаров из потока CSV/NDJSON.
+        id генерируются заранее, поэтому их можно вернуть в порядке строк,
+        а строки загружаются бинарным COPY порциями.
+    """
+
+    item_ids = []
+    errors = []
+    chunk = []
+
+    async for form in iter_forms(request, ItemInitForm):
+        if isinstance(form, ItemRowError):
+            errors.append(form)
+            item_ids.append(None)
+            continue
+
+        item_id = uuid.uuid4()
+        item_ids.append(item_id)
+        chunk.append((item_id, form.name))
+
+        if len(chunk) >= IngestConfig.COPY_CHUNK_SIZE:
+            await copy_records(db, ItemORM.__tablename__, ["id", "name"], chunk)
+            chunk = []
+
+    if chunk:
+        await copy_records(db, ItemORM.__tablename__, ["id", "name"], chunk)
+
+    return ItemBulkResponse(item_ids=item_ids, errors=errors)
+
+
+async def stage_shop_import(
+        request: Request,
+        db: AsyncSession
+) -> list[ItemRowError]:
+    """Загружает накладную во временную таблицу бинарным COPY"""
+
+    await db.execute(CreateTable(shop_import_table))
+
+    columns = [x.name for x in shop_import_table.columns]
+    errors = []
+    chunk = []
+    line = 0
+
+    async for form in iter_forms(request, ItemShopForm):
+        if isinstance(form, ItemRowError):
+            errors.append(form)
+        else:
+            chunk.append((
+                line,
+                form.item_id,
+                form.price,
+                form.quantity,
+                form.purchase_price
+            ))
+
+        line += 1
+
+        if len(chunk) >= IngestConfig.COPY_CHUNK_SIZE:
+            await copy_records(db, shop_import_table.name, columns, chunk)
+            chunk = []
+
+    if chunk:
+        await copy_records(db, shop_import_table.name, columns, chunk)
+
+    return errors
+
+
+async def import_shop_stock(
+        shop_id: UUID,
+        request: Request,
+        db: AsyncSession
+) -> ShopImportResponse:
+    """
+        Принимает поставку в магазин целиком.
+        Первая строка по товару, которого нет в магазине, добавляет его,
+        остальные строки ставятся в очередь в порядке накладной.
+    """
+
+    stage = shop_import_table
+    errors = await stage_shop_import(request, db)
+
+    unknown = await db.execute(
+        delete(stage)
+        .where(~exists().where(ItemORM.id == stage.c.item_id))
+        .returning(stage.c.line)
+    )
+    errors += [
+        ItemRowError(index=line, detail="item not found")
+        for line in unknown.scalars()
+    ]
+
+    fresh = (
+        select(stage)
+        .where(
+            ~exists().where(
+                (ShopItemsORM.item_id == stage.c.item_id)
+                & (ShopItemsORM.shop_id == shop_id)
+            )
+        )
+        .distinct(stage.c.item_id)
+        .order_by(stage.c.item_id, stage.c.line)
+        .cte("fresh")
+    )
+    shop_rows = (
+        insert(ShopItemsORM)
+        .from_select(
+            ["item_id", "shop_id", "price", "quantity", "purchase_price"],
+            select(
+                fresh.c.item_id,
+                literal(shop_id, Uuid),
+                fresh.c.price,
+                fresh.c.quantity,
+                fresh.c.purchase_price
+            )
+        )
+        .returning(ShopItemsORM.item_id)
+        .cte("shop_rows")
+    )
+    queue_rows = (
+        insert(ShopQueueORM)
+        .from_select(
+            [
+                "item_id", "shop_id", "price", "quantity",
+                "purchase_price", "created_at"
+            ],
+            select(
+                stage.c.item_id,
+                literal(shop_id, Uuid),
+                stage.c.price,
+                stage.c.quantity,
+                stage.c.purchase_price,
+                # Уникальный created_at в пределах поставки и порядок строк
+                func.now() + stage.c.line * timedelta(microseconds=1)
+            )
+            .where(stage.c.line.not_in(select(fresh.c.line)))
+        )
+        .returning(ShopQueueORM.item_id)
+        .cte("queue_rows")
+    )
+
+    counts = await db.execute(
+        select(
+            select(func.count()).select_from(shop_rows).scalar_subquery(),
+            select(func.count()).select_from(queue_rows).scalar_subquery()
+        )
+    )
+    inserted, queued = counts.one()
+
+    if inserted:
+        await publish_stock_changes(shop_id, None, db)
+
+    return ShopImportResponse(
+        inserted=inserted,
+        queued=queued,
+        errors=sorted(errors, key=lambda x: x.index)
+    )
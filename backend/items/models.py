@@ -2,7 +2,7 @@ import uuid
 import datetime
 
 from sqlalchemy import String, BigInteger, ForeignKey, CheckConstraint, \
-    PrimaryKeyConstraint, func
+    PrimaryKeyConstraint, Index, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from databases.sqlalchemy import Base
@@ -20,6 +20,10 @@ class ItemORM(Base):
     items_sold = relationship("ItemSoldORM", back_populates="item")
     shop_items = relationship("ShopItemsORM", back_populates="item")
 
+    __table_args__ = (
+        Index("ix_items_name_id", name, id),
+    )
+
 
 class ItemSoldORM(Base):
     __tablename__ = "items_sold"
@@ -39,5 +43,37 @@ class ItemSoldORM(Base):
     __table_args__ = (
         PrimaryKeyConstraint(item_id, user_id, shop_id, created_at),
         CheckConstraint("price > 0", name="check_price_positive"),
-        CheckConstraint("quantity > 0", name="check_quantity_positive")
+        CheckConstraint("quantity > 0", name="check_quantity_positive"),
+        Index(
+            "ix_items_sold_created_at",
+            created_at,
+            postgresql_using="brin"
+        ),
+        Index("ix_items_sold_shop_id_created_at", shop_id, created_at),
+        {
+            # Секции по месяцам ведет items/partitions.py
+            "postgresql_partition_by": "RANGE (created_at)"
+        }
+    )
+
+
+class SalesDailyORM(Base):
+    """Продажи за день по товару в магазине, ведется при покупке"""
+
+    __tablename__ = "sales_daily"
+
+    shop_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("shops.id"))
+    day: Mapped[datetime.date] = mapped_column()
+    item_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("items.id"))
+    count: Mapped[int]  # Количество строк продаж
+    quantity: Mapped[int] = mapped_column(BigInteger)
+    income: Mapped[int] = mapped_column(BigInteger)
+
+    __table_args__ = (
+        PrimaryKeyConstraint(shop_id, day, item_id),
+        Index(
+            "ix_sales_daily_day",
+            day,
+            postgresql_include=["count", "income"]
+        )
     )
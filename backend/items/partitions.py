@@ -0,0 +1,218 @@
+import re
+import asyncio
+from datetime import date
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncConnection
+
+from .models import ItemSoldORM
+
+from config import PartitionConfig
+from databases.sqlalchemy import engine, session_factory
+
+
+TABLE = ItemSoldORM.__tablename__
+DEFAULT_PARTITION = f"{TABLE}_default"  # Продажи вне секций по месяцам
+
+
+def add_months(month: date, months: int) -> date:
+    """Сдвигает первое число месяца на months месяцев"""
+
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    """Возвращает имя секции за месяц: items_sold_YYYY_MM"""
+
+    return f"{TABLE}_{month:%Y_%m}"
+
+
+async def lock_partitions(db: AsyncSession) -> None:
+    """Не дает нескольким воркерам менять секции одновременно"""
+
+    await db.execute(
+        text("SELECT pg_advisory_xact_lock(hashtext(:name))"),
+        {"name": f"{TABLE}_partitions"}
+    )
+
+
+async def list_partitions(db: AsyncSession | AsyncConnection) -> dict[str, bool]:
+    """
+        Возвращает секции items_sold: имя -> отключение не завершено
+        (DETACH ... CONCURRENTLY был прерван)
+    """
+
+    partitions = await db.execute(
+        text(
+            "SELECT c.relname, i.inhdetachpending FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = CAST(:table AS regclass)"
+        ),
+        {"table": TABLE}
+    )
+    return dict(partitions.tuples().all())
+
+
+async def create_sales_partition(
+        db: AsyncSession,
+        month: date
+) -> None:
+    """
+        Создает секцию за месяц.
+        Продажи этого месяца, успевшие попасть в DEFAULT, переносятся
+        в новую секцию: пока они там, PostgreSQL не даст ее подключить.
+    """
+
+    name = partition_name(month)
+    start, end = month, add_months(month, 1)
+
+    await db.execute(text(
+        f"CREATE TABLE {name} "
+        f"(LIKE {TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+    ))
+    await db.execute(text(
+        f"WITH moved AS ("
+        f"DELETE FROM {DEFAULT_PARTITION} "
+        f"WHERE created_at >= '{start}' AND created_at < '{end}' "
+        f"RETURNING *"
+        f") INSERT INTO {name} SELECT * FROM moved"
+    ))
+    await db.execute(text(
+        f"ALTER TABLE {TABLE} ATTACH PARTITION {name} "
+        f"FOR VALUES FROM ('{start}') TO ('{end}')"
+    ))
+
+
+async def create_sales_partitions(
+        db: AsyncSession,
+        months_ahead: int = PartitionConfig.MONTHS_AHEAD
+) -> list[str]:
+    """Создает недостающие секции с текущего месяца на months_ahead вперед"""
+
+    current = date.today().replace(day=1)
+    partitions = await list_partitions(db)
+    created = []
+
+    for months in range(months_ahead + 1):
+        month = add_months(current, months)
+
+        if partition_name(month) not in partitions:
+            await create_sales_partition(db, month)
+            created.append(partition_name(month))
+
+    return created
+
+
+async def detach_sales_partitions(
+        keep_months: int = PartitionConfig.KEEP_MONTHS
+) -> list[str]:
+    """
+        Отключает от items_sold секции старше keep_months месяцев.
+        Таблицы остаются в базе, их можно выгрузить в архив и удалить.
+
+        DETACH ... CONCURRENTLY не блокирует чтение и запись, но работает
+        только вне транзакции и не разрешен, пока у таблицы есть DEFAULT.
+        Поэтому DEFAULT на это время отключается и подключается обратно;
+        его отключение ждет блокировку не дольше PartitionConfig.LOCK_TIMEOUT.
+        Продажи за текущий месяц в DEFAULT не попадают – секция уже есть.
+    """
+
+    cutoff = add_months(date.today().replace(day=1), -keep_months)
+
+    async with engine.connect() as connection:
+        connection = await connection.execution_options(
+            isolation_level="AUTOCOMMIT"
+        )
+        lock = {"name": f"{TABLE}_partitions"}
+
+        if not await connection.scalar(
+            text("SELECT pg_try_advisory_lock(hashtext(:name))"),
+            lock
+        ):
+            return []  # Секциями занимается другой воркер
+
+        try:
+            partitions = await list_partitions(connection)
+
+            for name, pending in partitions.items():
+                if pending:
+                    await connection.execute(text(
+                        f"ALTER TABLE {TABLE} DETACH PARTITION {name} FINALIZE"
+                    ))
+
+            detached = sorted(
+                name for name, pending in partitions.items()
+                if not pending
+                and re.fullmatch(rf"{TABLE}_\d{{4}}_\d{{2}}", name)
+                and name < partition_name(cutoff)
+            )
+
+            if detached:
+                await detach_concurrently(connection, detached)
+
+            return detached
+
+        finally:
+            await connection.execute(
+                text("SELECT pg_advisory_unlock(hashtext(:name))"),
+                lock
+            )
+
+
+async def detach_concurrently(
+        connection: AsyncConnection,
+        names: list[str]
+) -> None:
+    """Отключает секции CONCURRENTLY, на это время отключив DEFAULT"""
+
+    await connection.execute(text(
+        f"SET lock_timeout = {PartitionConfig.LOCK_TIMEOUT}"
+    ))
+    try:
+        await connection.execute(text(
+            f"ALTER TABLE {TABLE} DETACH PARTITION {DEFAULT_PARTITION}"
+        ))
+    finally:
+        await connection.execute(text("RESET lock_timeout"))
+
+    try:
+        for name in names:
+            await connection.execute(text(
+                f"ALTER TABLE {TABLE} DETACH PARTITION {name} CONCURRENTLY"
+            ))
+    finally:
+        await connection.execute(text(
+            f"ALTER TABLE {TABLE} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"
+        ))
+
+
+async def maintain_sales_partitions(
+        db: AsyncSession
+) -> bool:
+    """
+        Создает будущие секции и отключает старые, если задан KEEP_MONTHS.
+        Отключение идет после коммита: CONCURRENTLY ждет завершения
+        всех транзакций, которые видят секцию, включая эту.
+    """
+
+    await lock_partitions(db)
+    await create_sales_partitions(db)
+    await db.commit()
+
+    if PartitionConfig.KEEP_MONTHS:
+        await detach_sales_partitions()
+
+    return False
+
+
+async def main() -> None:
+    """Обслуживание секций: python -m items.partitions"""
+
+    async with session_factory() as db:
+        await maintain_sales_partitions(db)
+        await db.commit()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,226 @@
+from uuid import UUID
+from datetime import timedelta
+from fastapi import HTTPException, status
+
+from sqlalchemy import Integer, Uuid, select, update, delete, func, \
+    values, column, literal
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import ItemORM
+from .events import notify_stock_changes
+
+from shops.models import ShopItemsORM, ShopCartORM
+from config import ReservationConfig
+
+
+def reservation_expires_at():
+    """Возвращает SQL выражение времени окончания резерва"""
+
+    return func.now() + timedelta(seconds=ReservationConfig.TTL)
+
+
+def available_quantity():
+    """Возвращает SQL выражение доступного остатка без резерва корзин"""
+
+    return ShopItemsORM.quantity - ShopItemsORM.reserved
+
+
+def items_quantity():
+    """
+        Возвращает подзапрос общего доступного остатка товара
+        по всем магазинам, коррелированный с items
+    """
+
+    return (
+        select(func.coalesce(func.sum(available_quantity()), 0))
+        .where(ShopItemsORM.item_id == ItemORM.id)
+        .correlate(ItemORM)
+        .scalar_subquery()
+        .label("quantity")
+    )
+
+
+async def add_to_cart(
+        user_id: UUID,
+        shop_id: UUID,
+        item_id: UUID,
+        quantity: int,
+        db: AsyncSession
+) -> int:
+    """
+        Резервирует товар и добавляет его в корзину одним запросом:
+        UPDATE резерва с проверкой доступного остатка в CTE,
+        INSERT ... ON CONFLICT DO UPDATE позиции корзины и pg_notify
+        события остатков (подписчики получат его после коммита).
+        Если остатка не хватает, CTE пустой и позиция не меняется – 409.
+        Возвращает новое количество товара в корзине.
+    """
+
+    reserved = (
+        update(ShopItemsORM)
+        .where(
+            (ShopItemsORM.item_id == item_id)
+            & (ShopItemsORM.shop_id == shop_id)
+            & (available_quantity() >= quantity)
+        )
+        .values(reserved=ShopItemsORM.reserved + quantity)
+        .returning(
+            ShopItemsORM.item_id,
+            ShopItemsORM.shop_id,
+            available_quantity().label("quantity")
+        )
+        .cte("reserved")
+    )
+    line = insert(ShopCartORM).from_select(
+        ["shop_id", "user_id", "item_id", "quantity", "expires_at"],
+        select(
+            reserved.c.shop_id,
+            literal(user_id, Uuid),
+            reserved.c.item_id,
+            literal(quantity, Integer),
+            reservation_expires_at()
+        )
+    )
+    line = (
+        line.on_conflict_do_update(
+            index_elements=[
+                ShopCartORM.shop_id,
+                ShopCartORM.user_id,
+                ShopCartORM.item_id
+            ],
+            set_={
+                "quantity": ShopCartORM.quantity + line.excluded.quantity,
+                "expires_at": line.excluded.expires_at
+            }
+        )
+        .returning(ShopCartORM.quantity)
+        .cte("line")
+    )
+    # SELECT-CTE без ссылки не выполняется, поэтому pg_notify –
+    # в подзапросе итоговой строки: событие уходит только вместе с позицией
+    notified = (
+        select(
+            notify_stock_changes(
+                reserved.c.shop_id,
+                reserved.c.item_id,
+                reserved.c.quantity
+            )
+        )
+        .group_by(reserved.c.shop_id)
+        .scalar_subquery()
+    )
+    cart_quantity = await db.scalar(select(line.c.quantity, notified))
+
+    if cart_quantity is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Exceed available quantity"
+        )
+
+    return cart_quantity
+
+
+async def release_items(
+        shop_id: UUID,
+        lines: dict[UUID, int],
+        db: AsyncSession
+) -> None:
+    """Снимает резерв с товаров магазина одним UPDATE"""
+
+    if not lines:
+        return
+
+    cart = values(
+        column("item_id", Uuid),
+        column("quantity", Integer),
+        name="cart"
+    ).data(list(lines.items()))
+
+    await db.execute(
+        update(ShopItemsORM)
+        .where(
+            (ShopItemsORM.shop_id == shop_id)
+            & (ShopItemsORM.item_id == cart.c.item_id)
+        )
+        .values(reserved=ShopItemsORM.reserved - cart.c.quantity)
+    )
+
+
+async def release_expired_reservations(
+        db: AsyncSession
+) -> bool:
+    """
+        Удаляет из корзин истекшие позиции, снимает их резерв
+        и отправляет событие остатков по каждому затронутому магазину.
+        Обрабатывает не больше ReservationConfig.SWEEP_BATCH позиций,
+        заблокированные строки пропускает. Возвращает True если batch полный.
+    """
+
+    expired = (
+        select(
+            ShopCartORM.shop_id,
+            ShopCartORM.user_id,
+            ShopCartORM.item_id
+        )
+        .where(ShopCartORM.expires_at <= func.now())
+        .limit(ReservationConfig.SWEEP_BATCH)
+        .with_for_update(skip_locked=True)
+        .cte("expired")
+    )
+    released = (
+        delete(ShopCartORM)
+        .where(
+            (ShopCartORM.shop_id == expired.c.shop_id)
+            & (ShopCartORM.user_id == expired.c.user_id)
+            & (ShopCartORM.item_id == expired.c.item_id)
+        )
+        .returning(
+            ShopCartORM.shop_id,
+            ShopCartORM.item_id,
+            ShopCartORM.quantity
+        )
+        .cte("released")
+    )
+    totals = (
+        select(
+            released.c.shop_id,
+            released.c.item_id,
+            func.sum(released.c.quantity).label("quantity"),
+            func.count().label("lines")
+        )
+        .group_by(released.c.shop_id, released.c.item_id)
+        .subquery("totals")
+    )
+
+    items = (
+        update(ShopItemsORM)
+        .where(
+            (ShopItemsORM.shop_id == totals.c.shop_id)
+            & (ShopItemsORM.item_id == totals.c.item_id)
+        )
+        .values(reserved=ShopItemsORM.reserved - totals.c.quantity)
+        .returning(
+            ShopItemsORM.shop_id,
+            ShopItemsORM.item_id,
+            available_quantity().label("quantity"),
+            totals.c.lines
+        )
+        .cte("items")
+    )
+
+    # Событие остатков по каждому магазину: по нему кэш каталога
+    # и подписчики feed узнают о снятом резерве после коммита
+    shops = await db.execute(
+        select(
+            notify_stock_changes(
+                items.c.shop_id,
+                items.c.item_id,
+                items.c.quantity
+            ),
+            func.sum(items.c.lines).label("lines")
+        )
+        .group_by(items.c.shop_id)
+    )
+
+    return sum(x.lines for x in shops) >= ReservationConfig.SWEEP_BATCH
@@ -0,0 +1,106 @@
+import asyncio
+from uuid import UUID
+from typing import Optional
+from datetime import date
+
+from sqlalchemy import select, delete, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import ItemSoldORM, SalesDailyORM
+
+from databases.sqlalchemy import session_factory
+from users.models import UserORM  # noqa
+from shops.models import ShopORM  # noqa
+
+
+async def add_daily_sales(
+        shop_id: UUID,
+        sales: list[dict],
+        db: AsyncSession
+) -> None:
+    """
+        Добавляет продажи в дневную сводку одним upsert.
+        sales – строки с item_id, quantity и income.
+    """
+
+    excluded = insert(SalesDailyORM).excluded
+
+    await db.execute(
+        insert(SalesDailyORM)
+        .values([
+            dict(
+                shop_id=shop_id,
+                day=func.current_date(),
+                item_id=x["item_id"],
+                count=1,
+                quantity=x["quantity"],
+                income=x["income"]
+            )
+            for x in sales
+        ])
+        .on_conflict_do_update(
+            index_elements=[
+                SalesDailyORM.shop_id,
+                SalesDailyORM.day,
+                SalesDailyORM.item_id
+            ],
+            set_=dict(
+                count=SalesDailyORM.count + excluded.count,
+                quantity=SalesDailyORM.quantity + excluded.quantity,
+                income=SalesDailyORM.income + excluded.income
+            )
+        )
+    )
+
+
+async def rebuild_sales_daily(
+        db: AsyncSession,
+        date_from: Optional[date] = None
+) -> None:
+    """Пересчитывает дневную сводку из items_sold начиная с date_from"""
+
+    day = func.date(ItemSoldORM.created_at)
+
+    rebuilt = delete(SalesDailyORM)
+    sold = select(
+        ItemSoldORM.shop_id,
+        day,
+        ItemSoldORM.item_id,
+        func.count(),
+        func.sum(ItemSoldORM.quantity),
+        func.sum(ItemSoldORM.income)
+    )
+
+    if date_from:
+        rebuilt = rebuilt.where(SalesDailyORM.day >= date_from)
+        sold = sold.where(ItemSoldORM.created_at >= date_from)
+
+    await db.execute(rebuilt)
+    await db.execute(
+        insert(SalesDailyORM)
+        .from_select(
+            ["shop_id", "day", "item_id", "count", "quantity", "income"],
+            sold.group_by(ItemSoldORM.shop_id, day, ItemSoldORM.item_id)
+        )
+    )
+
+
+async def main(date_from: Optional[date] = None) -> None:
+    """
+        Backfill: python -m items.rollup [YYYY-MM-DD]
+        Продажи, которые идут во время пересчета, могут не попасть в сводку,
+        поэтому текущий день лучше пересчитывать при закрытых кассах.
+    """
+
+    async with session_factory() as db:
+        await rebuild_sales_daily(db, date_from)
+        await db.commit()
+
+
+if __name__ == "__main__":
+    import sys
+
+    asyncio.run(
+        main(date.fromisoformat(sys.argv[1]) if len(sys.argv) > 1 else None)
+    )
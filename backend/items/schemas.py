@@ -1,4 +1,5 @@
 from uuid import UUID
+from typing import Optional
 from datetime import date
 from pydantic import BaseModel, ConfigDict, Field
 
@@ -17,6 +18,20 @@ class ItemInitResponse(BaseModel):
     item_id: UUID
 
 
+class ItemRowError(BaseModel):
+    """Ошибка в строке загружаемого файла"""
+
+    index: int  # Номер строки данных, начиная с 0
+    detail: str
+
+
+class ItemBulkResponse(BaseModel):
+    """Схема ответа массовой загрузки товаров"""
+
+    item_ids: list[Optional[UUID]]  # В порядке строк, None если строка с ошибкой
+    errors: list[ItemRowError]
+
+
 class ItemDeleteForm(BaseModel):
     """Форма удаления items"""
 
@@ -49,6 +64,14 @@ class ItemShopForm(BaseModel):
 
 
 
+class ShopImportResponse(BaseModel):
+    """Схема ответа приемки поставки в магазин"""
+
+    inserted: int  # Новых товаров в магазине
+    queued: int  # Партий поставлено в очередь
+    errors: list[ItemRowError]
+
+
 class ItemQueueForm(ItemShopForm):
     """Форма создания продукта"""
 
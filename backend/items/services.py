@@ -5,51 +5,13 @@ from sqlalchemy import insert, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from .models import ItemORM
-from .schemas import ItemSchema, ItemResponse, ItemShopForm, ItemQueueForm
+from .schemas import ItemShopForm, ItemQueueForm
+from .feed import publish_stock_changes
 
 from responses import ResponseOK
 from shops.models import ShopItemsORM, ShopQueueORM, ShopCartORM
 
 
-def get_items_quantity(
-        items: list[ItemORM | ShopItemsORM]
-) -> list[ItemResponse]:
-    """
-        Возвращает список информации о товаре и его общем количестве.
-        Внутри происходит подсчет количества
-    """
-
-    response = []
-
-    for item in items:
-
-        if type(item) == ItemORM:
-            item_data = item
-            quantity = sum(
-                shop.quantity
-                for shop in item.shop_items
-            )
-
-        elif type(item) == ShopItemsORM:
-            item_data = item.item
-            quantity = item.quantity
-
-        else:
-            raise ValueError(
-                "the processing of calculating the quantity of goods " \
-                "in get_items_quantity was not found."
-            )
-
-        response.append(
-            ItemResponse(
-                **ItemSchema.model_validate(item_data).model_dump(),
-                quantity=quantity
-            )
-        )
-
-    return response
-
-
 async def check_item_exists(
         item_id: UUID,
         db: AsyncSession
@@ -112,6 +74,9 @@ async def add_item_shop(
         .values(**form_data.model_dump(), shop_id=shop_id)
     )
 
+    if not item_exists:
+        await publish_stock_changes(shop_id, [item_id], db)
+
     return ResponseOK(
         status_code=202 if item_exists else 201,
         detail=f"Item added to {'queue' if item_exists else 'shop'}"
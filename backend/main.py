@@ -1,17 +1,32 @@
+import asyncio
 from typing import get_type_hints
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, APIRouter
 from fastapi.routing import BaseRoute
 from fastapi.dependencies.models import Dependant
 from responses import ResponseOK, TextResponse, \
     ResponseDescriptions, ResponseDescription
 
-from config import Config
+from config import Config, ReservationConfig, IdempotencyConfig, \
+    PartitionConfig
 from auth.handlers import auth_router
 from users.handlers import users_router
 from shops.handlers import shops_router
 from items.handlers import items_router
+from internal.handlers import internal_router
+from metrics.handlers import metrics_router
+from metrics.middleware import MetricsMiddleware
+from databases.profiling import QueryStatsMiddleware
+from databases.pinning import PinningMiddleware
 
 from auth.services import check_user_min_status
+from items.reservations import release_expired_reservations
+from items.partitions import maintain_sales_partitions
+from idempotency.services import delete_expired_keys
+from databases.tasks import run_periodic
+from databases.notify import listener
+from databases.slowlog import setup_slow_query_log, dispose_explain_engines
+from auth.jwt import keyset
 
 
 root_router = APIRouter()
@@ -36,6 +51,17 @@ root_router.include_router(
     prefix="/items",
     tags=["Items"]
 )
+root_router.include_router(
+    internal_router,
+    prefix="/internal",
+    tags=["Internal"],
+    include_in_schema=Config.DEBUG
+)
+root_router.include_router(
+    metrics_router,
+    tags=["Metrics"],
+    include_in_schema=Config.DEBUG
+)
 
 
 def openapi_depends(route: BaseRoute,  dep: Dependant) -> None:
@@ -77,8 +103,48 @@ def openapi_prestart() -> None:
         openapi_depends(route, route.__dict__["dependant"])
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Запускает фоновые задачи на время работы приложения"""
+
+    setup_slow_query_log()
+    tasks = [
+        asyncio.create_task(listener.run()),
+        asyncio.create_task(keyset.run_reload()),
+        asyncio.create_task(
+            run_periodic(
+                release_expired_reservations,
+                ReservationConfig.SWEEP_INTERVAL
+            )
+        ),
+        asyncio.create_task(
+            run_periodic(
+                delete_expired_keys,
+                IdempotencyConfig.SWEEP_INTERVAL
+            )
+        ),
+        asyncio.create_task(
+            run_periodic(
+                maintain_sales_partitions,
+                PartitionConfig.INTERVAL
+            )
+        ),
+    ]
+
+    yield
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await dispose_explain_engines()
+
+
 openapi_prestart()
 app = FastAPI(
-    debug=Config.DEBUG
+    debug=Config.DEBUG,
+    lifespan=lifespan
 )
 app.include_router(root_router)
+app.add_middleware(PinningMiddleware)
+app.add_middleware(QueryStatsMiddleware)
+app.add_middleware(MetricsMiddleware)
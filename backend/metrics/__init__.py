@@ -0,0 +1,49 @@
+from bisect import bisect_left
+
+
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1, 2.5, 5, 10
+)  # Секунды
+
+
+class Histogram:
+    """
+        Гистограмма с фиксированными границами корзин.
+        Значение попадает в первую корзину, граница которой не меньше его.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Последняя – +Inf
+        self.count = 0
+        self.sum = 0.0
+
+
+    def observe(self, value: float) -> None:
+
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+
+    def cumulative(self) -> list[tuple[str, int]]:
+        """Возвращает накопленные значения по корзинам (le, count)"""
+
+        result = []
+        total = 0
+
+        for bound, count in zip((*self.buckets, "+Inf"), self.counts):
+            total += count
+            result.append((str(bound), total))
+
+        return result
+
+
+    def snapshot(self) -> dict:
+
+        return {
+            "buckets": dict(self.cumulative()),
+            "count": self.count,
+            "sum": self.sum
+        }
@@ -0,0 +1,148 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from .prometheus import Exposition
+from .middleware import MetricsMiddleware
+from .services import MetricsAccess
+
+from items.catalog import catalog_cache
+from shops.services import access_cache
+from auth.jwt import claims_cache
+from idempotency.services import responses_cache
+from security.users import hash_pool
+from databases.pool import pool_snapshot
+from databases.sqlalchemy import engine
+from databases.replicas import replica_engines
+
+
+metrics_router = APIRouter()
+
+caches = {
+    "catalog": catalog_cache,
+    "shop_access": access_cache,
+    "jwt_claims": claims_cache,
+    "idempotency": responses_cache
+}
+
+
+def collect_http(exposition: Exposition) -> None:
+
+    routes = [
+        ({"method": method, "route": route}, stats)
+        for (method, route), stats in MetricsMiddleware.routes.items()
+    ]
+
+    exposition.counter(
+        "http_requests_total",
+        "Запросы по шаблону маршрута",
+        [(labels, x.requests) for labels, x in routes]
+    )
+    exposition.counter(
+        "http_request_errors_total",
+        "Ответы 5xx и исключения по шаблону маршрута",
+        [(labels, x.errors) for labels, x in routes]
+    )
+    exposition.histogram(
+        "http_request_duration_seconds",
+        "Время ответа по шаблону маршрута",
+        [(labels, x.latency) for labels, x in routes]
+    )
+    exposition.gauge(
+        "http_requests_in_flight",
+        "Запросы в обработке",
+        [({}, MetricsMiddleware.in_flight)]
+    )
+
+
+def collect_pools(exposition: Exposition) -> None:
+
+    pools = [
+        ({"pool": x.pool.logging_name}, x.pool)
+        for x in (engine, *replica_engines)
+    ]
+    snapshots = [(labels, pool_snapshot(x)) for labels, x in pools]
+
+    for field in ("size", "checked_in", "checked_out", "overflow"):
+        exposition.gauge(
+            f"db_pool_{field}",
+            f"Пул соединений: {field}",
+            [(labels, x[field]) for labels, x in snapshots]
+        )
+
+    exposition.counter(
+        "db_pool_timeouts_total",
+        "Не дождались соединения из пула",
+        [(labels, x["timeouts"]) for labels, x in snapshots]
+    )
+    exposition.histogram(
+        "db_pool_acquire_seconds",
+        "Время получения соединения из пула",
+        [(labels, x.stats.acquire) for labels, x in pools]
+    )
+    exposition.histogram(
+        "db_pool_wait_seconds",
+        "Время получения соединения, когда свободных не было",
+        [(labels, x.stats.wait) for labels, x in pools]
+    )
+
+
+def collect_hashing(exposition: Exposition) -> None:
+
+    exposition.gauge(
+        "password_hash_waiting",
+        "Хэширования паролей в очереди пула bcrypt",
+        [({}, hash_pool.waiting)]
+    )
+    exposition.gauge(
+        "password_hash_running",
+        "Хэширования паролей в работе",
+        [({}, hash_pool.running)]
+    )
+    exposition.counter(
+        "password_hash_completed_total",
+        "Завершенные хэширования паролей",
+        [({}, hash_pool.completed)]
+    )
+    exposition.counter(
+        "password_hash_rejected_total",
+        "Хэширования, отклоненные из-за полной очереди",
+        [({}, hash_pool.rejected)]
+    )
+
+
+def collect_caches(exposition: Exposition) -> None:
+
+    exposition.counter(
+        "cache_hits_total",
+        "Попадания в кэш процесса",
+        [({"cache": name}, x.hits) for name, x in caches.items()]
+    )
+    exposition.counter(
+        "cache_misses_total",
+        "Промахи кэша процесса",
+        [({"cache": name}, x.misses) for name, x in caches.items()]
+    )
+    exposition.gauge(
+        "cache_entries",
+        "Записей в кэше процесса",
+        [({"cache": name}, len(x)) for name, x in caches.items()]
+    )
+
+
+@metrics_router.get(
+    "/metrics",
+    dependencies=[MetricsAccess],
+    response_class=PlainTextResponse
+)
+async def get_metrics() -> PlainTextResponse:
+    """Возвращает метрики этого воркера в формате Prometheus"""
+
+    exposition = Exposition()
+
+    for collect in (collect_http, collect_pools, collect_hashing, collect_caches):
+        collect(exposition)
+
+    return PlainTextResponse(
+        exposition.render(),
+        media_type="text/plain; version=0.0.4"
+    )
@@ -0,0 +1,68 @@
+import time
+
+from metrics import Histogram
+
+
+class RouteStats:
+    """Запросы, ошибки и время ответа одного маршрута"""
+
+    __slots__ = ("requests", "errors", "latency")
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.latency = Histogram()
+
+
+class MetricsMiddleware:
+    """
+        ASGI middleware, считает запросы по шаблону маршрута
+        (scope["route"].path, который выставляет роутер FastAPI),
+        а не по фактическому пути, чтобы число рядов не росло.
+        Ошибка – ответ 5xx или исключение.
+    """
+
+    routes: dict[tuple[str, str], RouteStats] = {}
+    in_flight = 0
+
+    def __init__(self, app):
+        self.app = app
+
+
+    async def __call__(self, scope, receive, send):
+
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        cls = MetricsMiddleware
+        cls.in_flight += 1
+        started = time.perf_counter()
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+
+        finally:
+            elapsed = time.perf_counter() - started
+            cls.in_flight -= 1
+
+            route = scope.get("route")
+            key = (scope["method"], getattr(route, "path", "unmatched"))
+            stats = cls.routes.get(key)
+
+            if stats is None:
+                stats = cls.routes[key] = RouteStats()
+
+            stats.requests += 1
+            stats.latency.observe(elapsed)
+
+            if status_code >= 500:
+                stats.errors += 1
@@ -0,0 +1,91 @@
+from typing import Iterable
+
+from metrics import Histogram
+
+
+def format_labels(labels: dict[str, str]) -> str:
+    """Возвращает {name="value",...} с экранированием значений"""
+
+    if not labels:
+        return ""
+
+    pairs = (
+        "{}=\"{}\"".format(
+            name,
+            str(value).replace("\\", "\\\\").replace("\"", "\\\"")
+        )
+        for name, value in labels.items()
+    )
+    return "{" + ",".join(pairs) + "}"
+
+
+class Exposition:
+    """Собирает метрики в текстовом формате Prometheus"""
+
+    def __init__(self):
+        self.lines: list[str] = []
+
+
+    def __header(self, name: str, kind: str, description: str) -> None:
+
+        self.lines.append(f"# HELP {name} {description}")
+        self.lines.append(f"# TYPE {name} {kind}")
+
+
+    def __samples(
+            self,
+            name: str,
+            samples: Iterable[tuple[dict, float]]
+    ) -> None:
+
+        self.lines.extend(
+            f"{name}{format_labels(labels)} {value}"
+            for labels, value in samples
+        )
+
+
+    def counter(
+            self,
+            name: str,
+            description: str,
+            samples: Iterable[tuple[dict, float]]
+    ) -> None:
+
+        self.__header(name, "counter", description)
+        self.__samples(name, samples)
+
+
+    def gauge(
+            self,
+            name: str,
+            description: str,
+            samples: Iterable[tuple[dict, float]]
+    ) -> None:
+
+        self.__header(name, "gauge", description)
+        self.__samples(name, samples)
+
+
+    def histogram(
+            self,
+            name: str,
+            description: str,
+            samples: Iterable[tuple[dict, Histogram]]
+    ) -> None:
+
+        self.__header(name, "histogram", description)
+
+        for labels, histogram in samples:
+            self.__samples(
+                f"{name}_bucket",
+                (
+                    ({**labels, "le": le}, count)
+                    for le, count in histogram.cumulative()
+                )
+            )
+            self.__samples(f"{name}_sum", [(labels, histogram.sum)])
+            self.__samples(f"{name}_count", [(labels, histogram.count)])
+
+
+    def render(self) -> str:
+        return "\n".join(self.lines) + "\n"
@@ -0,0 +1,28 @@
+import hmac
+
+from fastapi import Depends
+
+from auth.services import oauth2_schema, get_token_data, get_user_status, \
+    check_user_min_status
+from users.schemas import UserStatus
+from config import MetricsConfig
+
+
+def check_metrics_access(token: str = Depends(oauth2_schema)) -> None:
+    """
+        Пускает к метрикам Prometheus по METRICS_TOKEN
+        или владельца по его JWT
+    """
+
+    if MetricsConfig.TOKEN and hmac.compare_digest(
+        token.encode(),
+        MetricsConfig.TOKEN.encode()
+    ):
+        return
+
+    check_user_min_status(UserStatus.OWNER)(
+        get_user_status(get_token_data(token))
+    )
+
+
+MetricsAccess = Depends(check_metrics_access)
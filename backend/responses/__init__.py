@@ -1,15 +1,35 @@
-from typing import Type, TypeVar, Optional, Iterator
+from typing import Any, Type, TypeVar, Generic, Optional, Iterator
 from pydantic import BaseModel, model_validator
+from pydantic_core import to_json
 from fastapi.responses import JSONResponse
 
 
 RESPONSE_MODEL = TypeVar("MODEL", bound=BaseModel)
+PAGE_ITEM = TypeVar("PAGE_ITEM")
 
 
 class TextResponse(BaseModel):
     detail: str
 
 
+class Page(BaseModel, Generic[PAGE_ITEM]):
+    """Страница списка и курсор следующей страницы"""
+
+    items: list[PAGE_ITEM]
+    next_cursor: Optional[str] = None
+
+
+class FastJSONResponse(JSONResponse):
+    """
+        Ответ из уже готовых данных (dict, list, строки запроса).
+        Сериализуется pydantic_core без jsonable_encoder и без повторной
+        проверки response_model – модель указывается в декораторе для схемы.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return to_json(content)
+
+
 class ResponseOK(JSONResponse):
 
     def __init__(
@@ -17,9 +37,8 @@ class ResponseOK(JSONResponse):
         detail: str,
         status_code: int = 200,
     ):
-        # content = BaseResponseContent(detail) if type(detail) == str else detail
         super().__init__(
-            TextResponse(detail=detail).model_dump(),
+            {"detail": detail},
             status_code, None, None, None
         )
 
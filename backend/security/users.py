@@ -1,4 +1,77 @@
+import asyncio
+import threading
+from typing import Callable, TypeVar
+from concurrent.futures import ThreadPoolExecutor
+
 import bcrypt
+from fastapi import HTTPException, status
+
+from config import SecurityConfig
+
+
+RESULT = TypeVar("RESULT")
+
+
+class HashPool:
+    """
+        Отдельный пул потоков для bcrypt, чтобы хэширование
+        не останавливало event loop. Число потоков ограничивает
+        одновременные хэширования, остальные ждут в очереди.
+        Очередь ограничена max_waiting: сверх нее запрос получает 503
+        сразу, а не ждет, пока пройдут все хэши перед ним.
+    """
+
+    def __init__(self, workers: int, max_waiting: int):
+        self.workers = workers
+        self.max_waiting = max_waiting
+        self.waiting = 0  # Глубина очереди
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.__lock = threading.Lock()
+        self.__executor = ThreadPoolExecutor(
+            workers,
+            thread_name_prefix="bcrypt"
+        )
+
+
+    def __call(self, func: Callable[..., RESULT], *args) -> RESULT:
+
+        with self.__lock:
+            self.waiting -= 1
+            self.running += 1
+
+        try:
+            return func(*args)
+
+        finally:
+            with self.__lock:
+                self.running -= 1
+                self.completed += 1
+
+
+    async def run(self, func: Callable[..., RESULT], *args) -> RESULT:
+
+        with self.__lock:
+            if self.waiting >= self.max_waiting:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Too many password checks, try again.",
+                    headers={"Retry-After": "1"}
+                )
+
+            self.waiting += 1
+
+        return await asyncio.get_running_loop().run_in_executor(
+            self.__executor,
+            self.__call,
+            func,
+            *args
+        )
+
+
+hash_pool = HashPool(SecurityConfig.HASH_WORKERS, SecurityConfig.HASH_QUEUE)
 
 
 def hash_password(password: str) -> str:
@@ -6,7 +79,7 @@ def hash_password(password: str) -> str:
 
     return bcrypt.hashpw(
         password.encode(),
-        bcrypt.gensalt()
+        bcrypt.gensalt(SecurityConfig.BCRYPT_ROUNDS)
     ).decode()
 
 
@@ -20,3 +93,28 @@ def validate_hash_password(
         password.encode(),
         hashed_password.encode()
     )
+
+
+def needs_rehash(hashed_password: str) -> bool:
+    """Проверяет что хэш посчитан с другим числом раундов"""
+
+    return int(hashed_password.split("$")[2]) != SecurityConfig.BCRYPT_ROUNDS
+
+
+async def hash_password_async(password: str) -> str:
+    """Возвращает хэш пароля, считая его в пуле bcrypt"""
+
+    return await hash_pool.run(hash_password, password)
+
+
+async def validate_hash_password_async(
+        password: str,
+        hashed_password: str
+) -> bool:
+    """Проверяет хэш пароля в пуле bcrypt"""
+
+    return await hash_pool.run(
+        validate_hash_password,
+        password,
+        hashed_password
+    )
@@ -1,4 +1,3 @@
-from typing import Optional
 from fastapi import APIRouter, HTTPException
 
 from sqlalchemy import insert, select
@@ -9,10 +8,13 @@ from .schemas import ShopResponse, ShopCrateForm, ShopCrateResponse, \
 from .services import grant_shop_access, check_shop_access, \
     delete_shop_access
 
-from responses import ResponseOK, ResponseDescriptions, ResponseDescription
+from responses import ResponseOK, ResponseDescriptions, ResponseDescription, \
+    Page
 from auth.services import CurrentUserID, CurrentShopID, \
     UserStatusISOwner, UserStatusISWorker
 from databases.sqlalchemy import SessionDep
+from databases.replicas import ReadSessionDep
+from databases.pagination import PageParamsDep, paginate, split_page
 
 
 shops_router = APIRouter()
@@ -49,15 +51,19 @@ async def create_shop(
     dependencies=[UserStatusISOwner]
 )
 async def get_shops(
-        db: SessionDep
-) -> list[Optional[ShopResponse]]:
-    """Возвращает все магазины"""
-
-    shops = await db.execute(select(ShopORM))
-    return [
-        ShopResponse.model_validate(x)
-        for x in shops.scalars()
-    ]
+        page: PageParamsDep,
+        db: ReadSessionDep
+) -> Page[ShopResponse]:
+    """Возвращает магазины постранично, по дате создания"""
+
+    order = (ShopORM.created_at, ShopORM.id)
+    shops = await db.execute(paginate(select(ShopORM), order, page))
+    shops, next_cursor = split_page(shops.scalars().all(), order, page)
+
+    return Page(
+        items=[ShopResponse.model_validate(x) for x in shops],
+        next_cursor=next_cursor
+    )
 
 
 @shops_access_router.get(
@@ -1,7 +1,7 @@
 import uuid
 import datetime
 
-from sqlalchemy import String, ForeignKey, CheckConstraint, \
+from sqlalchemy import String, ForeignKey, CheckConstraint, Index, \
     PrimaryKeyConstraint, ForeignKeyConstraint, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -24,6 +24,10 @@ class ShopORM(Base):
     users = relationship("UserORM", "shop_access", back_populates="shops")
     shop_items = relationship("ShopItemsORM", back_populates="shop")
 
+    __table_args__ = (
+        Index("ix_shops_created_at_id", created_at, id),
+    )
+
 
 class ShopAccessORM(Base):
     __tablename__ = "shop_access"
@@ -38,6 +42,10 @@ class ShopAccessORM(Base):
         server_default=func.now()
     )
 
+    __table_args__ = (
+        Index("ix_shop_access_user_id_shop_id", user_id, shop_id),
+    )
+
 
 class ShopCartORM(Base):
     __tablename__ = "shop_cart"
@@ -46,6 +54,9 @@ class ShopCartORM(Base):
     user_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("users.id"))
     item_id: Mapped[uuid.UUID] = mapped_column()
     quantity: Mapped[int] = mapped_column(server_default="1")
+    expires_at: Mapped[datetime.datetime] = mapped_column(
+        server_default=func.now()
+    )  # Когда резерв товара в корзине истекает
 
     shop_items = relationship("ShopItemsORM", back_populates="cart")
 
@@ -55,7 +66,9 @@ class ShopCartORM(Base):
         ForeignKeyConstraint(
             ["item_id", "shop_id"],
             ["shop_items.item_id", "shop_items.shop_id"]
-        )
+        ),
+        Index("ix_shop_cart_expires_at", expires_at),
+        Index("ix_shop_cart_item_id_shop_id", item_id, shop_id)
     )
 
 
@@ -66,6 +79,7 @@ class ShopItemsORM(Base):
     shop_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("shops.id"))
     price: Mapped[int]
     quantity: Mapped[int]
+    reserved: Mapped[int] = mapped_column(server_default="0")  # В корзинах
     purchase_price: Mapped[int]
 
     item = relationship("ItemORM", back_populates="shop_items")
@@ -76,7 +90,14 @@ class ShopItemsORM(Base):
     __table_args__ = (
         PrimaryKeyConstraint(item_id, shop_id),
         CheckConstraint("price > 0", name="check_price_positive"),
-        CheckConstraint("quantity >= 0", name="check_quantity")
+        CheckConstraint("quantity >= 0", name="check_quantity"),
+        CheckConstraint(
+            "reserved >= 0 AND reserved <= quantity",
+            name="check_reserved"
+        ),
+        # Без quantity/reserved в индексе: они меняются на каждый резерв,
+        # и обновления остаются HOT
+        Index("ix_shop_items_shop_id_item_id", shop_id, item_id)
     )
 
 
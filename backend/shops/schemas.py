@@ -59,3 +59,11 @@ class ShopCartItemResponse(BaseModel):
 
     item_id: UUID
     quantity: int
+
+
+class ShopCartShortage(BaseModel):
+    """Позиция корзины, которой не хватает в магазине"""
+
+    item_id: UUID
+    requested: int
+    available: int
@@ -1,8 +1,45 @@
+import json
 from uuid import UUID
-from sqlalchemy import insert, select, delete
+from sqlalchemy import insert, select, delete, exists
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from .models import ShopAccessORM
+from caches import TTLCache
+from config import ShopAccessConfig
+from databases.notify import notify, listener
+
+
+ACCESS_CHANNEL = "shop_access_changes"
+
+access_cache = TTLCache(ShopAccessConfig.CACHE_SIZE, ShopAccessConfig.TTL)
+
+
+def drop_cached_access(payload: str) -> None:
+    """Удаляет решение о доступе из кэша по событию из любого воркера"""
+
+    data = json.loads(payload)
+    access_cache.pop((UUID(data["user_id"]), UUID(data["shop_id"])))
+
+
+listener.subscribe(ACCESS_CHANNEL, drop_cached_access)
+
+
+async def publish_access_change(
+        user_id: UUID,
+        shop_id: UUID,
+        db: AsyncSession
+) -> None:
+    """
+        Сбрасывает доступ в кэше процесса сразу,
+        а в остальных воркерах – после коммита
+    """
+
+    access_cache.pop((user_id, shop_id))
+    await notify(
+        ACCESS_CHANNEL,
+        json.dumps({"user_id": str(user_id), "shop_id": str(shop_id)}),
+        db
+    )
 
 
 async def grant_shop_access(
@@ -19,6 +56,7 @@ async def grant_shop_access(
             shop_id=shop_id
         )
     )
+    await publish_access_change(user_id, shop_id, db)
 
 
 async def check_shop_access(
@@ -38,6 +76,33 @@ async def check_shop_access(
     return access.scalar_one_or_none()
 
 
+async def has_shop_access(
+        user_id: UUID,
+        shop_id: UUID,
+        db: AsyncSession
+) -> bool:
+    """
+        Возвращает есть ли доступ к магазину.
+        Решение, в том числе отказ, кэшируется на ShopAccessConfig.TTL.
+    """
+
+    key = (user_id, shop_id)
+    access = access_cache.get(key)
+
+    if access is None:
+        access = await db.scalar(
+            select(
+                exists().where(
+                    (ShopAccessORM.user_id == user_id)
+                    & (ShopAccessORM.shop_id == shop_id)
+                )
+            )
+        )
+        access_cache.set(key, access)
+
+    return access
+
+
 async def delete_shop_access(
         user_id: UUID,
         shop_id: UUID,
@@ -49,6 +114,7 @@ async def delete_shop_access(
         delete(ShopAccessORM)
         .where(
             (ShopAccessORM.user_id == user_id)
-            % (ShopAccessORM.shop_id == shop_id)
+            & (ShopAccessORM.shop_id == shop_id)
         )
     )
+    await publish_access_change(user_id, shop_id, db)
@@ -0,0 +1,198 @@
+"""
+    Общие фикстуры тестов.
+
+    Тесты идут на живом PostgreSQL из переменных POSTGRESQL_*:
+    рядом с базой создается <POSTGRESQL_DATABASE>_test, на нее
+    накатываются миграции. Если сервер недоступен, тесты с базой
+    пропускаются. Бенчмарки (маркер benchmark) запускаются только
+    с флагом --benchmark, их результаты печатаются в конце прогона.
+
+    Запуск из backend/: python -m pytest tests [--benchmark]
+"""
+import os
+import sys
+import asyncio
+import subprocess
+from pathlib import Path
+
+import pytest
+from dotenv import load_dotenv
+
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+os.chdir(BACKEND_DIR)  # Config.BASE_DIR – текущая папка
+sys.path.insert(0, str(BACKEND_DIR))
+load_dotenv()
+
+MAINTENANCE_DATABASE = os.getenv("POSTGRESQL_DATABASE", "postgres")
+TEST_DATABASE = f"{MAINTENANCE_DATABASE}_test"
+
+os.environ["POSTGRESQL_DATABASE"] = TEST_DATABASE
+os.environ.setdefault("DEBUG", "False")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("SLOW_QUERY_THRESHOLD", "0")
+
+benchmark_results: list[str] = []
+
+
+def generate_jwt_keys() -> None:
+    """Создает ключи JWT для тестов, если их нет (они в .gitignore)"""
+
+    from cryptography.hazmat.primitives.asymmetric import ed25519
+    from cryptography.hazmat.primitives.serialization import Encoding, \
+        PrivateFormat, PublicFormat, NoEncryption
+
+    directory = Path(BACKEND_DIR, "auth", "jwt")
+    private_path = Path(directory, "private.pem")
+
+    if private_path.exists():
+        return
+
+    private_key = ed25519.Ed25519PrivateKey.generate()
+    private_path.write_bytes(
+        private_key.private_bytes(
+            Encoding.PEM,
+            PrivateFormat.PKCS8,
+            NoEncryption()
+        )
+    )
+    Path(directory, "public.pem").write_bytes(
+        private_key.public_key().public_bytes(
+            Encoding.PEM,
+            PublicFormat.SubjectPublicKeyInfo
+        )
+    )
+
+
+generate_jwt_keys()
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--benchmark",
+        action="store_true",
+        help="run benchmarks (marker benchmark)"
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "benchmark: long measurement, runs only with --benchmark"
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+
+    if config.getoption("--benchmark"):
+        return
+
+    skip = pytest.mark.skip(reason="benchmark, run with --benchmark")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
+
+
+def pytest_terminal_summary(terminalreporter):
+
+    if benchmark_results:
+        terminalreporter.section("benchmarks")
+        for line in benchmark_results:
+            terminalreporter.write_line(line)
+
+
+@pytest.fixture
+def report():
+    """Добавляет строку в сводку бенчмарков в конце прогона"""
+
+    return benchmark_results.append
+
+
+@pytest.fixture(scope="session")
+def anyio_backend():
+    return "asyncio"
+
+
+async def recreate_database() -> None:
+
+    import asyncpg
+    from config import PostgresSQLConfig
+
+    connection = await asyncpg.connect(
+        user=PostgresSQLConfig.USER,
+        password=PostgresSQLConfig.PASSWORD,
+        host=PostgresSQLConfig.HOST,
+        port=PostgresSQLConfig.PORT,
+        database=MAINTENANCE_DATABASE,
+        timeout=5
+    )
+    try:
+        await connection.execute(
+            f'DROP DATABASE IF EXISTS "{TEST_DATABASE}" WITH (FORCE)'
+        )
+        await connection.execute(f'CREATE DATABASE "{TEST_DATABASE}"')
+    finally:
+        await connection.close()
+
+
+@pytest.fixture(scope="session")
+def database() -> str:
+    """Создает пустую тестовую базу и накатывает на нее миграции"""
+
+    try:
+        asyncio.run(recreate_database())
+    except (OSError, asyncio.TimeoutError) as ex:
+        pytest.skip(f"PostgreSQL is not available: {ex}")
+
+    # Отдельным процессом: fileConfig из alembic.ini отключил бы
+    # логгеры приложения
+    subprocess.run(
+        [sys.executable, "-m", "alembic", "upgrade", "head"],
+        cwd=BACKEND_DIR,
+        check=True
+    )
+
+    return TEST_DATABASE
+
+
+@pytest.fixture(scope="session")
+def app(database):
+
+    from main import app
+
+    return app
+
+
+@pytest.fixture
+async def client(app):
+    """
+        HTTP клиент приложения без сети.
+        Пулы соединений закрываются после каждого теста:
+        у каждого теста свой event loop.
+    """
+
+    import httpx
+    from databases.sqlalchemy import engine
+    from databases.replicas import replica_engines
+
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(
+        transport=transport,
+        base_url="http://test"
+    ) as client:
+        yield client
+
+    for x in (engine, *replica_engines):
+        await x.dispose()
+
+
+@pytest.fixture
+async def db(client):
+    """Сессия для подготовки данных, коммитит сама"""
+
+    from databases.sqlalchemy import session_factory
+
+    async with session_factory() as session:
+        yield session
@@ -0,0 +1,163 @@
+"""Подготовка данных для тестов напрямую в базе, без HTTP"""
+from uuid import UUID, uuid4
+
+from sqlalchemy import Integer, Uuid, insert, update, values, column
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from auth.jwt import JWTService
+from auth.schemas import AccessTokenData
+from users.models import UserORM
+from users.schemas import UserStatus
+from shops.models import ShopORM, ShopAccessORM, ShopItemsORM, ShopCartORM
+from items.models import ItemORM
+from items.reservations import reservation_expires_at
+from security.users import hash_password
+
+
+PASSWORD = "password"
+
+
+def auth_headers(user_id: UUID, status: UserStatus) -> dict[str, str]:
+    """Возвращает заголовок Authorization с токеном пользователя"""
+
+    token = JWTService.encode(
+        AccessTokenData(sub=user_id, status=status).model_dump(mode="json")
+    )
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def create_user(
+        db: AsyncSession,
+        status: UserStatus = UserStatus.OWNER
+) -> tuple[UUID, dict[str, str]]:
+    """Создает пользователя и возвращает его id и заголовки авторизации"""
+
+    user_id = await db.scalar(
+        insert(UserORM)
+        .values(
+            email=f"{uuid4().hex}@example.com",
+            password=hash_password(PASSWORD),
+            status=status
+        )
+        .returning(UserORM.id)
+    )
+    await db.commit()
+
+    return user_id, auth_headers(user_id, status)
+
+
+async def create_shop(
+        db: AsyncSession,
+        *user_ids: UUID
+) -> UUID:
+    """Создает магазин и выдает к нему доступ пользователям"""
+
+    shop_id = await db.scalar(
+        insert(ShopORM)
+        .values(city="City", address="Address")
+        .returning(ShopORM.id)
+    )
+    await db.commit()
+
+    for user_id in user_ids:
+        await create_shop_access(db, user_id, shop_id)
+
+    return shop_id
+
+
+async def create_shop_access(
+        db: AsyncSession,
+        user_id: UUID,
+        shop_id: UUID
+) -> None:
+    """Выдает пользователю доступ к магазину"""
+
+    await db.execute(
+        insert(ShopAccessORM)
+        .values(shop_id=shop_id, user_id=user_id)
+    )
+    await db.commit()
+
+
+async def create_items(
+        db: AsyncSession,
+        count: int,
+        prefix: str = "item"
+) -> list[UUID]:
+    """Создает count товаров в каталоге"""
+
+    item_ids = await db.scalars(
+        insert(ItemORM)
+        .returning(ItemORM.id, sort_by_parameter_order=True),
+        [dict(name=f"{prefix}-{x:06}") for x in range(count)]
+    )
+    item_ids = list(item_ids)
+    await db.commit()
+
+    return item_ids
+
+
+async def create_stock(
+        db: AsyncSession,
+        shop_id: UUID,
+        item_ids: list[UUID],
+        quantity: int,
+        price: int = 100,
+        purchase_price: int = 60
+) -> None:
+    """Кладет товары в магазин с одинаковым остатком"""
+
+    await db.execute(
+        insert(ShopItemsORM),
+        [
+            dict(
+                shop_id=shop_id,
+                item_id=x,
+                price=price,
+                quantity=quantity,
+                purchase_price=purchase_price
+            )
+            for x in item_ids
+        ]
+    )
+    await db.commit()
+
+
+async def fill_cart(
+        db: AsyncSession,
+        user_id: UUID,
+        shop_id: UUID,
+        lines: dict[UUID, int]
+) -> None:
+    """
+        Кладет товары в корзину с резервом, как POST /items/cart/,
+        но одним запросом на всю корзину
+    """
+
+    cart = values(
+        column("item_id", Uuid),
+        column("quantity", Integer),
+        name="cart"
+    ).data(list(lines.items()))
+
+    await db.execute(
+        update(ShopItemsORM)
+        .where(
+            (ShopItemsORM.shop_id == shop_id)
+            & (ShopItemsORM.item_id == cart.c.item_id)
+        )
+        .values(reserved=ShopItemsORM.reserved + cart.c.quantity)
+    )
+    await db.execute(
+        insert(ShopCartORM).values([
+            dict(
+                shop_id=shop_id,
+                user_id=user_id,
+                item_id=item_id,
+                quantity=quantity,
+                expires_at=reservation_expires_at()
+            )
+            for item_id, quantity in lines.items()
+        ])
+    )
+    await db.commit()
@@ -0,0 +1,276 @@
+import time
+import timeit
+import asyncio
+import threading
+from uuid import uuid4
+from pathlib import Path
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa, ec, ed25519
+from cryptography.hazmat.primitives.serialization import Encoding, \
+    PublicFormat
+
+from config import JWTConfig
+from caches import TTLCache
+from auth.jwt import JWTService, claims_cache, keyset, key_id
+from auth.schemas import AccessTokenData
+from users.schemas import UserStatus
+
+
+def access_token(**claims) -> str:
+
+    return JWTService.encode(
+        AccessTokenData(
+            sub=uuid4(),
+            status=UserStatus.WORKER,
+            **claims
+        ).model_dump(mode="json")
+    )
+
+
+def test_decode_serves_verified_claims_from_cache():
+
+    token = access_token()
+    claims = JWTService.decode(token)
+
+    assert JWTService.decode(token) is claims
+
+
+def test_cached_claims_expire_with_token():
+
+    token = access_token(exp=int(time.time()) + 2)
+    JWTService.decode(token)
+
+    time.sleep(3.1)
+
+    with pytest.raises(jwt.ExpiredSignatureError):
+        JWTService.decode(token)
+
+
+def test_tampered_token_is_not_served_from_cache():
+
+    token = access_token()
+    JWTService.decode(token)
+    header, payload, signature = token.split(".")
+
+    with pytest.raises(jwt.InvalidTokenError):
+        JWTService.decode(f"{header}.{payload}.{signature[::-1]}")
+
+
+@pytest.fixture
+def public_key_file():
+    """Путь для лишнего файла ключа проверки, удаляется после теста"""
+
+    path = Path(JWTConfig.DIR, f"public-test-{uuid4().hex}.pem")
+    yield path
+    path.unlink(missing_ok=True)
+    keyset.reload()
+
+
+def foreign_token(private_key, algorithm: str) -> str:
+    """Токен, подписанный ключом не из набора, с его kid"""
+
+    return jwt.encode(
+        AccessTokenData(sub=uuid4(), status=UserStatus.OWNER)
+        .model_dump(mode="json"),
+        private_key,
+        algorithm=algorithm,
+        headers={"kid": key_id(private_key.public_key())}
+    )
+
+
+def test_reload_picks_up_rotated_key(public_key_file):
+
+    private_key = ed25519.Ed25519PrivateKey.generate()
+    token = foreign_token(private_key, "EdDSA")
+
+    with pytest.raises(jwt.InvalidSignatureError):
+        JWTService.decode(token)
+
+    public_key_file.write_bytes(
+        private_key.public_key().public_bytes(
+            Encoding.PEM,
+            PublicFormat.SubjectPublicKeyInfo
+        )
+    )
+    assert keyset.reload()
+
+    assert JWTService.decode(token)["status"] == UserStatus.OWNER.value
+
+
+def test_reload_keeps_keys_when_file_is_half_written(public_key_file):
+
+    token = access_token()
+    keys = keyset.keys
+    pem = ed25519.Ed25519PrivateKey.generate().public_key().public_bytes(
+        Encoding.PEM,
+        PublicFormat.SubjectPublicKeyInfo
+    )
+    public_key_file.write_bytes(pem[:len(pem) // 2])
+
+    assert not keyset.reload()
+    assert keyset.keys is keys
+
+    claims_cache.clear()
+    assert JWTService.decode(token)["status"] == UserStatus.WORKER.value
+
+
+@pytest.mark.anyio
+async def test_unknown_kid_reloads_keys_once(monkeypatch):
+
+    reloads = []
+    monkeypatch.setattr(keyset, "reload", lambda: reloads.append(1))
+    monkeypatch.setattr(keyset, "reload_requested_at", -60)
+    monkeypatch.setattr(JWTConfig, "UNKNOWN_KID_RELOAD", 60)
+    task = asyncio.create_task(keyset.run_reload())
+
+    try:
+        await asyncio.sleep(0)  # run_reload запомнил loop
+
+        for _ in range(20):
+            token = foreign_token(ed25519.Ed25519PrivateKey.generate(), "EdDSA")
+            with pytest.raises(jwt.InvalidSignatureError):
+                # Как зависимость FastAPI – в потоке пула
+                await asyncio.to_thread(JWTService.decode, token)
+
+        await asyncio.sleep(0.1)
+
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    assert reloads == [1]
+
+
+@pytest.mark.anyio
+async def test_foreign_tokens_are_unauthorized(client):
+
+    known_kid = keyset.keys.kid
+    tokens = {
+        "unknown kid": foreign_token(
+            ed25519.Ed25519PrivateKey.generate(),
+            "EdDSA"
+        ),
+        "wrong algorithm": jwt.encode(
+            {"sub": str(uuid4()), "status": UserStatus.OWNER.value},
+            "secret",
+            algorithm="HS256",
+            headers={"kid": known_kid}
+        ),
+        "garbage": "not.a.token"
+    }
+
+    for name, token in tokens.items():
+        response = await client.post(
+            "/users/",
+            json={},
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        assert response.status_code == 401, name
+
+
+def per_call(function, seconds: float = 0.5) -> float:
+    """Возвращает среднее время вызова в микросекундах"""
+
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    runs = max(1, int(seconds / (timer.timeit(number) / number)))
+    return timer.timeit(runs) / runs * 1e6
+
+
+@pytest.mark.benchmark
+def test_auth_cost_per_request(report):
+
+    # Как было: RS256 и PEM текст ключа на каждый запрос
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    public_key = private_key.public_key()
+    public_pem = public_key.public_bytes(
+        Encoding.PEM,
+        PublicFormat.SubjectPublicKeyInfo
+    ).decode()
+    rs256_token = jwt.encode(
+        AccessTokenData(sub=uuid4(), status=UserStatus.WORKER)
+        .model_dump(mode="json"),
+        private_key,
+        algorithm="RS256"
+    )
+
+    token = access_token()
+
+    def uncached():
+        claims_cache.clear()
+        JWTService.decode(token)
+
+    results = {
+        "RS256, PEM per call": per_call(
+            lambda: jwt.decode(rs256_token, public_pem, algorithms=["RS256"])
+        ),
+        "RS256, key object": per_call(
+            lambda: jwt.decode(rs256_token, public_key, algorithms=["RS256"])
+        ),
+        "JWTService.decode, cache miss": per_call(uncached),
+        "JWTService.decode, cache hit": per_call(
+            lambda: JWTService.decode(token)
+        )
+    }
+
+    for name, micros in results.items():
+        report(f"auth {name:<30} {micros:8.1f} us/request")
+
+    assert results["JWTService.decode, cache hit"] \
+        < results["RS256, PEM per call"] / 10
+
+
+@pytest.mark.benchmark
+def test_sign_and_verify_by_algorithm(report):
+
+    keys = {
+        "RS256": rsa.generate_private_key(public_exponent=65537, key_size=2048),
+        "ES256": ec.generate_private_key(ec.SECP256R1()),
+        "EdDSA": ed25519.Ed25519PrivateKey.generate()
+    }
+    payload = AccessTokenData(sub=uuid4(), status=UserStatus.WORKER) \
+        .model_dump(mode="json")
+
+    for algorithm, private_key in keys.items():
+        public_key = private_key.public_key()
+        token = jwt.encode(payload, private_key, algorithm=algorithm)
+
+        sign = per_call(
+            lambda: jwt.encode(payload, private_key, algorithm=algorithm)
+        )
+        verify = per_call(
+            lambda: jwt.decode(token, public_key, algorithms=[algorithm])
+        )
+        report(
+            f"jwt {algorithm} sign {sign:8.1f} us verify {verify:8.1f} us"
+        )
+
+
+def test_claims_cache_survives_concurrent_threads():
+    """Как get_token_data в пуле потоков: истечения и вытеснения наперегонки"""
+
+    cache = TTLCache(8, ttl=0.0005)
+    errors = []
+
+    def worker(index: int):
+        try:
+            for x in range(20_000):
+                key = (index + x) % 16
+                cache.set(key, x)
+                cache.get(key)
+                cache.get((key + 1) % 16)
+        except Exception as ex:
+            errors.append(ex)
+
+    threads = [
+        threading.Thread(target=worker, args=(x,)) for x in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(cache) <= 8
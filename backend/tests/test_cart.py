@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+
+from sqlalchemy import select
+
+from factories import create_user, create_shop, create_shop_access, \
+    create_items, create_stock
+from shops.models import ShopItemsORM, ShopCartORM
+
+
+pytestmark = pytest.mark.anyio
+
+CART_URL = "/items/cart/"
+
+
+async def add(client, shop_id, item_id, quantity, headers):
+
+    return await client.post(
+        CART_URL,
+        params={"shop_id": str(shop_id)},
+        json={"item_id": str(item_id), "quantity": quantity},
+        headers=headers
+    )
+
+
+async def test_parallel_adds_never_over_reserve(client, db):
+
+    stock, tills = 10, 25
+    owner_id, _ = await create_user(db)
+    shop_id = await create_shop(db, owner_id)
+    item_id, = await create_items(db, 1)
+    await create_stock(db, shop_id, [item_id], stock)
+
+    buyers = []
+    for _ in range(tills):
+        user_id, headers = await create_user(db)
+        await create_shop_access(db, user_id, shop_id)
+        buyers.append(headers)
+
+    responses = await asyncio.gather(*(
+        add(client, shop_id, item_id, 1, headers) for headers in buyers
+    ))
+    codes = sorted(x.status_code for x in responses)
+
+    assert codes == [201] * stock + [409] * (tills - stock)
+
+    quantity, reserved = (
+        await db.execute(
+            select(ShopItemsORM.quantity, ShopItemsORM.reserved)
+            .where(ShopItemsORM.shop_id == shop_id)
+        )
+    ).one()
+    assert (quantity, reserved) == (stock, stock)
+
+    lines = await db.scalars(
+        select(ShopCartORM.quantity)
+        .where(ShopCartORM.shop_id == shop_id)
+    )
+    assert list(lines) == [1] * stock
+
+
+async def test_repeated_scans_build_one_cart_line(client, db):
+
+    user_id, headers = await create_user(db)
+    shop_id = await create_shop(db, user_id)
+    item_id, = await create_items(db, 1)
+    await create_stock(db, shop_id, [item_id], 5)
+
+    quantities = []
+    for _ in range(3):
+        response = await add(client, shop_id, item_id, 1, headers)
+        assert response.status_code == 201, response.text
+        quantities.append(response.json()["quantity"])
+
+    assert quantities == [1, 2, 3]
+
+    lines = (
+        await db.execute(
+            select(ShopCartORM.quantity)
+            .where(
+                (ShopCartORM.shop_id == shop_id)
+                & (ShopCartORM.user_id == user_id)
+            )
+        )
+    ).scalars().all()
+    assert lines == [3]
+
+    # Сверх остатка: 409, позиция и резерв не меняются
+    response = await add(client, shop_id, item_id, 3, headers)
+    assert response.status_code == 409
+
+    reserved = await db.scalar(
+        select(ShopItemsORM.reserved)
+        .where(ShopItemsORM.shop_id == shop_id)
+    )
+    assert reserved == 3
@@ -0,0 +1,115 @@
+import json
+import asyncio
+from uuid import UUID, uuid4
+
+import pytest
+
+from sqlalchemy import update, func
+
+from factories import create_user, create_shop, create_items, \
+    create_stock, fill_cart
+from items.events import STOCK_CHANNEL
+from items.catalog import shop_versions
+from items.reservations import release_expired_reservations
+from shops.models import ShopCartORM
+from databases.notify import notify, listener
+
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def listening(db):
+    """Запускает LISTEN соединение процесса, как lifespan приложения"""
+
+    task = asyncio.create_task(listener.run())
+    probe = str(uuid4())
+
+    # Готов, когда событие на пробный магазин вернулось в этот процесс
+    for _ in range(100):
+        await notify(
+            STOCK_CHANNEL,
+            json.dumps({"shop_id": probe, "items": None}),
+            db
+        )
+        await db.commit()
+        await asyncio.sleep(0.05)
+
+        if UUID(probe) in shop_versions:
+            break
+
+    yield
+
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+
+async def wait_version(shop_id, version: int) -> None:
+
+    for _ in range(100):
+        if shop_versions.get(shop_id, 0) != version:
+            return
+        await asyncio.sleep(0.02)
+
+    raise AssertionError("catalog version was not bumped")
+
+
+async def catalog_quantity(client, shop_id, headers) -> int:
+
+    response = await client.get(
+        "/items/shop/",
+        params={"shop_id": str(shop_id)},
+        headers=headers
+    )
+    assert response.status_code == 200, response.text
+    return response.json()["items"][0]["quantity"]
+
+
+async def test_cart_change_invalidates_catalog_after_commit(
+        client, db, listening
+):
+
+    user_id, headers = await create_user(db)
+    shop_id = await create_shop(db, user_id)
+    item_ids = await create_items(db, 1)
+    await create_stock(db, shop_id, item_ids, 10)
+
+    assert await catalog_quantity(client, shop_id, headers) == 10
+    version = shop_versions.get(shop_id, 0)
+
+    response = await client.post(
+        "/items/cart/",
+        params={"shop_id": str(shop_id)},
+        json={"item_id": str(item_ids[0]), "quantity": 3},
+        headers=headers
+    )
+    assert response.status_code == 201, response.text
+
+    await wait_version(shop_id, version)
+    assert await catalog_quantity(client, shop_id, headers) == 7
+
+
+async def test_reservation_sweeper_invalidates_catalog(client, db, listening):
+
+    user_id, headers = await create_user(db)
+    shop_id = await create_shop(db, user_id)
+    item_ids = await create_items(db, 1)
+    await create_stock(db, shop_id, item_ids, 10)
+    await fill_cart(db, user_id, shop_id, {item_ids[0]: 4})
+    await db.execute(
+        update(ShopCartORM)
+        .where(ShopCartORM.shop_id == shop_id)
+        .values(expires_at=func.now())
+    )
+    await db.commit()
+
+    assert await catalog_quantity(client, shop_id, headers) == 6
+    version = shop_versions.get(shop_id, 0)
+
+    await release_expired_reservations(db)
+    await asyncio.sleep(0.1)
+    assert shop_versions.get(shop_id, 0) == version  # Еще не закоммичено
+
+    await db.commit()
+    await wait_version(shop_id, version)
+    assert await catalog_quantity(client, shop_id, headers) == 10
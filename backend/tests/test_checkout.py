@@ -0,0 +1,279 @@
+import time
+import asyncio
+import statistics
+from uuid import uuid4
+
+import pytest
+
+from sqlalchemy import select, insert, func
+from sqlalchemy.exc import DBAPIError
+
+from factories import create_user, create_shop, create_shop_access, \
+    create_items, create_stock, fill_cart
+from items import handlers
+from items.models import ItemSoldORM
+from items.checkout import run_checkout
+from shops.models import ShopItemsORM, ShopQueueORM
+from databases.profiling import count_statements
+
+
+pytestmark = pytest.mark.anyio
+
+CONFIRM_URL = "/items/cart/confirmm"
+
+
+async def prepare_checkout(db, size: int, quantity: int = 1_000):
+    """Магазин с size товарами и пользователь с ними в корзине"""
+
+    user_id, headers = await create_user(db)
+    shop_id = await create_shop(db, user_id)
+    item_ids = await create_items(db, size)
+    await create_stock(db, shop_id, item_ids, quantity)
+    await fill_cart(db, user_id, shop_id, dict.fromkeys(item_ids, 1))
+
+    return user_id, shop_id, item_ids, headers
+
+
+async def test_checkout_statements_do_not_grow_with_cart(client, db):
+
+    counts = {}
+
+    for size in (1, 10, 40):
+        _, shop_id, _, headers = await prepare_checkout(db, size)
+
+        with count_statements() as stats:
+            response = await client.post(
+                CONFIRM_URL,
+                params={"shop_id": str(shop_id)},
+                headers=headers
+            )
+
+        assert response.status_code == 200, response.text
+        counts[size] = stats.statements
+
+    assert len(set(counts.values())) == 1, counts
+
+
+async def test_checkout_reports_every_short_line(client, db):
+
+    user_id, shop_id, item_ids, headers = await prepare_checkout(db, 3)
+
+    # Резерв ушел у двух позиций из трех – как после истечения
+    await db.execute(
+        ShopItemsORM.__table__.update()
+        .where(ShopItemsORM.item_id.in_(item_ids[:2]))
+        .values(reserved=0, quantity=0)
+    )
+    await db.commit()
+
+    response = await client.post(
+        CONFIRM_URL,
+        params={"shop_id": str(shop_id)},
+        headers=headers
+    )
+
+    assert response.status_code == 409
+    assert {x["item_id"] for x in response.json()["detail"]} \
+        == {str(x) for x in item_ids[:2]}
+
+    # Корзина и остатки не тронуты
+    stock = await db.scalar(
+        select(ShopItemsORM.quantity)
+        .where(ShopItemsORM.item_id == item_ids[2])
+    )
+    assert stock == 1_000
+
+
+async def test_checkout_shortage_does_not_count_own_reservation(client, db):
+
+    user_id, headers = await create_user(db)
+    other_id, _ = await create_user(db)
+    shop_id = await create_shop(db, user_id)
+    item_ids = await create_items(db, 2)
+    await create_stock(db, shop_id, item_ids, 10)
+    await fill_cart(db, other_id, shop_id, {item_ids[0]: 3})
+    await fill_cart(db, user_id, shop_id, dict.fromkeys(item_ids, 5))
+
+    # Резерв покупателя ушел целиком у первой позиции и частично у второй
+    for item_id, reserved in zip(item_ids, (3, 4)):
+        await db.execute(
+            ShopItemsORM.__table__.update()
+            .where(ShopItemsORM.item_id == item_id)
+            .values(reserved=reserved)
+        )
+    await db.commit()
+
+    response = await client.post(
+        CONFIRM_URL,
+        params={"shop_id": str(shop_id)},
+        headers=headers
+    )
+
+    assert response.status_code == 409, response.text
+    assert {
+        x["item_id"]: (x["requested"], x["available"])
+        for x in response.json()["detail"]
+    } == {str(item_ids[0]): (5, 7), str(item_ids[1]): (5, 10)}
+
+
+async def test_checkout_promotes_queue_for_sold_out_items(client, db):
+
+    user_id, shop_id, item_ids, headers = await prepare_checkout(db, 2, 1)
+    await db.execute(
+        insert(ShopQueueORM)
+        .values(
+            shop_id=shop_id,
+            item_id=item_ids[0],
+            price=150,
+            quantity=7,
+            purchase_price=90
+        )
+    )
+    await db.commit()
+
+    response = await client.post(
+        CONFIRM_URL,
+        params={"shop_id": str(shop_id)},
+        headers=headers
+    )
+    assert response.status_code == 200, response.text
+
+    stock = await db.execute(
+        select(ShopItemsORM.item_id, ShopItemsORM.quantity, ShopItemsORM.price)
+        .where(ShopItemsORM.shop_id == shop_id)
+    )
+    assert set(stock.tuples()) == {
+        (item_ids[0], 7, 150),  # Партия из очереди
+        (item_ids[1], 0, 100)  # Очереди нет, товар закончился
+    }
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("size", (1, 10, 40, 100))
+async def test_checkout_latency_by_cart_size(client, db, report, size):
+
+    rounds = 20
+    user_id, shop_id, item_ids, headers = await prepare_checkout(db, size)
+    durations, statements = [], set()
+
+    for index in range(rounds):
+        if index:
+            await fill_cart(db, user_id, shop_id, dict.fromkeys(item_ids, 1))
+
+        started = time.perf_counter()
+        with count_statements() as stats:
+            response = await client.post(
+                CONFIRM_URL,
+                params={"shop_id": str(shop_id)},
+                headers=headers
+            )
+        durations.append(time.perf_counter() - started)
+
+        assert response.status_code == 200, response.text
+        statements.add(stats.statements)
+
+    report(
+        f"checkout cart={size:<4} statements={sorted(statements)} "
+        f"median={statistics.median(durations) * 1000:.1f}ms "
+        f"max={max(durations) * 1000:.1f}ms"
+    )
+
+
+class DeadlockDetected(Exception):
+    """Ошибка драйвера с SQLSTATE deadlock_detected"""
+
+    sqlstate = "40P01"
+
+
+async def test_checkout_retries_whole_transaction(client, db, monkeypatch):
+
+    user_id, shop_id, item_ids, headers = await prepare_checkout(db, 2)
+    attempts = []
+
+    async def deadlock_after_checkout(user_id, shop_id, db):
+        # Первая попытка успевает все записать и падает на deadlock:
+        # ее записи и ключ идемпотентности должны откатиться целиком
+        await run_checkout(user_id, shop_id, db)
+        attempts.append(1)
+
+        if len(attempts) == 1:
+            raise DBAPIError("UPDATE shop_items", None, DeadlockDetected())
+
+    monkeypatch.setattr(handlers, "run_checkout", deadlock_after_checkout)
+    headers = {**headers, "Idempotency-Key": str(uuid4())}
+
+    response = await client.post(
+        CONFIRM_URL,
+        params={"shop_id": str(shop_id)},
+        headers=headers
+    )
+    assert response.status_code == 200, response.text
+    assert len(attempts) == 2
+
+    replayed = await client.post(
+        CONFIRM_URL,
+        params={"shop_id": str(shop_id)},
+        headers=headers
+    )
+    assert replayed.status_code == 200
+    assert replayed.headers["Idempotent-Replayed"] == "true"
+    assert len(attempts) == 2
+
+    stock = await db.scalars(
+        select(ShopItemsORM.quantity)
+        .where(ShopItemsORM.shop_id == shop_id)
+    )
+    assert set(stock) == {999}
+
+
+async def test_parallel_checkouts_do_not_oversell(client, db, report):
+    """
+        N касс одновременно продают одни и те же горячие товары.
+        Корзины кладут их в разном порядке, чтобы провоцировать deadlock,
+        который должен уйти в повтор транзакции, а не в ошибку.
+    """
+
+    tills = 30
+    owner_id, _ = await create_user(db)
+    shop_id = await create_shop(db, owner_id)
+    hot = await create_items(db, 2, "hot")
+    await create_stock(db, shop_id, hot, tills)
+
+    buyers = []
+    for index in range(tills):
+        user_id, headers = await create_user(db)
+        await create_shop_access(db, user_id, shop_id)
+        order = hot if index % 2 else hot[::-1]
+        await fill_cart(db, user_id, shop_id, dict.fromkeys(order, 1))
+        buyers.append(headers)
+
+    async def checkout(headers):
+        return await client.post(
+            CONFIRM_URL,
+            params={"shop_id": str(shop_id)},
+            headers=headers
+        )
+
+    started = time.perf_counter()
+    responses = await asyncio.gather(*map(checkout, buyers))
+    duration = time.perf_counter() - started
+
+    assert [x.status_code for x in responses] == [200] * tills, \
+        [x.text for x in responses if x.status_code != 200]
+
+    stock = await db.execute(
+        select(ShopItemsORM.quantity, ShopItemsORM.reserved)
+        .where(ShopItemsORM.shop_id == shop_id)
+    )
+    assert set(stock.tuples()) == {(0, 0)}
+
+    sold = await db.scalar(
+        select(func.sum(ItemSoldORM.quantity))
+        .where(ItemSoldORM.shop_id == shop_id)
+    )
+    assert sold == tills * len(hot)
+
+    report(
+        f"parallel checkout tills={tills} "
+        f"{tills / duration:.0f} checkouts/s in {duration * 1000:.0f}ms"
+    )
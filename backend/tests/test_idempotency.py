@@ -0,0 +1,147 @@
+from uuid import uuid4
+
+import pytest
+from starlette.requests import Request
+
+from sqlalchemy import select, insert, func, text
+
+from factories import create_user, create_shop, create_items
+from shops.models import ShopItemsORM, ShopQueueORM
+from idempotency.models import IdempotencyKeyORM
+from users.schemas import UserStatus
+
+
+pytestmark = pytest.mark.anyio
+
+IMPORT_URL = "/items/shop/import"
+
+
+def import_body(item_ids) -> bytes:
+
+    return (
+        "item_id,price,quantity,purchase_price\n"
+        + "".join(f"{x},100,5,60\n" for x in item_ids)
+    ).encode()
+
+
+async def test_app_routes_accept_idempotency_key(app):
+
+    schema = app.openapi()
+    for path in (IMPORT_URL, "/items/cart/confirmm"):
+        parameters = schema["paths"][path]["post"]["parameters"]
+        assert "Idempotency-Key" in {x["name"] for x in parameters}
+
+
+async def test_shop_import_with_idempotency_key_is_applied_once(
+        client,
+        db,
+        monkeypatch
+):
+
+    # Поток накладной не собирается в памяти ни при первом запросе,
+    # ни при повторе
+    async def buffered(self):
+        raise AssertionError("streamed body was buffered")
+
+    monkeypatch.setattr(Request, "body", buffered)
+
+    user_id, headers = await create_user(db, UserStatus.ADMIN)
+    shop_id = await create_shop(db, user_id)
+    item_ids = await create_items(db, 3)
+    headers = {
+        **headers,
+        "Content-Type": "text/csv",
+        "Idempotency-Key": str(uuid4())
+    }
+
+    responses = [
+        await client.post(
+            IMPORT_URL,
+            params={"shop_id": str(shop_id)},
+            content=import_body(item_ids),
+            headers=headers
+        )
+        for _ in range(2)
+    ]
+
+    assert [x.status_code for x in responses] == [200, 200], responses[0].text
+    assert responses[0].json()["inserted"] == 3
+    assert responses[1].headers["Idempotent-Replayed"] == "true"
+    assert responses[1].content == responses[0].content
+
+    # Повтор не поставил поставку в очередь второй раз
+    queued = await db.scalar(
+        select(func.count())
+        .select_from(ShopQueueORM)
+        .where(ShopQueueORM.shop_id == shop_id)
+    )
+    assert queued == 0
+
+    other = await client.post(
+        IMPORT_URL,
+        params={"shop_id": str(shop_id)},
+        content=import_body(item_ids[:1]),
+        headers=headers
+    )
+    assert other.status_code == 422
+
+
+async def test_shop_import_without_key_reads_request_body(client, db):
+
+    user_id, headers = await create_user(db, UserStatus.ADMIN)
+    shop_id = await create_shop(db, user_id)
+    item_ids = await create_items(db, 2)
+
+    response = await client.post(
+        IMPORT_URL,
+        params={"shop_id": str(shop_id)},
+        content=import_body(item_ids),
+        headers={**headers, "Content-Type": "text/csv"}
+    )
+
+    assert response.status_code == 200, response.text
+    stock = await db.scalar(
+        select(func.sum(ShopItemsORM.quantity))
+        .where(ShopItemsORM.shop_id == shop_id)
+    )
+    assert stock == 10
+
+
+async def test_expired_key_is_reclaimed_before_sweep(client, db):
+
+    user_id, headers = await create_user(db, UserStatus.ADMIN)
+    shop_id = await create_shop(db, user_id)
+    item_ids = await create_items(db, 2)
+    key = str(uuid4())
+
+    # Истекший ключ, который фоновая очистка еще не удалила
+    await db.execute(
+        insert(IdempotencyKeyORM).values(
+            key=key,
+            fingerprint="0" * 64,
+            expires_at=func.now() - text("interval '1 minute'")
+        )
+    )
+    await db.commit()
+
+    response = await client.post(
+        IMPORT_URL,
+        params={"shop_id": str(shop_id)},
+        content=import_body(item_ids),
+        headers={
+            **headers,
+            "Content-Type": "text/csv",
+            "Idempotency-Key": key
+        }
+    )
+
+    assert response.status_code == 200, response.text
+    assert "Idempotent-Replayed" not in response.headers
+    assert response.json()["inserted"] == 2
+
+    stored = await db.scalar(
+        select(IdempotencyKeyORM.status_code)
+        .where(IdempotencyKeyORM.key == key)
+        .execution_options(populate_existing=True)
+    )
+    assert stored == 200
@@ -0,0 +1,225 @@
+"""
+    Горячие запросы обработчиков не должны выбирать Seq Scan.
+    База засевается объемом, на котором планировщик уже выбирает
+    между индексом и полным проходом, и собирается статистика (ANALYZE).
+"""
+import datetime
+
+import pytest
+
+from sqlalchemy import select, delete, func
+from sqlalchemy.dialects import postgresql
+
+from items.models import ItemORM, SalesDailyORM
+from items.export import get_solds_query
+from items.reservations import available_quantity, items_quantity
+from shops.models import ShopORM, ShopAccessORM, ShopCartORM, ShopItemsORM, \
+    ShopQueueORM
+from databases.pagination import PageParams, paginate
+
+
+pytestmark = pytest.mark.anyio
+
+SEED = """
+INSERT INTO shops (city, address, created_at)
+SELECT 'Seed', 'Seed', now() - g * interval '1 minute'
+FROM generate_series(1, 5000) g;
+
+INSERT INTO items (name)
+SELECT 'seed-' || lpad(g::text, 6, '0') FROM generate_series(1, 100000) g;
+
+INSERT INTO users (email, password, status)
+SELECT 'seed-' || g || '-' || gen_random_uuid() || '@example.com', 'x', 'worker'
+FROM generate_series(1, 2000) g;
+
+CREATE TEMP TABLE seed_shops AS
+SELECT id, row_number() OVER () AS n FROM shops WHERE city = 'Seed' LIMIT 100;
+
+CREATE TEMP TABLE seed_users AS
+SELECT id, row_number() OVER () AS n FROM users WHERE email LIKE 'seed-%';
+
+INSERT INTO shop_items (shop_id, item_id, price, quantity, purchase_price)
+SELECT s.id, i.id, 100, 10, 60
+FROM seed_shops s
+CROSS JOIN (SELECT id FROM items WHERE name LIKE 'seed-%' LIMIT 200) i;
+
+INSERT INTO shop_access (shop_id, user_id)
+SELECT s.id, u.id FROM seed_shops s, seed_users u WHERE (s.n + u.n) % 20 = 0;
+
+INSERT INTO shop_cart (shop_id, user_id, item_id, quantity, expires_at)
+SELECT si.shop_id, u.id, si.item_id, 1, now() + interval '15 minutes'
+FROM seed_users u
+JOIN (
+    SELECT shop_id, item_id, row_number() OVER () AS n
+    FROM shop_items WHERE shop_id IN (SELECT id FROM seed_shops)
+) si ON si.n % 2000 = u.n % 2000;
+
+INSERT INTO shop_queues (item_id, shop_id, price, quantity, purchase_price)
+SELECT item_id, shop_id, 100, 5, 60
+FROM shop_items WHERE shop_id IN (SELECT id FROM seed_shops);
+
+INSERT INTO sales_daily (shop_id, day, item_id, count, quantity, income)
+SELECT s.id, date '2000-01-01' + d,
+    (SELECT id FROM items WHERE name LIKE 'seed-%' LIMIT 1), 1, 1, 100
+FROM seed_shops s CROSS JOIN generate_series(0, 199) d;
+
+INSERT INTO items_sold (item_id, user_id, shop_id, price, quantity, income,
+    created_at)
+SELECT si.item_id, (SELECT id FROM seed_users LIMIT 1), si.shop_id, 100, 1,
+    100, now() - g * interval '10 minutes'
+FROM shop_items si CROSS JOIN generate_series(1, 3) g
+WHERE si.shop_id IN (SELECT id FROM seed_shops);
+
+ANALYZE;
+"""
+
+HOT_TABLES = {
+    "shops", "items", "users", "shop_access", "shop_cart", "shop_items",
+    "shop_queues", "sales_daily"
+}
+
+
+def seq_scans(plan: dict) -> list[str]:
+    """Возвращает таблицы, которые план читает полным проходом"""
+
+    found = []
+
+    if plan["Node Type"] == "Seq Scan":
+        relation = plan["Relation Name"]
+        # Секции items_sold: items_sold_2025_01, items_sold_default
+        if relation in HOT_TABLES or relation.startswith("items_sold"):
+            found.append(relation)
+
+    for child in plan.get("Plans", ()):
+        found.extend(seq_scans(child))
+
+    return found
+
+
+async def explain(db, query) -> dict:
+
+    sql = query.compile(
+        dialect=postgresql.dialect(),
+        compile_kwargs={"literal_binds": True}
+    )
+    connection = await db.connection()
+    plan = await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}")
+    return plan.scalar()[0]["Plan"]
+
+
+def hot_queries(user_id, shop_id, item_ids) -> dict:
+    """Запросы обработчиков в том виде, в каком они их строят"""
+
+    page = PageParams(limit=100)
+    catalog_item_id = ShopItemsORM.item_id.label("id")
+
+    return {
+        "/shops/access/self": select(ShopAccessORM.shop_id)
+        .where(ShopAccessORM.user_id == user_id),
+
+        "/shops/list": paginate(
+            select(ShopORM),
+            (ShopORM.created_at, ShopORM.id),
+            page
+        ),
+
+        "/items/": paginate(
+            select(ItemORM.id, ItemORM.name, items_quantity()),
+            (ItemORM.name, ItemORM.id),
+            page
+        ),
+
+        "/items/shop/": paginate(
+            select(
+                catalog_item_id,
+                ItemORM.name,
+                available_quantity().label("quantity")
+            )
+            .join(ItemORM, ItemORM.id == ShopItemsORM.item_id)
+            .where(ShopItemsORM.shop_id == shop_id),
+            (catalog_item_id,),
+            page
+        ),
+
+        "cart lines": select(ShopCartORM.item_id, ShopCartORM.quantity)
+        .where(
+            (ShopCartORM.user_id == user_id)
+            & (ShopCartORM.shop_id == shop_id)
+        ),
+
+        "cart clear": delete(ShopCartORM)
+        .where(
+            (ShopCartORM.shop_id == shop_id)
+            & (ShopCartORM.user_id == user_id)
+        ),
+
+        "cart by stock line": select(ShopCartORM.user_id)
+        .where(
+            (ShopCartORM.item_id == item_ids[0])
+            & (ShopCartORM.shop_id == shop_id)
+        ),
+
+        "queue promotion": select(
+            ShopQueueORM.item_id,
+            ShopQueueORM.shop_id,
+            ShopQueueORM.created_at
+        )
+        .where(
+            (ShopQueueORM.shop_id == shop_id)
+            & (ShopQueueORM.item_id.in_(item_ids))
+        )
+        .distinct(ShopQueueORM.item_id)
+        .order_by(ShopQueueORM.item_id, ShopQueueORM.created_at.asc()),
+
+        "/items/sold": select(
+            SalesDailyORM.day,
+            func.sum(SalesDailyORM.count),
+            func.sum(SalesDailyORM.income)
+        )
+        .where(
+            SalesDailyORM.day.between(
+                datetime.date(2000, 1, 1),
+                datetime.date(2000, 1, 7)
+            )
+        )
+        .group_by(SalesDailyORM.day)
+        .order_by(SalesDailyORM.day),
+
+        "/items/sold/export by shop": get_solds_query(
+            datetime.date.today() - datetime.timedelta(days=1),
+            datetime.date.today(),
+            shop_id
+        )
+    }
+
+
+async def test_hot_queries_use_indexes(db):
+
+    connection = await db.connection()
+    for statement in SEED.split(";\n"):
+        if statement.strip():
+            await connection.exec_driver_sql(statement)
+    await db.commit()
+
+    user_id, shop_id = (
+        await db.execute(
+            select(ShopCartORM.user_id, ShopCartORM.shop_id)
+            .join(ShopORM, ShopORM.id == ShopCartORM.shop_id)
+            .where(ShopORM.city == "Seed")
+            .limit(1)
+        )
+    ).one()
+    item_ids = list(
+        await db.scalars(
+            select(ShopItemsORM.item_id)
+            .where(ShopItemsORM.shop_id == shop_id)
+            .limit(10)
+        )
+    )
+
+    plans = {
+        name: seq_scans(await explain(db, query))
+        for name, query in hot_queries(user_id, shop_id, item_ids).items()
+    }
+
+    assert {k: v for k, v in plans.items() if v} == {}
@@ -0,0 +1,110 @@
+import time
+
+import pytest
+
+from sqlalchemy import select
+
+from factories import create_user
+from items.models import ItemORM
+from users.schemas import UserStatus
+
+
+pytestmark = pytest.mark.anyio
+
+BULK_URL = "/items/bulk"
+
+
+async def load(client, headers, body: bytes, content_type="text/csv"):
+
+    response = await client.post(
+        BULK_URL,
+        content=body,
+        headers={**headers, "Content-Type": content_type}
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+async def item_names(db, item_ids) -> list[str | None]:
+
+    names = await db.execute(
+        select(ItemORM.id, ItemORM.name)
+        .where(ItemORM.id.in_([x for x in item_ids if x]))
+    )
+    names = {str(k): v for k, v in names.tuples()}
+    return [names.get(x) for x in item_ids]
+
+
+async def test_bulk_csv_keeps_newlines_in_quoted_fields(client, db):
+
+    _, headers = await create_user(db, UserStatus.ADMIN)
+    body = (
+        b'name\r\n'
+        b'"Milk\r\n1 l"\r\n'
+        b'Bread\r\n'
+        b'"Tea ""Green""\n\n100 g"\n'
+    )
+
+    result = await load(client, headers, body)
+
+    assert result["errors"] == []
+    assert await item_names(db, result["item_ids"]) \
+        == ["Milk\n1 l", "Bread", 'Tea "Green"\n\n100 g']
+
+
+async def test_bulk_reports_bad_utf8_and_unterminated_quote(client, db):
+
+    _, headers = await create_user(db, UserStatus.ADMIN)
+    body = b'name\nSoap\n\xff\xfeSalt\nSugar\n"Flour\n'
+
+    result = await load(client, headers, body)
+
+    assert [x["index"] for x in result["errors"]] == [1, 3]
+    assert "utf-8" in result["errors"][0]["detail"]
+    assert await item_names(db, result["item_ids"]) \
+        == ["Soap", None, "Sugar", None]
+
+
+@pytest.mark.parametrize("content_type, body", (
+    ("text/csv", b"\xef\xbb\xbfname\nRice\n"),
+    ("application/x-ndjson", b'\xef\xbb\xbf{"name": "Rice"}\n')
+))
+async def test_bulk_skips_utf8_bom(client, db, content_type, body):
+
+    _, headers = await create_user(db, UserStatus.ADMIN)
+
+    result = await load(client, headers, body, content_type)
+
+    assert result["errors"] == []
+    assert await item_names(db, result["item_ids"]) == ["Rice"]
+
+
+@pytest.mark.benchmark
+async def test_bulk_rows_per_second(client, db, report):
+
+    _, headers = await create_user(db, UserStatus.ADMIN)
+
+    rows = 50_000
+    body = "name\n" + "".join(f"bulk-{x}\n" for x in range(rows))
+
+    started = time.perf_counter()
+    result = await load(client, headers, body.encode())
+    bulk = rows / (time.perf_counter() - started)
+
+    assert len(result["item_ids"]) == rows
+
+    requests = 500
+    started = time.perf_counter()
+    for index in range(requests):
+        response = await client.post(
+            "/items/",
+            json={"name": f"single-{index}"},
+            headers=headers
+        )
+        assert response.status_code == 200, response.text
+    single = requests / (time.perf_counter() - started)
+
+    report(
+        f"items ingest: POST /items/bulk {bulk:,.0f} rows/s, "
+        f"POST /items/ {single:,.0f} rows/s ({bulk / single:.0f}x)"
+    )
@@ -0,0 +1,135 @@
+import time
+import asyncio
+import statistics
+
+import pytest
+
+from sqlalchemy import select
+
+from config import SecurityConfig
+from factories import create_user, PASSWORD
+from users.models import UserORM
+from security.users import hash_pool, hash_password
+
+
+pytestmark = pytest.mark.anyio
+
+PROBE_URL = "/internal/pool"
+
+
+async def login(client, email: str):
+
+    return await client.post(
+        "/login",
+        data={"username": email, "password": PASSWORD}
+    )
+
+
+async def user_email(db, user_id) -> str:
+
+    return await db.scalar(select(UserORM.email).where(UserORM.id == user_id))
+
+
+async def test_login_rehashes_when_rounds_change(client, db, monkeypatch):
+
+    user_id, _ = await create_user(db)
+    email = await user_email(db, user_id)
+
+    monkeypatch.setattr(SecurityConfig, "BCRYPT_ROUNDS", 5)
+    response = await login(client, email)
+    assert response.status_code == 200, response.text
+
+    db.expire_all()
+    password = await db.scalar(
+        select(UserORM.password).where(UserORM.id == user_id)
+    )
+    assert password.startswith("$2b$05$")
+
+
+def p99(durations: list[float]) -> float:
+
+    return statistics.quantiles(durations, n=100)[98]
+
+
+async def probe(client, headers, durations: list[float]) -> None:
+    """Запрос, которому не нужен bcrypt"""
+
+    started = time.perf_counter()
+    response = await client.get(PROBE_URL, headers=headers)
+    durations.append(time.perf_counter() - started)
+
+    assert response.status_code == 200, response.text
+
+
+async def test_login_storm_does_not_stall_other_requests(
+        client, db, monkeypatch, report
+):
+    """
+        Пачка логинов в начале смены не должна останавливать остальные
+        запросы воркера: bcrypt считается в своем пуле, а не в event loop.
+    """
+
+    logins = 16
+    monkeypatch.setattr(SecurityConfig, "BCRYPT_ROUNDS", 10)
+
+    started = time.perf_counter()
+    hash_password(PASSWORD)
+    hash_duration = time.perf_counter() - started
+
+    user_id, headers = await create_user(db)
+    email = await user_email(db, user_id)
+
+    baseline = []
+    for _ in range(200):
+        await probe(client, headers, baseline)
+
+    during, queue = [], []
+    storm = asyncio.gather(*(login(client, email) for _ in range(logins)))
+    storm = asyncio.ensure_future(storm)
+
+    while not storm.done():
+        queue.append(hash_pool.waiting)
+        await probe(client, headers, during)
+
+    assert [x.status_code for x in await storm] == [200] * logins
+    assert max(queue) > 0  # Логины действительно стояли в очереди пула
+
+    # На event loop каждый логин останавливал бы запрос на целый хэш.
+    # В пуле запрос только делит ядро с потоком bcrypt: даже на одном
+    # ядре хвост растет на кванты планировщика, а не на хэши
+    assert p99(during) < 10 * p99(baseline), (p99(during), p99(baseline))
+
+    report(
+        f"login storm logins={logins} bcrypt={hash_duration * 1000:.0f}ms "
+        f"probe p99 {p99(baseline) * 1000:.1f}ms -> "
+        f"{p99(during) * 1000:.1f}ms ({len(during)} requests), "
+        f"max queue {max(queue)}"
+    )
+
+
+async def test_login_past_hash_queue_depth_is_rejected(
+        client, db, monkeypatch
+):
+
+    logins = 8
+    monkeypatch.setattr(SecurityConfig, "BCRYPT_ROUNDS", 10)
+    monkeypatch.setattr(hash_pool, "max_waiting", 2)
+    rejected = hash_pool.rejected
+
+    user_id, _ = await create_user(db)
+    email = await user_email(db, user_id)
+
+    responses = await asyncio.gather(
+        *(login(client, email) for _ in range(logins))
+    )
+    statuses = sorted(x.status_code for x in responses)
+
+    # Лишние логины не ждут в очереди, а сразу получают 503
+    assert 200 in statuses and 503 in statuses, statuses
+    assert set(statuses) == {200, 503}, statuses
+    assert hash_pool.rejected - rejected == statuses.count(503)
+    assert all(
+        x.headers["Retry-After"] == "1"
+        for x in responses if x.status_code == 503
+    )
+    assert hash_pool.waiting == 0
@@ -0,0 +1,83 @@
+import time
+import asyncio
+
+import pytest
+
+from config import Config, MetricsConfig
+from factories import create_user
+from users.schemas import UserStatus
+from metrics.middleware import MetricsMiddleware
+
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_metrics_require_owner_or_scrape_token(client, db, monkeypatch):
+
+    monkeypatch.setattr(MetricsConfig, "TOKEN", "scrape-token")
+    _, owner = await create_user(db)
+    _, worker = await create_user(db, UserStatus.WORKER)
+
+    cases = [
+        ({}, 401),
+        ({"Authorization": "Bearer wrong-token"}, 401),
+        (worker, 403),
+        (owner, 200),
+        ({"Authorization": "Bearer scrape-token"}, 200)
+    ]
+
+    for headers, status_code in cases:
+        response = await client.get("/metrics", headers=headers)
+        assert response.status_code == status_code, (headers, response.text)
+
+    assert "http_requests_total" in response.text
+
+
+async def test_metrics_follow_debug_schema_rule(app):
+
+    assert ("/metrics" in app.openapi()["paths"]) == bool(Config.DEBUG)
+
+
+async def empty_app(scope, receive, send):
+
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def per_request(app, count: int) -> float:
+    """Возвращает среднее время запроса к ASGI app в микросекундах"""
+
+    scope = {"type": "http", "method": "GET", "path": "/bench"}
+
+    async def receive():
+        return {"type": "http.request"}
+
+    async def send(message):
+        pass
+
+    started = time.perf_counter()
+    for _ in range(count):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - started) / count * 1e6
+
+
+@pytest.mark.benchmark
+async def test_metrics_middleware_overhead(report):
+
+    count, rounds = 50_000, 5
+    instrumented = MetricsMiddleware(empty_app)
+
+    bare, measured = [], []
+    for _ in range(rounds):
+        bare.append(await per_request(empty_app, count))
+        measured.append(await per_request(instrumented, count))
+        await asyncio.sleep(0)
+
+    overhead = min(measured) - min(bare)
+    MetricsMiddleware.routes.pop(("GET", "unmatched"), None)
+
+    report(
+        f"metrics middleware overhead {overhead:.2f} us/request "
+        f"(bare {min(bare):.2f} us, instrumented {min(measured):.2f} us)"
+    )
+    assert overhead < 5
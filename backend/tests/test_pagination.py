@@ -0,0 +1,93 @@
+import tracemalloc
+
+import pytest
+
+from factories import create_user, create_shop, create_items, create_stock
+from users.schemas import UserStatus
+
+
+pytestmark = pytest.mark.anyio
+
+PAGE_LIMIT = 100
+PEAK_LIMIT = 2 * 1024 * 1024  # Байт на страницу, независимо от размера каталога
+
+
+async def page_peak_memory(client, url, headers, params=None) -> int:
+    """Возвращает пик памяти Python за запрос второй страницы"""
+
+    params = {**(params or {}), "limit": PAGE_LIMIT}
+    first = await client.get(url, params=params, headers=headers)
+    assert first.status_code == 200, first.text
+
+    params["cursor"] = first.json()["next_cursor"]
+
+    tracemalloc.start()
+    try:
+        response = await client.get(url, params=params, headers=headers)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert response.status_code == 200, response.text
+    assert len(response.json()["items"]) == PAGE_LIMIT
+
+    return peak
+
+
+async def test_item_page_memory_does_not_grow_with_catalog(client, db):
+
+    _, headers = await create_user(db, UserStatus.ADMIN)
+    await create_items(db, 2 * PAGE_LIMIT, "page-small")
+
+    small = await page_peak_memory(client, "/items/", headers)
+
+    await create_items(db, 20_000, "page-large")
+    large = await page_peak_memory(client, "/items/", headers)
+
+    assert large < PEAK_LIMIT, large
+    assert large < small * 1.5, (small, large)
+
+
+async def test_shop_item_page_memory_is_bounded(client, db):
+
+    user_id, headers = await create_user(db, UserStatus.ADMIN)
+    shop_id = await create_shop(db, user_id)
+    await create_stock(db, shop_id, await create_items(db, 10_000), 5)
+
+    peak = await page_peak_memory(
+        client,
+        "/items/shop/",
+        headers,
+        {"shop_id": str(shop_id)}
+    )
+
+    assert peak < PEAK_LIMIT, peak
+
+
+async def test_pages_walk_whole_listing_in_stable_order(client, db):
+
+    user_id, headers = await create_user(db, UserStatus.ADMIN)
+    shop_id = await create_shop(db, user_id)
+    item_ids = await create_items(db, 250)
+    await create_stock(db, shop_id, item_ids, 5)
+
+    seen, cursor = [], None
+    while True:
+        response = await client.get(
+            "/items/shop/",
+            params={
+                "shop_id": str(shop_id),
+                "limit": PAGE_LIMIT,
+                **({"cursor": cursor} if cursor else {})
+            },
+            headers=headers
+        )
+        assert response.status_code == 200, response.text
+        page = response.json()
+        seen += [x["id"] for x in page["items"]]
+        cursor = page["next_cursor"]
+
+        if cursor is None:
+            break
+
+    assert seen == sorted(str(x) for x in item_ids)
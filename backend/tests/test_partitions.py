@@ -0,0 +1,70 @@
+from datetime import date, datetime
+
+import pytest
+
+from sqlalchemy import insert, text
+
+from factories import create_user, create_shop, create_items
+from items.models import ItemSoldORM
+from items.partitions import DEFAULT_PARTITION, create_sales_partition, \
+    detach_sales_partitions, list_partitions
+
+
+pytestmark = pytest.mark.anyio
+
+
+async def add_sale(db, created_at: datetime) -> None:
+
+    user_id, _ = await create_user(db)
+    shop_id = await create_shop(db, user_id)
+    item_id, = await create_items(db, 1)
+
+    await db.execute(
+        insert(ItemSoldORM)
+        .values(
+            item_id=item_id,
+            user_id=user_id,
+            shop_id=shop_id,
+            price=100,
+            quantity=1,
+            income=40,
+            created_at=created_at
+        )
+    )
+    await db.commit()
+
+
+async def count_rows(db, table: str) -> int:
+    return await db.scalar(text(f"SELECT count(*) FROM {table}"))
+
+
+async def test_sale_without_partition_moves_out_of_default(db):
+
+    await add_sale(db, datetime(2099, 1, 15))
+    assert await count_rows(db, DEFAULT_PARTITION) == 1
+
+    await create_sales_partition(db, date(2099, 1, 1))
+    await db.commit()
+
+    assert await count_rows(db, DEFAULT_PARTITION) == 0
+    assert await count_rows(db, "items_sold_2099_01") == 1
+    assert "items_sold_2099_01" in await list_partitions(db)
+
+
+async def test_old_partitions_detach_concurrently_and_keep_default(db):
+
+    await add_sale(db, datetime(2001, 3, 1))
+    await create_sales_partition(db, date(2001, 3, 1))
+    await db.commit()
+
+    detached = await detach_sales_partitions(keep_months=1)
+
+    assert "items_sold_2001_03" in detached
+    partitions = await list_partitions(db)
+    assert "items_sold_2001_03" not in partitions
+    assert DEFAULT_PARTITION in partitions
+
+    # Таблица осталась в базе для архива
+    assert await count_rows(db, "items_sold_2001_03") == 1
+    await db.execute(text("DROP TABLE items_sold_2001_03"))
+    await db.commit()
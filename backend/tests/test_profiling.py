@@ -0,0 +1,83 @@
+import pytest
+
+from config import Config
+from factories import create_user, create_shop, create_items, create_stock
+from shops.services import access_cache
+from databases.profiling import max_statements
+
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def shop(db):
+    """Владелец, магазин и 5 товаров в нем"""
+
+    user_id, headers = await create_user(db)
+    shop_id = await create_shop(db, user_id)
+    item_ids = await create_items(db, 5)
+    await create_stock(db, shop_id, item_ids, 10)
+
+    return {"shop_id": str(shop_id)}, item_ids, headers
+
+
+# Бюджеты запросов: рост – регрессия (N+1, лишняя проверка)
+async def test_cart_add_statements(client, shop):
+
+    params, item_ids, headers = shop
+    access_cache.clear()
+
+    # Резерв, позиция и событие остатков – один запрос,
+    # плюс проверка доступа к магазину
+    with max_statements(2):
+        response = await client.post(
+            "/items/cart/",
+            params=params,
+            json={"item_id": str(item_ids[0]), "quantity": 2},
+            headers=headers
+        )
+    assert response.status_code == 201, response.text
+
+    # Доступ уже в кэше
+    with max_statements(1) as stats:
+        response = await client.post(
+            "/items/cart/",
+            params=params,
+            json={"item_id": str(item_ids[1]), "quantity": 1},
+            headers=headers
+        )
+    assert response.status_code == 201, response.text
+    assert stats.statements == 1
+
+
+async def test_list_statements(client, shop):
+
+    params, _, headers = shop
+
+    for url, limit in (
+        ("/items/", 1),
+        ("/items/shop/", 2),  # Проверка доступа и страница каталога
+        ("/shops/list", 1)
+    ):
+        with max_statements(limit):
+            response = await client.get(url, params=params, headers=headers)
+        assert response.status_code == 200, (url, response.text)
+
+
+async def test_max_statements_fails_over_budget(client, shop):
+
+    params, _, headers = shop
+
+    with pytest.raises(AssertionError, match="expected at most 0"):
+        with max_statements(0):
+            await client.get("/shops/list", headers=headers)
+
+
+async def test_server_timing_in_debug(client, shop, monkeypatch):
+
+    params, _, headers = shop
+    monkeypatch.setattr(Config, "DEBUG", True)
+
+    response = await client.get("/shops/list", headers=headers)
+
+    assert response.headers["Server-Timing"].endswith('desc="1 statements"')
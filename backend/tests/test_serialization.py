@@ -0,0 +1,126 @@
+import time
+import datetime
+import statistics
+
+import pytest
+from pydantic import TypeAdapter
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from sqlalchemy import insert, select
+
+from factories import create_user, create_shop, create_items
+from items.models import SalesDailyORM
+from items.schemas import ItemSoldResoinse
+from responses import FastJSONResponse
+from databases.sqlalchemy import rows_to_dicts
+
+
+pytestmark = pytest.mark.anyio
+
+FIRST_DAY = datetime.date(1900, 1, 1)
+
+
+async def seed_sales_daily(db, days: int):
+    """Магазин с одной строкой дневной сводки на каждый из days дней"""
+
+    user_id, headers = await create_user(db)
+    shop_id = await create_shop(db, user_id)
+    item_id, = await create_items(db, 1, "daily")
+
+    await db.execute(
+        insert(SalesDailyORM),
+        [
+            dict(
+                shop_id=shop_id,
+                day=FIRST_DAY + datetime.timedelta(days=x),
+                item_id=item_id,
+                count=1,
+                quantity=x,
+                income=x * 100
+            )
+            for x in range(days)
+        ]
+    )
+    await db.commit()
+
+    params = {
+        "date_from": FIRST_DAY.isoformat(),
+        "date_to": (FIRST_DAY + datetime.timedelta(days=days)).isoformat(),
+        "shop_id": str(shop_id)
+    }
+    return shop_id, params, headers
+
+
+async def test_sold_fast_path_matches_response_model(client, db, app):
+
+    _, params, headers = await seed_sales_daily(db, 30)
+
+    response = await client.get("/items/sold", params=params, headers=headers)
+    assert response.status_code == 200, response.text
+
+    sold = TypeAdapter(list[ItemSoldResoinse]).validate_json(response.content)
+    assert [x.income for x in sold] == [x * 100 for x in range(30)]
+
+    # Модель ответа по-прежнему в схеме, хотя ответ ее не проверяет
+    schema = app.openapi()["paths"]["/items/sold"]["get"]["responses"]["200"]
+    assert "ItemSoldResoinse" in str(schema)
+
+
+@pytest.mark.benchmark
+async def test_list_serialization_10k_rows(client, db, report):
+
+    rows_count, rounds = 10_000, 10
+    shop_id, params, headers = await seed_sales_daily(db, rows_count)
+
+    durations = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        response = await client.get(
+            "/items/sold",
+            params=params,
+            headers=headers
+        )
+        durations.append(time.perf_counter() - started)
+
+        assert response.status_code == 200, response.text
+        assert len(response.json()) == rows_count
+
+    rows = (
+        await db.execute(
+            select(
+                SalesDailyORM.day.label("date"),
+                SalesDailyORM.count,
+                SalesDailyORM.income
+            )
+            .where(SalesDailyORM.shop_id == shop_id)
+            .order_by(SalesDailyORM.day)
+        )
+    ).all()
+
+    def validated() -> bytes:
+        # Как было: модель на строку, затем проверка response_model
+        # и jsonable_encoder в FastAPI
+        content = [ItemSoldResoinse.model_validate(x._asdict()) for x in rows]
+        content = TypeAdapter(list[ItemSoldResoinse]).validate_python(content)
+        return JSONResponse(jsonable_encoder(content)).body
+
+    def fast() -> bytes:
+        return FastJSONResponse(rows_to_dicts(rows)).body
+
+    serialization = {}
+    for name, build in (("validated", validated), ("fast", fast)):
+        started = time.perf_counter()
+        for _ in range(rounds):
+            body = build()
+        serialization[name] = (time.perf_counter() - started) / rounds
+
+    assert len(body) == len(response.content)
+    assert serialization["fast"] < serialization["validated"]
+
+    report(
+        f"list /items/sold rows={rows_count} endpoint median "
+        f"{statistics.median(durations) * 1000:.1f}ms, serialization "
+        f"validated {serialization['validated'] * 1000:.1f}ms -> "
+        f"fast {serialization['fast'] * 1000:.1f}ms"
+    )
@@ -0,0 +1,104 @@
+import asyncio
+import logging
+from types import SimpleNamespace
+
+import pytest
+
+from sqlalchemy import select, update
+
+from config import Config, SlowQueryConfig
+from factories import create_user
+from users.models import UserORM
+from databases import slowlog
+from databases.sqlalchemy import engine
+
+
+pytestmark = pytest.mark.anyio
+
+
+def test_analyze_only_plain_selects():
+
+    assert slowlog.should_analyze("SELECT id FROM items WHERE name = $1")
+    assert slowlog.should_analyze("  select count(*) from shop_items")
+
+    for statement in (
+        "UPDATE shop_items SET reserved = reserved + 1",
+        "INSERT INTO items (name) VALUES ($1)",
+        "DELETE FROM shop_cart WHERE expires_at < now()",
+        "WITH moved AS (DELETE FROM items_sold RETURNING *) SELECT 1",
+        "SELECT id FROM shop_items WHERE id = $1 FOR UPDATE",
+        "SELECT id FROM shop_items FOR NO KEY UPDATE SKIP LOCKED",
+        "SELECT pg_try_advisory_lock(42)",
+        "SELECT nextval('items_id_seq')"
+    ):
+        assert not slowlog.should_analyze(statement), statement
+
+
+class Plans(logging.Handler):
+
+    def __init__(self):
+        super().__init__()
+        self.plans = []
+
+    def emit(self, record):
+        self.plans.append(record.getMessage())
+
+
+@pytest.fixture
+async def plans(monkeypatch):
+    """Все запросы медленные, планы снимаются для каждого"""
+
+    handler = Plans()
+    level = slowlog.plans_logger.level
+    slowlog.plans_logger.addHandler(handler)
+    slowlog.plans_logger.setLevel(logging.INFO)
+    monkeypatch.setattr(SlowQueryConfig, "THRESHOLD", 1e-6)
+    monkeypatch.setattr(Config, "DEBUG", True)
+
+    yield handler.plans
+
+    slowlog.plans_logger.removeHandler(handler)
+    slowlog.plans_logger.setLevel(level)
+    await asyncio.gather(*slowlog.explain_tasks)
+    await slowlog.dispose_explain_engines()
+
+
+async def explained(statement, db) -> None:
+
+    await db.execute(statement)
+    await asyncio.gather(*slowlog.explain_tasks)
+
+
+async def test_select_is_analyzed_and_write_is_not_executed(db, plans):
+
+    user_id, _ = await create_user(db)
+    await asyncio.gather(*slowlog.explain_tasks)
+    plans.clear()
+
+    await explained(select(UserORM.email).where(UserORM.id == user_id), db)
+    assert "actual time" in plans[-1] and "Buffers" in plans[-1]
+
+    await explained(
+        update(UserORM)
+        .where(UserORM.id == user_id)
+        .values(email="explained@example.com"),
+        db
+    )
+    await db.rollback()
+    assert plans[-1].split("\n")[1].startswith("Update on users")
+    assert "actual time" not in plans[-1]
+
+    # Запрос на отдельном движке из одного соединения
+    assert [x.pool.size() for x in slowlog.explain_engines.values()] == [1]
+
+
+async def test_one_explain_at_a_time(db, plans):
+
+    conn = SimpleNamespace(engine=engine.sync_engine)
+
+    for _ in range(5):
+        slowlog.log_slow_statement(conn, "SELECT 1", {}, False, 1.0, None)
+
+    assert len(slowlog.explain_tasks) == 1
+    await asyncio.gather(*slowlog.explain_tasks)
+    assert len(plans) == 1
@@ -37,7 +37,7 @@ async def signup_user(
             detail="You can't create a user"
         )
 
-    process_user_form(form_data)
+    await process_user_form(form_data)
     await db.execute(
         insert(UserORM)
         .values(**form_data.model_dump())
@@ -70,7 +70,7 @@ async def update_user(
             detail="You cannot update the user's data"
         )
 
-    process_user_form(form_data)
+    await process_user_form(form_data)
     await db.execute(
         update(UserORM)
         .values(**form_data.model_dump(exclude_unset=True))
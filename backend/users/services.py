@@ -3,7 +3,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from .models import UserORM
 from .schemas import UserSignupForm, UserUpdateForm
-from security.users import hash_password
+from security.users import hash_password_async
 
 
 
@@ -20,7 +20,7 @@ async def get_user(
     return user.scalar()
 
 
-def process_user_form(
+async def process_user_form(
         form_data: UserSignupForm | UserUpdateForm
 ) -> None:
     """
@@ -30,4 +30,4 @@ def process_user_form(
     """
 
     if form_data.password:
-        form_data.password = hash_password(form_data.password)
+        form_data.password = await hash_password_async(form_data.password)